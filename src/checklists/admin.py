@@ -1,6 +1,8 @@
+from django import forms
 from django.contrib import admin
 from django.db import models
 from django.forms import TextInput, Textarea
+from django.utils.html import format_html
 from checklists.models import (
     Location,
     ChecklistTemplate,
@@ -10,7 +12,14 @@ from checklists.models import (
     InspectionItem,
     ViolationPhoto,
     Schedule,
+    SchedulerState,
+    CalendarOverride,
 )
+from checklists.photos import rendition_url
+from checklists.services import attach_photos
+
+# Высота превью фото в админке, px
+ADMIN_PREVIEW_PX = 100
 
 
 # --- Настройка справочников ---
@@ -73,8 +82,40 @@ class LocationAdmin(admin.ModelAdmin):
 
 
 class ViolationPhotoInline(admin.TabularInline):
+    """
+    Фото пункта: только просмотр и удаление.
+    Выбор файла из списка всех PhotoBlob обошел бы счетчики ссылок
+    и фото отчета - новые фото загружаются полем "Добавить фото"
+    (через attach_photos), удаление ведут сигналы (violation_photo_deleted).
+    """
+
     model = ViolationPhoto
     extra = 0
+    fields = ("preview", "uploaded_at")
+    readonly_fields = ("preview", "uploaded_at")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Фото")
+    def preview(self, obj):
+        url = rendition_url(obj, ADMIN_PREVIEW_PX)
+        if url is None:
+            return obj.blob.get_status_display()
+        return format_html(
+            '<a href="{}" target="_blank"><img src="{}" height="{}"></a>',
+            obj.blob.image.url,
+            url,
+            ADMIN_PREVIEW_PX,
+        )
+
+
+class InspectionItemAdminForm(forms.ModelForm):
+    new_photo = forms.ImageField(label="Добавить фото", required=False)
+
+    class Meta:
+        model = InspectionItem
+        fields = "__all__"
 
 
 class InspectionItemInline(admin.StackedInline):
@@ -113,8 +154,15 @@ class InspectionItemAdmin(admin.ModelAdmin):
     list_display = ("inspection", "section_name", "criteria_text", "is_compliant")
     list_filter = ("is_compliant", "inspection__date_check")
     search_fields = ("comment", "criteria_text")
+    form = InspectionItemAdminForm
     inlines = [ViolationPhotoInline]  # <-- Здесь можно добавлять фото
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Новое фото - как из формы отчета: блоб по хешу, счетчики, обработка
+        if form.cleaned_data.get("new_photo"):
+            attach_photos([(form.instance, form.cleaned_data["new_photo"])])
+
 
 @admin.register(Schedule)
 class ScheduleAdmin(admin.ModelAdmin):
@@ -128,3 +176,20 @@ class ScheduleAdmin(admin.ModelAdmin):
         return "⚪️ Ожидает"
 
     status_display.short_description = "Статус"
+
+
+@admin.register(SchedulerState)
+class SchedulerStateAdmin(admin.ModelAdmin):
+    """Курсор автогенератора расписания (только просмотр/ручная правка курсора)"""
+
+    list_display = ("generated_until", "last_inspector", "updated_at")
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(CalendarOverride)
+class CalendarOverrideAdmin(admin.ModelAdmin):
+    """Официальные переносы рабочих дней (рабочие субботы и доп. выходные)"""
+
+    list_display = ("date", "is_working_day", "comment")
+    list_filter = ("is_working_day",)
+    date_hierarchy = "date"
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.db.models import Count, DateField, Max, Q, Value
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from checklists.caching import bump_version, record_cache_lookup, versioned_key
+from checklists.models import InspectionItem
+
+# Версия аналитики: растет при завершении/удалении отчета
+ANALYTICS_NAMESPACE = "checklists:analytics"
+
+# Правки уже завершенных отчетов в админке сигналов не шлют (bulk-операции) -
+# таймаут ограничивает, насколько устаревшими могут быть цифры
+ANALYTICS_TIMEOUT = 60 * 60
+
+# Окно по умолчанию и максимальное окно (дней)
+ANALYTICS_DEFAULT_DAYS = 90
+ANALYTICS_MAX_DAYS = 366 * 2
+
+# Сколько строк (проблемных мест) отдавать на каждый период
+ANALYTICS_DEFAULT_LIMIT = 20
+ANALYTICS_MAX_LIMIT = 200
+
+# Разрез: поля группировки и подписи строки.
+# Подписи берутся агрегатом (Max) - в пределах группы они одинаковые,
+# а в GROUP BY остаются только ключи.
+GROUPINGS = {
+    # Вопрос справочника. Текст вопроса в отчетах - снимок, мог меняться;
+    # показываем последний (Max по тексту достаточно для подписи)
+    "criterion": {
+        "keys": ("criteria_origin_id",),
+        "labels": {
+            "criterion": Max("criteria_text"),
+            "section": Max("section_name"),
+            "location": Max("inspection__template__location__name"),
+        },
+    },
+    # Раздел - в пределах шаблона (одинаковые названия разделов
+    # в разных шаблонах - разные места)
+    "section": {
+        "keys": ("inspection__template_id", "section_name"),
+        "labels": {
+            "template": Max("inspection__template__name"),
+            "location": Max("inspection__template__location__name"),
+        },
+    },
+    "location": {
+        "keys": ("inspection__template__location_id",),
+        "labels": {"location": Max("inspection__template__location__name")},
+    },
+}
+
+PERIODS = {
+    "week": TruncWeek,
+    "month": TruncMonth,
+    # Все окно одной строкой
+    "all": None,
+}
+
+
+def _rate(violations, total):
+    # Доля пунктов с нарушением, %
+    return round(violations * 100 / total, 2) if total else 0.0
+
+
+def compute_violation_rates(by, start_date, end_date, period="all", limit=None):
+    """
+    Доля нарушений по разрезу by ("criterion" | "section" | "location")
+    в окне [start_date, end_date], с разбивкой по периодам period.
+
+    Один GROUP BY по пунктам завершенных отчетов окна (без обхода всей
+    таблицы: фильтр по дате отчета). Внутри периода строки отсортированы
+    по числу нарушений, отдаются первые limit.
+
+    Возвращает список словарей: period (дата начала или None), ключи разреза,
+    подписи, total, violations, rate.
+    """
+    grouping = GROUPINGS[by]
+    trunc = PERIODS[period]
+    limit = limit or ANALYTICS_DEFAULT_LIMIT
+
+    items = InspectionItem.objects.filter(
+        inspection__is_completed=True,
+        inspection__date_check__range=(start_date, end_date),
+    )
+    if by == "criterion":
+        # Вопросы, удаленные из справочника, в аналитику по вопросам не входят
+        items = items.filter(criteria_origin__isnull=False)
+
+    if trunc:
+        period_expr = trunc("inspection__date_check")
+    else:
+        period_expr = Value(None, output_field=DateField())
+    rows = (
+        items.order_by()
+        .annotate(period=period_expr)
+        .values("period", *grouping["keys"])
+        .annotate(
+            total=Count("id"),
+            violations=Count("id", filter=Q(is_compliant=False)),
+            **grouping["labels"],
+        )
+        .filter(violations__gt=0)
+        .order_by("period", "-violations", *grouping["keys"])
+    )
+
+    result = []
+    per_period = {}
+    for row in rows:
+        # Лимит на каждый период: проблемные места каждой недели/месяца
+        shown = per_period.get(row["period"], 0)
+        if shown >= limit:
+            continue
+        per_period[row["period"]] = shown + 1
+
+        row["rate"] = _rate(row["violations"], row["total"])
+        result.append(row)
+    return result
+
+
+def get_violation_rates(by, start_date, end_date, period="all", limit=None):
+    """
+    compute_violation_rates из Redis. Пересчет - только после завершения
+    нового отчета (версия ANALYTICS_NAMESPACE) или по таймауту.
+    """
+    limit = limit or ANALYTICS_DEFAULT_LIMIT
+    key = versioned_key(
+        ANALYTICS_NAMESPACE, "rates", by, start_date, end_date, period, limit
+    )
+    rows = cache.get(key)
+    record_cache_lookup(hits=rows is not None, misses=rows is None)
+    if rows is None:
+        rows = compute_violation_rates(by, start_date, end_date, period, limit)
+        cache.set(key, rows, ANALYTICS_TIMEOUT)
+    return rows
+
+
+def invalidate_analytics():
+    bump_version(ANALYTICS_NAMESPACE)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ChecklistsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "checklists"
+
+    def ready(self):
+        # Подключаем обработчики сигналов (сброс кеша справочников и т.д.)
+        from checklists import signals  # noqa: F401
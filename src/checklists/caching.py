@@ -0,0 +1,75 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+
+# Попадания/промахи кеша данных в рамках текущего запроса
+# (снимки, матрицы, аналитика, календарь; ключи версий не считаются).
+# None - никто не считает (фоновые задачи, команды).
+_cache_stats = ContextVar("cache_stats", default=None)
+
+
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def get_version(namespace):
+    """
+    Текущая версия данных в пространстве имен (например, 'checklists:template:5').
+    Версия входит в ключ кеша: после bump_version() старые ключи просто
+    перестают читаться и сами истекают по таймауту.
+    """
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Ключ версии потерян (Redis перезапущен/вытеснил ключ).
+        # Начинаем с метки времени, а не с 1, чтобы случайно не прочитать
+        # старый снимок, который лежит под версией 1.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def bump_version(namespace):
+    """
+    Инвалидирует все ключи пространства имен (вызывается из сигналов).
+    """
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключа еще нет - создаем сразу "новую" версию
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def versioned_key(namespace, *parts):
+    """
+    Ключ кеша, привязанный к текущей версии пространства имен.
+    """
+    suffix = ":".join(str(part) for part in parts)
+    return f"{namespace}:v{get_version(namespace)}:{suffix}"
+
+
+@contextmanager
+def track_cache_stats():
+    """
+    Считает обращения к кешу внутри блока (см. RequestMetricsMiddleware).
+    Отдает словарь {"hits": .., "misses": ..}, заполняется по ходу блока.
+    """
+    stats = {"hits": 0, "misses": 0}
+    token = _cache_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _cache_stats.reset(token)
+
+
+def record_cache_lookup(hits=0, misses=0):
+    """
+    Отмечает чтение кеша данных: hits найдено, misses пришлось строить.
+    """
+    stats = _cache_stats.get()
+    if stats is not None:
+        stats["hits"] += hits
+        stats["misses"] += misses
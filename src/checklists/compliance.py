@@ -0,0 +1,183 @@
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum
+from django.db.models.functions import Coalesce, NullIf, TruncMonth
+
+from checklists.models import ComplianceDaily, Inspection, InspectionItem
+
+# Сколько строк итогов вставлять одним INSERT при пересчете
+COMPLIANCE_BATCH_SIZE = 1000
+
+
+def _score(compliant, total):
+    # Процент пунктов без нарушений; пустой отчет считаем идеальным
+    return round(compliant * 100 / total, 2) if total else 100.0
+
+
+def _inspection_totals(inspection):
+    """
+    (всего пунктов, без нарушений) одного отчета - один агрегирующий запрос.
+    """
+    totals = InspectionItem.objects.filter(inspection=inspection).aggregate(
+        total=Count("id"), compliant=Count("id", filter=Q(is_compliant=True))
+    )
+    return totals["total"], totals["compliant"]
+
+
+def record_completed_inspection(inspection):
+    """
+    Добавляет завершенный отчет в итоги дня (ComplianceDaily).
+    Вызывать один раз - в транзакции, где отчет помечается завершенным.
+    """
+    total, compliant = _inspection_totals(inspection)
+    key = {
+        "date": inspection.date_check,
+        "template_id": inspection.template_id,
+        "location_id": inspection.template.location_id,
+        "inspector_id": inspection.inspector_id,
+    }
+
+    # Строка уже есть (второй отчет за день) - прибавляем атомарным UPDATE.
+    # В SET берутся значения ДО обновления, поэтому балл считаем от новых сумм.
+    new_total = F("total_items") + total
+    new_compliant = F("compliant_items") + compliant
+    increment = {
+        "inspections_count": F("inspections_count") + 1,
+        "total_items": new_total,
+        "compliant_items": new_compliant,
+        "score": Coalesce(
+            ExpressionWrapper(
+                new_compliant * 100.0 / NullIf(new_total, 0), output_field=FloatField()
+            ),
+            100.0,
+        ),
+    }
+    if ComplianceDaily.objects.filter(**key).update(**increment):
+        return
+
+    try:
+        # Отдельная точка сохранения: параллельный отчет мог создать строку раньше
+        with transaction.atomic():
+            ComplianceDaily.objects.create(
+                **key,
+                inspections_count=1,
+                total_items=total,
+                compliant_items=compliant,
+                score=_score(compliant, total),
+            )
+    except IntegrityError:
+        ComplianceDaily.objects.filter(**key).update(**increment)
+
+
+def rebuild_compliance_daily(start_date=None, end_date=None):
+    """
+    Полный пересчет итогов из пунктов отчетов (после ручных правок в админке,
+    первого запуска и т.п.). Границы периода включительно; None - без границы.
+    Возвращает количество строк итогов.
+    """
+    # От отчетов, а не от пунктов: отчет без пунктов тоже учитывается
+    # (как при завершении - inspections_count + 1, пунктов 0)
+    inspections = Inspection.objects.filter(is_completed=True)
+    daily = ComplianceDaily.objects.all()
+    if start_date:
+        inspections = inspections.filter(date_check__gte=start_date)
+        daily = daily.filter(date__gte=start_date)
+    if end_date:
+        inspections = inspections.filter(date_check__lte=end_date)
+        daily = daily.filter(date__lte=end_date)
+
+    rows = (
+        inspections.order_by()
+        .values_list(
+            "date_check", "template_id", "template__location_id", "inspector_id"
+        )
+        .annotate(
+            inspections=Count("id", distinct=True),
+            total=Count("items"),
+            compliant=Count("items", filter=Q(items__is_compliant=True)),
+        )
+    )
+
+    with transaction.atomic():
+        daily.delete()
+        created = ComplianceDaily.objects.bulk_create(
+            (
+                ComplianceDaily(
+                    date=date,
+                    template_id=template_id,
+                    location_id=location_id,
+                    inspector_id=inspector_id,
+                    inspections_count=inspections,
+                    total_items=total,
+                    compliant_items=compliant,
+                    score=_score(compliant, total),
+                )
+                for (
+                    date,
+                    template_id,
+                    location_id,
+                    inspector_id,
+                    inspections,
+                    total,
+                    compliant,
+                ) in rows.iterator()
+            ),
+            batch_size=COMPLIANCE_BATCH_SIZE,
+        )
+    return len(created)
+
+
+def compliance_totals(daily):
+    """
+    Сводка по выборке итогов: отчетов, пунктов, нарушений и средний балл.
+    """
+    totals = daily.aggregate(
+        inspections=Sum("inspections_count", default=0),
+        total=Sum("total_items", default=0),
+        compliant=Sum("compliant_items", default=0),
+    )
+    totals["violations"] = totals["total"] - totals["compliant"]
+    totals["score"] = _score(totals["compliant"], totals["total"])
+    return totals
+
+
+def month_starts(last_month, count):
+    """
+    Первые числа count месяцев подряд, заканчивая месяцем last_month
+    (от старого к новому).
+    """
+    months = [last_month.replace(day=1)]
+    while len(months) < count:
+        previous = months[0] - datetime.timedelta(days=1)
+        months.insert(0, previous.replace(day=1))
+    return months
+
+
+def monthly_compliance(start_date, end_date=None, by="location"):
+    """
+    Итоги по месяцам (из ComplianceDaily, без обхода пунктов).
+    by: "location" | "template" | "inspector" | None (по всем сразу).
+    Возвращает список словарей: month, <by>_id, inspections, total, compliant, score.
+    """
+    daily = ComplianceDaily.objects.filter(date__gte=start_date)
+    if end_date:
+        daily = daily.filter(date__lte=end_date)
+
+    group_by = ["month"] + ([f"{by}_id"] if by else [])
+    rows = (
+        daily.order_by()
+        .annotate(month=TruncMonth("date"))
+        .values(*group_by)
+        .annotate(
+            inspections=Sum("inspections_count"),
+            total=Sum("total_items"),
+            compliant=Sum("compliant_items"),
+        )
+        .order_by(*group_by)
+    )
+    result = []
+    for row in rows:
+        row["score"] = _score(row["compliant"], row["total"])
+        result.append(row)
+    return result
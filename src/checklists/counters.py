@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from checklists.models import Inspection, InspectionItem, ViolationPhoto
+
+# Сколько отчетов пересчитывать одним UPDATE (не держим блокировку на всю таблицу)
+COUNTERS_BATCH_SIZE = 1000
+
+COUNTER_FIELDS = ("items_total", "violations_total", "photos_total")
+
+
+def _count(queryset, group_by):
+    # COUNT по связанной таблице подзапросом (0, если строк нет)
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(count=Count("id"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def actual_counters():
+    """
+    Выражения "как должно быть" для счетчиков отчета (считаются по пунктам и фото).
+    Ключи совпадают с COUNTER_FIELDS.
+    """
+    items = InspectionItem.objects.filter(inspection=OuterRef("pk"))
+    photos = ViolationPhoto.objects.filter(item__inspection=OuterRef("pk"))
+    return {
+        "items_total": _count(items, "inspection"),
+        "violations_total": _count(items.filter(is_compliant=False), "inspection"),
+        "photos_total": _count(photos, "item__inspection"),
+    }
+
+
+def find_counter_mismatches(inspections=None):
+    """
+    Отчеты, у которых счетчики разошлись с пунктами и фото
+    (ручная правка в админке, сбой и т.п.).
+    Каждый отчет дополнительно получает actual_<счетчик> с верным значением.
+    """
+    if inspections is None:
+        inspections = Inspection.objects.all()
+    annotations = {
+        f"actual_{field}": expression for field, expression in actual_counters().items()
+    }
+    mismatch = Q()
+    for field in COUNTER_FIELDS:
+        mismatch |= ~Q(**{field: F(f"actual_{field}")})
+    return inspections.annotate(**annotations).filter(mismatch).order_by("id")
+
+
+def recount_inspection_counters(inspections=None, batch_size=COUNTERS_BATCH_SIZE):
+    """
+    Пересчитывает счетчики по пунктам и фото: UPDATE с подзапросами
+    пачками по batch_size отчетов. Возвращает количество обновленных отчетов.
+    """
+    if inspections is None:
+        inspections = Inspection.objects.all()
+    ids = list(inspections.order_by("id").values_list("id", flat=True))
+
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            updated += Inspection.objects.filter(
+                id__in=ids[start : start + batch_size]
+            ).update(**actual_counters())
+    return updated
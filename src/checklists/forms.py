@@ -0,0 +1,79 @@
+from django import forms
+from django.contrib.auth import get_user_model
+
+from checklists.models import ChecklistTemplate
+
+User = get_user_model()
+
+
+class HistoryFilterForm(forms.Form):
+    """
+    Фильтры журнала проверок (GET-параметры).
+    Все поля необязательные: пустое поле - без фильтра.
+    """
+
+    VIOLATIONS_ANY = ""
+    VIOLATIONS_YES = "yes"
+    VIOLATIONS_NO = "no"
+
+    template = forms.ModelChoiceField(
+        label="Шаблон",
+        # В подписи шаблона есть участок (__str__) - берем его тем же запросом
+        queryset=ChecklistTemplate.objects.select_related("location").order_by("name"),
+        required=False,
+        empty_label="Все шаблоны",
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+    inspector = forms.ModelChoiceField(
+        label="Проверяющий",
+        queryset=User.objects.filter(can_perform_inspections=True).order_by(
+            "last_name", "first_name"
+        ),
+        required=False,
+        empty_label="Все проверяющие",
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+    date_from = forms.DateField(
+        label="С даты",
+        required=False,
+        widget=forms.DateInput(
+            attrs={"type": "date", "class": "form-control form-control-sm"}
+        ),
+    )
+    date_to = forms.DateField(
+        label="По дату",
+        required=False,
+        widget=forms.DateInput(
+            attrs={"type": "date", "class": "form-control form-control-sm"}
+        ),
+    )
+    violations = forms.ChoiceField(
+        label="Нарушения",
+        choices=[
+            (VIOLATIONS_ANY, "Все отчеты"),
+            (VIOLATIONS_YES, "С нарушениями"),
+            (VIOLATIONS_NO, "Без нарушений"),
+        ],
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select form-select-sm"}),
+    )
+
+    def filter(self, inspections):
+        """
+        Применяет фильтры к выборке отчетов (форма должна быть валидной).
+        Все условия - по столбцам самого отчета, без JOIN на пункты.
+        """
+        data = self.cleaned_data
+        if data.get("template"):
+            inspections = inspections.filter(template=data["template"])
+        if data.get("inspector"):
+            inspections = inspections.filter(inspector=data["inspector"])
+        if data.get("date_from"):
+            inspections = inspections.filter(date_check__gte=data["date_from"])
+        if data.get("date_to"):
+            inspections = inspections.filter(date_check__lte=data["date_to"])
+        if data.get("violations") == self.VIOLATIONS_YES:
+            inspections = inspections.filter(violations_total__gt=0)
+        elif data.get("violations") == self.VIOLATIONS_NO:
+            inspections = inspections.filter(violations_total=0)
+        return inspections
@@ -0,0 +1,68 @@
+import datetime
+
+from django.db.models import Q
+
+# Сколько отчетов на одной странице журнала
+HISTORY_PAGE_SIZE = 50
+
+# Порядок журнала: свежие сверху. id - последний ключ, чтобы порядок был строгим
+# (несколько отчетов с одинаковыми датой и временем создания)
+HISTORY_ORDERING = ("-date_check", "-created_at", "-id")
+
+# Разделитель частей курсора в URL
+CURSOR_SEPARATOR = "_"
+
+
+def encode_cursor(inspection):
+    """
+    Курсор "продолжить после этого отчета": дата, время создания и id.
+    """
+    return CURSOR_SEPARATOR.join(
+        [
+            inspection.date_check.isoformat(),
+            inspection.created_at.isoformat(),
+            str(inspection.id),
+        ]
+    )
+
+
+def decode_cursor(value):
+    """
+    Обратно в (дата, время создания, id). Неверный курсор - ValueError.
+    """
+    date_check, created_at, inspection_id = value.split(CURSOR_SEPARATOR)
+    return (
+        datetime.date.fromisoformat(date_check),
+        datetime.datetime.fromisoformat(created_at),
+        int(inspection_id),
+    )
+
+
+def keyset_page(inspections, cursor=None, size=None):
+    """
+    Страница журнала по ключу (keyset), а не по OFFSET.
+
+    OFFSET заставляет базу прочитать и выбросить все предыдущие строки -
+    чем дальше страница, тем дольше. Здесь каждая страница - это
+    "следующие size отчетов после курсора" по индексу inspection_history_idx,
+    стоимость одинаковая на любой глубине.
+
+    Возвращает (отчеты, курсор следующей страницы или None).
+    """
+    size = size or HISTORY_PAGE_SIZE
+    if cursor:
+        date_check, created_at, inspection_id = decode_cursor(cursor)
+        # (date_check, created_at, id) < курсора. Первое условие отдельно -
+        # по нему база ограничивает диапазон индекса
+        inspections = inspections.filter(date_check__lte=date_check).filter(
+            Q(date_check__lt=date_check)
+            | Q(created_at__lt=created_at)
+            | Q(created_at=created_at, id__lt=inspection_id)
+        )
+
+    # Лишняя строка показывает, есть ли следующая страница (без COUNT)
+    rows = list(inspections.order_by(*HISTORY_ORDERING)[: size + 1])
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(rows[-1])
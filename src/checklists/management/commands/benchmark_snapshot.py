@@ -0,0 +1,114 @@
+import datetime
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from checklists.models import (
+    ChecklistCriteria,
+    ChecklistSection,
+    ChecklistTemplate,
+    Location,
+)
+from checklists.services import create_inspection_from_template
+from checklists.snapshots import invalidate_template_snapshot
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер создания отчета из шаблона (Snapshot): "
+        "количество SQL-запросов и время для шаблонов разного размера. "
+        "Все тестовые данные откатываются, база не меняется."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[50, 150, 300],
+            help="Количество вопросов в шаблоне (можно несколько).",
+        )
+        parser.add_argument(
+            "--section-size",
+            type=int,
+            default=10,
+            help="Сколько вопросов в одном разделе.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Сколько раз повторять замер."
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'Вопросов':>9} | {'Запросов':>8} | {'Время, мс':>10}")
+        for size in options["sizes"]:
+            queries, elapsed = self._measure(
+                size, options["section_size"], options["repeat"]
+            )
+            self.stdout.write(f"{size:>9} | {queries:>8} | {elapsed * 1000:>10.1f}")
+
+    def _measure(self, size, section_size, repeat):
+        """
+        Возвращает (кол-во запросов, лучшее время) для шаблона из `size` вопросов.
+        """
+        best = None
+        queries = 0
+        template_ids = []
+
+        # Всё внутри транзакции, которую в конце откатываем.
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email="benchmark-snapshot@example.com",
+                first_name="Benchmark",
+                last_name="Snapshot",
+            )
+            location = Location.objects.create(name="Benchmark")
+
+            for attempt in range(repeat):
+                template = self._build_template(location, size, section_size)
+                template_ids.append(template.id)
+                date = datetime.date(2000, 1, 1) + datetime.timedelta(days=attempt)
+
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    create_inspection_from_template(
+                        template=template,
+                        user=user,
+                        date=date,
+                        location_snapshot=location.name,
+                    )
+                    elapsed = time.perf_counter() - started
+
+                queries = len(ctx.captured_queries)
+                best = elapsed if best is None else min(best, elapsed)
+
+            transaction.set_rollback(True)
+
+        # Снимки откатанных шаблонов остались в Redis - сбрасываем их
+        for template_id in template_ids:
+            invalidate_template_snapshot(template_id)
+
+        return queries, best
+
+    def _build_template(self, location, size, section_size):
+        template = ChecklistTemplate.objects.create(
+            name=f"Benchmark {size}", location=location
+        )
+        sections_count = max(1, -(-size // section_size))  # Деление с округлением вверх
+        sections = ChecklistSection.objects.bulk_create(
+            ChecklistSection(template=template, title=f"Раздел {i + 1}", order=i)
+            for i in range(sections_count)
+        )
+        ChecklistCriteria.objects.bulk_create(
+            ChecklistCriteria(
+                section=sections[i // section_size],
+                text=f"Вопрос {i + 1}",
+                order=i % section_size,
+            )
+            for i in range(size)
+        )
+        return template
@@ -0,0 +1,241 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from checklists.models import Inspection, Schedule
+from checklists.schedule_matrix import invalidate_schedule_matrices
+from checklists.services import create_inspection_from_template
+
+User = get_user_model()
+
+# Доля нарушений в форме при замере POST (каждый N-й пункт - "Не соответствует")
+POST_VIOLATION_EVERY = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер ключевых страниц на текущих данных (см. generate_synthetic_data): "
+        "количество SQL-запросов и время ответа. Каждый запуск страницы - "
+        "в транзакции, которая откатывается: база не меняется. "
+        "Результат можно сохранить в JSON и сравнить с прошлым замером."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Сколько раз открывать страницу."
+        )
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            help="Замерить только эти страницы (названия из таблицы).",
+        )
+        parser.add_argument("--output", help="Куда записать результат (JSON).")
+        parser.add_argument(
+            "--baseline", help="Прошлый результат (JSON) - показать разницу."
+        )
+        parser.add_argument(
+            "--label", default="", help="Метка замера в JSON (например, коммит)."
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat должен быть не меньше 1.")
+
+        fixtures = self._fixtures()
+        scenarios = self._scenarios(fixtures)
+        if options["only"]:
+            unknown = set(options["only"]) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f"Неизвестные страницы: {', '.join(sorted(unknown))}"
+                )
+            scenarios = {name: scenarios[name] for name in options["only"]}
+
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = {row["name"]: row for row in json.load(file)["results"]}
+
+        # Test Client ходит с Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            results = [
+                self._measure(name, scenario, options["repeat"])
+                for name, scenario in scenarios.items()
+            ]
+
+        self._print(results, baseline)
+
+        if options["output"]:
+            report = {
+                "label": options["label"],
+                "created_at": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "repeat": options["repeat"],
+                "results": results,
+            }
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результат записан: {options['output']}")
+
+    # --- Данные для замеров ---
+
+    def _fixtures(self):
+        """
+        Берет из базы сотрудника с заданием на сегодня, администратора
+        и завершенный отчет с наибольшим числом нарушений.
+        """
+        today = timezone.now().date()
+        task = (
+            Schedule.objects.filter(
+                date=today,
+                inspection__isnull=True,
+                inspector__role=User.ROLE_WORKER,
+            )
+            .select_related("inspector", "template__location")
+            .order_by("id")
+            .first()
+        )
+        admin = User.objects.filter(is_staff=True).order_by("id").first()
+        report = (
+            Inspection.objects.filter(is_completed=True)
+            .order_by("-violations_total", "-id")
+            .first()
+        )
+        if task is None or admin is None or report is None:
+            raise CommandError(
+                "Не хватает данных: нужно задание на сегодня без отчета, "
+                "администратор и завершенный отчет. "
+                "Заполните базу: manage.py generate_synthetic_data"
+            )
+        return {"today": today, "task": task, "admin": admin, "report": report}
+
+    def _scenarios(self, fixtures):
+        """
+        Страницы для замера: {название: функция подготовки}.
+        Подготовка выполняется внутри откатываемой транзакции и не входит
+        в замер; возвращает (пользователь, метод, URL, данные POST).
+        """
+        task = fixtures["task"]
+        admin = fixtures["admin"]
+        report = fixtures["report"]
+
+        def draft():
+            # Черновик сегодняшней проверки (как после "Начать")
+            return create_inspection_from_template(
+                template=task.template,
+                user=task.inspector,
+                date=fixtures["today"],
+                location_snapshot=task.template.location.name,
+            )
+
+        def form_post():
+            inspection = draft()
+            data = {"action": "save"}
+            for i, item_id in enumerate(
+                inspection.items.order_by().values_list("id", flat=True)
+            ):
+                violation = i % POST_VIOLATION_EVERY == 0
+                data[f"compliant_{item_id}"] = "false" if violation else "true"
+                data[f"comment_{item_id}"] = "Замер" if violation else ""
+            url = reverse("inspection_form", args=[inspection.id])
+            return task.inspector, "post", url, data
+
+        def schedule_cold():
+            invalidate_schedule_matrices()
+            return admin, "get", reverse("admin_schedule"), None
+
+        return {
+            "employee_dashboard": lambda: (
+                task.inspector,
+                "get",
+                reverse("employee_dashboard"),
+                None,
+            ),
+            "start_inspection": lambda: (
+                task.inspector,
+                "post",
+                reverse("start_inspection", args=[task.template_id]),
+                {},
+            ),
+            "inspection_form_get": lambda: (
+                task.inspector,
+                "get",
+                reverse("inspection_form", args=[draft().id]),
+                None,
+            ),
+            "inspection_form_post": form_post,
+            "admin_history": lambda: (admin, "get", reverse("admin_history"), None),
+            "admin_report_detail": lambda: (
+                admin,
+                "get",
+                reverse("admin_report_detail", args=[report.id]),
+                None,
+            ),
+            "admin_schedule_cold": schedule_cold,
+            # Повторные открытия - из кеша (первое прогревает его)
+            "admin_schedule": lambda: (admin, "get", reverse("admin_schedule"), None),
+        }
+
+    # --- Замер ---
+
+    def _measure(self, name, scenario, repeat):
+        """
+        Открывает страницу repeat раз. Возвращает словарь для JSON:
+        запросы и статус последнего открытия, время (мс) - min/median/max.
+        """
+        client = Client()
+        timings = []
+        queries = 0
+        status = None
+
+        for _ in range(repeat):
+            with transaction.atomic():
+                user, method, url, data = scenario()
+                client.force_login(user)
+
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, data)
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                queries = len(ctx.captured_queries)
+                status = response.status_code
+                transaction.set_rollback(True)
+
+        return {
+            "name": name,
+            "url": url,
+            "method": method.upper(),
+            "status": status,
+            "queries": queries,
+            "min_ms": round(min(timings), 2),
+            "median_ms": round(statistics.median(timings), 2),
+            "max_ms": round(max(timings), 2),
+        }
+
+    def _print(self, results, baseline):
+        self.stdout.write(
+            f"{'Страница':<22} | {'Код':>3} | {'Запросов':>8} | "
+            f"{'Медиана, мс':>11} | {'Мин, мс':>8} | {'Разница':>16}"
+        )
+        for row in results:
+            previous = baseline.get(row["name"])
+            diff = ""
+            if previous:
+                diff = (
+                    f"{row['queries'] - previous['queries']:+d} зап. "
+                    f"{row['median_ms'] - previous['median_ms']:+.1f} мс"
+                )
+            self.stdout.write(
+                f"{row['name']:<22} | {row['status']:>3} | {row['queries']:>8} | "
+                f"{row['median_ms']:>11.1f} | {row['min_ms']:>8.1f} | {diff:>16}"
+            )
@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from checklists.media_gc import GC_BATCH_SIZE, GC_MIN_AGE, cleanup_media
+
+
+class Command(BaseCommand):
+    help = (
+        "Ищет файлы фото нарушений без записи в БД и брошенные загрузки. "
+        "По умолчанию только отчет; с --delete - удаляет."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete", action="store_true", help="Удалить найденные файлы."
+        )
+        parser.add_argument(
+            "--min-age-hours",
+            type=int,
+            default=int(GC_MIN_AGE.total_seconds() // 3600),
+            help="Не трогать файлы моложе N часов.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=GC_BATCH_SIZE,
+            help="Сколько файлов сверять с БД за один запрос.",
+        )
+
+    def handle(self, *args, **options):
+        result = cleanup_media(
+            delete=options["delete"],
+            min_age=datetime.timedelta(hours=options["min_age_hours"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(str(result)))
+        if result.orphans and not options["delete"]:
+            self.stdout.write("Для удаления запустите с --delete.")
@@ -0,0 +1,48 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from checklists.scheduling import SCHEDULE_ENGINES
+from checklists.services import generate_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует расписание проверок на N дней вперед "
+        "и выводит отчет о равномерности нагрузки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="Дата начала (ГГГГ-ММ-ДД). По умолчанию - сегодня.",
+        )
+        parser.add_argument(
+            "--days", type=int, default=7, help="На сколько дней генерировать."
+        )
+        parser.add_argument(
+            "--engine",
+            choices=sorted(SCHEDULE_ENGINES),
+            default="round_robin",
+            help="Алгоритм назначения проверяющих.",
+        )
+
+    def handle(self, *args, **options):
+        start_date = options["start"] or timezone.now().date()
+        result = generate_schedule(
+            start_date, options["days"], engine=options["engine"]
+        )
+
+        if not result.ok:
+            self.stderr.write(self.style.ERROR(str(result)))
+            return
+
+        self.stdout.write(self.style.SUCCESS(str(result)))
+
+        report = result.fairness
+        self.stdout.write(str(report))
+        for inspector_id, total in sorted(report.per_inspector.items()):
+            self.stdout.write(f"  Сотрудник #{inspector_id}: {total}")
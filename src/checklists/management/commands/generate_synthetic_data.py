@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from checklists.synthetic import (
+    SyntheticVolumes,
+    clear_synthetic_data,
+    generate_synthetic_data,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими данными заданного объема (участки, шаблоны, "
+        "сотрудники, расписание, отчеты, фото) для нагрузочных замеров "
+        "(benchmark_views). Предыдущие синтетические данные удаляются. "
+        "Только для dev/stage базы!"
+    )
+
+    def add_arguments(self, parser):
+        defaults = SyntheticVolumes()
+        for name, help_text in (
+            ("locations", "Участков."),
+            ("templates_per_location", "Шаблонов на участок."),
+            ("sections", "Разделов в шаблоне."),
+            ("criteria_per_section", "Вопросов в разделе."),
+            ("inspectors", "Сотрудников."),
+            ("days", "За сколько прошедших дней создать отчеты."),
+        ):
+            parser.add_argument(
+                f"--{name.replace('_', '-')}",
+                type=int,
+                default=getattr(defaults, name),
+                help=help_text,
+            )
+        parser.add_argument(
+            "--violation-rate",
+            type=float,
+            default=defaults.violation_rate,
+            help="Доля пунктов с нарушением (0..1).",
+        )
+        parser.add_argument(
+            "--photo-rate",
+            type=float,
+            default=defaults.photo_rate,
+            help="Доля нарушений с фото (0..1).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=defaults.seed, help="Зерно генератора."
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Только удалить синтетические данные.",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            clear_synthetic_data()
+            self.stdout.write(self.style.SUCCESS("Синтетические данные удалены."))
+            return
+
+        volumes = SyntheticVolumes(
+            locations=options["locations"],
+            templates_per_location=options["templates_per_location"],
+            sections=options["sections"],
+            criteria_per_section=options["criteria_per_section"],
+            inspectors=options["inspectors"],
+            days=options["days"],
+            violation_rate=options["violation_rate"],
+            photo_rate=options["photo_rate"],
+            seed=options["seed"],
+        )
+        if (
+            min(volumes.locations, volumes.templates_per_location, volumes.inspectors)
+            < 1
+        ):
+            raise CommandError("Нужен хотя бы один участок, шаблон и сотрудник.")
+
+        result = generate_synthetic_data(volumes)
+        self.stdout.write(self.style.SUCCESS(str(result)))
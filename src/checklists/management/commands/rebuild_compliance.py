@@ -0,0 +1,30 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from checklists.compliance import rebuild_compliance_daily
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает итоги дня (ComplianceDaily) из пунктов завершенных отчетов. "
+        "Нужен при первом запуске и после ручных правок отчетов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="С какой даты (ГГГГ-ММ-ДД). По умолчанию - с начала.",
+        )
+        parser.add_argument(
+            "--end",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="По какую дату включительно. По умолчанию - до конца.",
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_compliance_daily(options["start"], options["end"])
+        self.stdout.write(self.style.SUCCESS(f"Строк итогов: {rows}"))
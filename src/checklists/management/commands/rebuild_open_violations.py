@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from checklists.violations import rebuild_criterion_violations
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает серии нарушений по вопросам (CriterionViolation) "
+        "из истории завершенных отчетов. Нужен после ручных правок отчетов."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_criterion_violations()
+        self.stdout.write(self.style.SUCCESS(f"Открытых нарушений: {count}"))
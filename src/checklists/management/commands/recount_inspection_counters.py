@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from checklists.counters import (
+    COUNTER_FIELDS,
+    COUNTERS_BATCH_SIZE,
+    find_counter_mismatches,
+    recount_inspection_counters,
+)
+
+# Сколько расхождений выводить в отчете --check
+MAX_REPORTED = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счетчики отчетов (пункты, нарушения, фото) по данным БД. "
+        "С --check только ищет расхождения и завершается с ошибкой, если они есть."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить, ничего не менять.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=COUNTERS_BATCH_SIZE,
+            help="Сколько отчетов пересчитывать одним UPDATE.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            updated = recount_inspection_counters(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Пересчитано отчетов: {updated}"))
+            return
+
+        mismatches = find_counter_mismatches()
+        count = mismatches.count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS("Счетчики отчетов сходятся."))
+            return
+
+        for inspection in mismatches[:MAX_REPORTED]:
+            diff = ", ".join(
+                f"{field}: {getattr(inspection, field)} -> "
+                f"{getattr(inspection, f'actual_{field}')}"
+                for field in COUNTER_FIELDS
+                if getattr(inspection, field) != getattr(inspection, f"actual_{field}")
+            )
+            self.stdout.write(f"Отчет #{inspection.id}: {diff}")
+        raise CommandError(
+            f"Расхождений: {count}. Для исправления запустите без --check."
+        )
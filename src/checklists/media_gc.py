@@ -0,0 +1,163 @@
+import datetime
+import os
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils import timezone
+
+from checklists.models import PhotoBlob, PhotoRendition, PhotoUploadSession
+from checklists.uploads import PARTIAL_UPLOAD_DIR, partial_path
+
+# Какие папки MEDIA_ROOT принадлежат фото нарушений
+VIOLATIONS_DIR = "violations"
+
+# Сколько файлов сверяем с БД за один запрос
+GC_BATCH_SIZE = 1000
+
+# Моложе этого файлы не трогаем: их транзакция могла еще не закоммититься
+# (файл пишется на диск раньше, чем строка в БД)
+GC_MIN_AGE = datetime.timedelta(hours=24)
+
+# Незавершенные загрузки по частям старше этого удаляются
+STALE_UPLOAD_AGE = datetime.timedelta(days=2)
+
+
+@dataclass
+class MediaCleanupResult:
+    """
+    Итог проверки медиа: сколько файлов просмотрено и сколько "сирот".
+    """
+
+    scanned: int = 0
+    orphans: int = 0
+    orphan_bytes: int = 0
+    deleted: int = 0
+    stale_uploads: int = 0
+
+    def __str__(self):
+        return (
+            f"Просмотрено файлов: {self.scanned}, без записи в БД: {self.orphans} "
+            f"({self.orphan_bytes / 1024 / 1024:.1f} МБ), удалено: {self.deleted}, "
+            f"брошенных загрузок: {self.stale_uploads}"
+        )
+
+
+def iter_media_files(root, subdir):
+    """
+    Обходит MEDIA_ROOT/subdir потоково (os.scandir), не собирая список файлов.
+    Отдает (имя как в FileField - относительно MEDIA_ROOT через "/", stat).
+    """
+    stack = [os.path.join(root, subdir)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                    yield name, entry.stat(follow_symlinks=False)
+
+
+def _referenced(names):
+    """
+    Какие из names записаны в БД (оригиналы и копии). Один запрос на таблицу,
+    результат читается итератором - в память попадает только эта пачка.
+    """
+    referenced = set()
+    for model in (PhotoBlob, PhotoRendition):
+        referenced.update(
+            model.objects.filter(image__in=names)
+            .values_list("image", flat=True)
+            .iterator(chunk_size=GC_BATCH_SIZE)
+        )
+    return referenced
+
+
+def _check_batch(batch, result, delete):
+    referenced = _referenced(list(batch))
+    for name, (path, size) in batch.items():
+        if name in referenced:
+            continue
+        result.orphans += 1
+        result.orphan_bytes += size
+        if delete:
+            try:
+                os.remove(path)
+                result.deleted += 1
+            except FileNotFoundError:
+                pass
+
+
+def _upload_session_exists(name):
+    # Временный файл называется <uuid сессии>.part
+    try:
+        session_id = uuid.UUID(os.path.splitext(os.path.basename(name))[0])
+    except ValueError:
+        return False
+    return PhotoUploadSession.objects.filter(id=session_id).exists()
+
+
+def cleanup_stale_uploads(delete=False):
+    """
+    Брошенные загрузки по частям (клиент так и не дослал файл).
+    Возвращает количество найденных.
+    """
+    sessions = PhotoUploadSession.objects.filter(
+        updated_at__lt=timezone.now() - STALE_UPLOAD_AGE
+    )
+    count = 0
+    for session in sessions.iterator():
+        count += 1
+        if delete:
+            try:
+                os.remove(partial_path(session))
+            except FileNotFoundError:
+                pass
+            session.delete()
+    return count
+
+
+def cleanup_media(delete=False, min_age=GC_MIN_AGE, batch_size=GC_BATCH_SIZE):
+    """
+    Ищет файлы фото без записи в БД (оставшиеся после удалений, откатов,
+    склейки дублей) и при delete=True удаляет их.
+
+    Память ограничена размером пачки: файлы читаются потоково,
+    а сверка с БД идет по batch_size имен за запрос.
+    """
+    result = MediaCleanupResult()
+    root = str(settings.MEDIA_ROOT)
+    newest = time.time() - min_age.total_seconds()
+
+    batch = {}
+    for name, stat in iter_media_files(root, VIOLATIONS_DIR):
+        result.scanned += 1
+        if stat.st_mtime > newest:
+            continue
+        batch[name] = (os.path.join(root, name), stat.st_size)
+        if len(batch) >= batch_size:
+            _check_batch(batch, result, delete)
+            batch = {}
+    if batch:
+        _check_batch(batch, result, delete)
+
+    # Временные файлы загрузок: сначала брошенные сессии, затем файлы без сессии
+    result.stale_uploads = cleanup_stale_uploads(delete)
+    for name, stat in iter_media_files(root, PARTIAL_UPLOAD_DIR):
+        result.scanned += 1
+        if stat.st_mtime > newest:
+            continue
+        if not _upload_session_exists(name):
+            result.orphans += 1
+            result.orphan_bytes += stat.st_size
+            if delete:
+                os.remove(os.path.join(root, name))
+                result.deleted += 1
+
+    return result
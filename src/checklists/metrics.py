@@ -0,0 +1,149 @@
+import datetime
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+
+# Метрики запросов по страницам (см. RequestMetricsMiddleware)
+METRICS_NAMESPACE = "checklists:metrics"
+
+# Метрики хранятся по дням; неделя истории + запас
+METRICS_TIMEOUT = 60 * 60 * 24 * 8
+METRICS_MAX_DAYS = 7
+
+# Границы корзин гистограммы времени ответа, мс.
+# Перцентили оцениваются по корзинам: "95% запросов быстрее N мс".
+METRICS_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Последняя корзина - все, что медленнее последней границы
+OVERFLOW_BUCKET = "inf"
+
+# Счетчики-суммы (для средних): время ответа, время БД, запросы к БД
+SUM_FIELDS = ("count", "total_ms", "db_ms", "queries")
+
+# Django-админка в сводку не входит
+EXCLUDED_NAMESPACES = {"admin"}
+
+PERCENTILES = (50, 95, 99)
+
+
+def _bucket(duration_ms):
+    for bound in METRICS_BUCKETS_MS:
+        if duration_ms <= bound:
+            return bound
+    return OVERFLOW_BUCKET
+
+
+def _key(date, view_name, field):
+    return f"{METRICS_NAMESPACE}:{date.isoformat()}:{view_name}:{field}"
+
+
+def _incr(key, delta):
+    # incr не создает ключ: первый запрос дня создает его через add
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, METRICS_TIMEOUT):
+            cache.incr(key, delta)
+
+
+def record_request(view_name, duration_ms, db_ms, queries):
+    """
+    Добавляет запрос в дневную гистограмму страницы view_name.
+    Только инкременты в Redis (атомарные, без чтения): корзина + суммы.
+    """
+    today = timezone.now().date()
+    _incr(_key(today, view_name, f"le:{_bucket(duration_ms)}"), 1)
+    for field, value in (
+        ("count", 1),
+        ("total_ms", duration_ms),
+        ("db_ms", db_ms),
+        ("queries", queries),
+    ):
+        # Время - в целых мс: incr работает только с целыми
+        _incr(_key(today, view_name, field), round(value))
+
+
+@lru_cache(maxsize=1)
+def tracked_view_names():
+    """
+    Имена всех страниц проекта ("namespace:name") из URLconf -
+    их метрики и ищем в Redis (отдельного реестра страниц нет).
+    """
+    names = []
+
+    def walk(patterns, namespace):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.namespace in EXCLUDED_NAMESPACES:
+                    continue
+                nested = namespace
+                if pattern.namespace:
+                    nested = f"{namespace}{pattern.namespace}:"
+                walk(pattern.url_patterns, nested)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                names.append(f"{namespace}{pattern.name}")
+
+    walk(get_resolver().url_patterns, "")
+    return sorted(set(names))
+
+
+def _percentile(buckets, count, percent):
+    # Верхняя граница корзины, в которой набирается percent% запросов
+    # (None - медленнее последней границы)
+    threshold = count * percent / 100
+    seen = 0
+    for bound in METRICS_BUCKETS_MS:
+        seen += buckets.get(bound, 0)
+        if seen >= threshold:
+            return bound
+    return None
+
+
+def endpoint_summaries(days=1):
+    """
+    Сводка по страницам за последние days дней (включая сегодня):
+    число запросов, оценки p50/p95/p99 по гистограмме, средние время
+    ответа, время БД и число запросов к БД.
+    Одно чтение Redis (get_many) на все страницы и дни.
+    Самые медленные (по p95, затем по среднему) - первыми.
+    """
+    today = timezone.now().date()
+    dates = [today - datetime.timedelta(days=offset) for offset in range(days)]
+    fields = [*SUM_FIELDS, *(f"le:{bound}" for bound in METRICS_BUCKETS_MS)]
+    fields.append(f"le:{OVERFLOW_BUCKET}")
+
+    views = tracked_view_names()
+    values = cache.get_many(
+        [
+            _key(date, view, field)
+            for date in dates
+            for view in views
+            for field in fields
+        ]
+    )
+
+    rows = []
+    for view in views:
+        totals = {
+            field: sum(values.get(_key(date, view, field), 0) for date in dates)
+            for field in fields
+        }
+        count = totals["count"]
+        if not count:
+            continue
+        buckets = {bound: totals[f"le:{bound}"] for bound in METRICS_BUCKETS_MS}
+        row = {
+            "view": view,
+            "count": count,
+            "avg_ms": round(totals["total_ms"] / count, 1),
+            "avg_db_ms": round(totals["db_ms"] / count, 1),
+            "avg_queries": round(totals["queries"] / count, 1),
+        }
+        for percent in PERCENTILES:
+            row[f"p{percent}"] = _percentile(buckets, count, percent)
+        rows.append(row)
+
+    # None (медленнее последней границы) - хуже любого числа
+    rows.sort(key=lambda row: (row["p95"] or float("inf"), row["avg_ms"]), reverse=True)
+    return rows
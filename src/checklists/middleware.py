@@ -0,0 +1,101 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from checklists.caching import track_cache_stats
+from checklists.metrics import EXCLUDED_NAMESPACES, record_request
+
+logger = logging.getLogger("checklists.metrics")
+
+# Запрос медленнее этого (мс) пишется в лог как WARNING
+DEFAULT_SLOW_REQUEST_MS = 1000
+
+
+class RequestMetricsMiddleware:
+    """
+    Замер каждого запроса: страница, число запросов к БД и их время,
+    попадания в кеш, полное время ответа.
+
+    - Заголовок Server-Timing (видно во вкладке Network браузера);
+    - строка лога "checklists.metrics" (поля - и в тексте, и в extra);
+    - дневная гистограмма страницы в Redis (checklists.metrics,
+      страница "Производительность" в кабинете).
+
+    Ставится в начало MIDDLEWARE, чтобы учесть запросы сессий и авторизации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_MS", DEFAULT_SLOW_REQUEST_MS)
+
+    def __call__(self, request):
+        db = {"queries": 0, "ms": 0.0}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db["queries"] += 1
+                db["ms"] += (time.perf_counter() - started) * 1000
+
+        # База одна (default) - считаем запросы ее соединения
+        started = time.perf_counter()
+        with (
+            connection.execute_wrapper(count_query),
+            track_cache_stats() as cache_stats,
+        ):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        # resolver_match нет у 404 по неизвестному адресу
+        match = request.resolver_match
+        view_name = match.view_name if match else "-"
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={db["ms"]:.1f};desc="{db["queries"]} queries"',
+                f'cache;desc="{cache_stats["hits"]} hits, {cache_stats["misses"]} misses"',
+                f"total;dur={total_ms:.1f}",
+            ]
+        )
+
+        fields = {
+            "view": view_name,
+            "method": request.method,
+            "status": response.status_code,
+            "db_queries": db["queries"],
+            "db_ms": round(db["ms"], 1),
+            "cache_hits": cache_stats["hits"],
+            "cache_misses": cache_stats["misses"],
+            "total_ms": round(total_ms, 1),
+        }
+        logger.log(
+            logging.WARNING if total_ms >= self.slow_ms else logging.INFO,
+            " ".join(f"{name}={value}" for name, value in fields.items()),
+            extra={"metrics": fields},
+        )
+
+        if self._should_record(request, match):
+            try:
+                record_request(view_name, total_ms, db["ms"], db["queries"])
+            except Exception:
+                # Недоступный кеш не должен ронять ответ: метрики не важнее страницы
+                logger.warning(
+                    "Не удалось записать метрики страницы %s",
+                    view_name,
+                    exc_info=True,
+                )
+        return response
+
+    @staticmethod
+    def _should_record(request, match):
+        """
+        В гистограммы попадают только страницы проекта: без неизвестных
+        адресов, статики/медиа и Django-админки.
+        """
+        if match is None or match.namespace in EXCLUDED_NAMESPACES:
+            return False
+        return not request.path.startswith((settings.STATIC_URL, settings.MEDIA_URL))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0005_schedule_is_swapped_swaplog"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SchedulerState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "generated_until",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="Расписание построено до"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Обновлено"),
+                ),
+                (
+                    "last_inspector",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Последний назначенный",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Состояние генератора расписания",
+                "verbose_name_plural": "Состояние генератора расписания",
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0006_schedulerstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CalendarOverride",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True, verbose_name="Дата")),
+                (
+                    "is_working_day",
+                    models.BooleanField(
+                        help_text="Отмечено - день рабочий (перенос на субботу). Не отмечено - выходной.",
+                        verbose_name="Рабочий день",
+                    ),
+                ),
+                (
+                    "comment",
+                    models.CharField(
+                        blank=True, max_length=200, verbose_name="Основание"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Перенос дня",
+                "verbose_name_plural": "Календарь: Переносы дней",
+                "ordering": ["date"],
+            },
+        ),
+    ]
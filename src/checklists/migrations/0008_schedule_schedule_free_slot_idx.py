@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0007_calendaroverride"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(
+                condition=models.Q(("inspection__isnull", True), ("is_swapped", False)),
+                fields=["date", "id"],
+                name="schedule_free_slot_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0008_schedule_schedule_free_slot_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inspection",
+            name="revision",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Ревизия черновика"
+            ),
+        ),
+    ]
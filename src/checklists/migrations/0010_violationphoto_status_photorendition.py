@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    # Старые фото уже показываются как есть - в очередь обработки их не ставим
+    ViolationPhoto = apps.get_model("checklists", "ViolationPhoto")
+    ViolationPhoto.objects.update(status="ready")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0009_inspection_revision"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="violationphoto",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Обрабатывается"),
+                    ("ready", "Готово"),
+                    ("failed", "Ошибка обработки"),
+                ],
+                default="pending",
+                max_length=10,
+                verbose_name="Статус обработки",
+            ),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="PhotoRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("size", models.PositiveSmallIntegerField(verbose_name="Размер, px")),
+                (
+                    "image",
+                    models.ImageField(
+                        upload_to="violations/renditions/%Y/%m/%d/", verbose_name="Файл"
+                    ),
+                ),
+                ("width", models.PositiveSmallIntegerField(verbose_name="Ширина")),
+                ("height", models.PositiveSmallIntegerField(verbose_name="Высота")),
+                (
+                    "photo",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="checklists.violationphoto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Копия фото",
+                "verbose_name_plural": "Копии фото",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("photo", "size"), name="unique_photo_rendition_size"
+                    )
+                ],
+            },
+        ),
+    ]
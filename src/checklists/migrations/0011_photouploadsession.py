@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:23
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0010_violationphoto_status_photorendition"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PhotoUploadSession",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(max_length=255, verbose_name="Имя файла"),
+                ),
+                (
+                    "total_size",
+                    models.PositiveBigIntegerField(verbose_name="Размер файла, байт"),
+                ),
+                (
+                    "received",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Получено, байт"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_sessions",
+                        to="checklists.inspectionitem",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Загрузка фото",
+                "verbose_name_plural": "Загрузки фото (незавершенные)",
+            },
+        ),
+    ]
@@ -0,0 +1,188 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:40
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import checklists.models
+
+
+def file_sha256(field_file):
+    """
+    Хеш содержимого файла. Если файла на диске нет - хеш от пути,
+    чтобы такие фото не склеились между собой.
+    """
+    digest = hashlib.sha256()
+    try:
+        with field_file.open("rb") as file:
+            for chunk in file.chunks():
+                digest.update(chunk)
+    except (FileNotFoundError, ValueError):
+        return hashlib.sha256(f"missing:{field_file.name}".encode()).hexdigest()
+    return digest.hexdigest()
+
+
+def photos_to_blobs(apps, schema_editor):
+    """
+    Существующие фото -> PhotoBlob по хешу содержимого.
+    Файлы не переносятся: блоб ссылается на старый путь.
+    Одинаковые фото склеиваются в один блоб; лишние файлы-дубли
+    и их копии подберет очистка медиа (cleanup_media).
+    """
+    ViolationPhoto = apps.get_model("checklists", "ViolationPhoto")
+    PhotoBlob = apps.get_model("checklists", "PhotoBlob")
+    PhotoRendition = apps.get_model("checklists", "PhotoRendition")
+
+    blobs = {}
+    for photo in ViolationPhoto.objects.order_by("id").iterator():
+        sha256 = file_sha256(photo.image)
+        blob = blobs.get(sha256)
+        if blob is None:
+            blob = PhotoBlob.objects.create(
+                sha256=sha256, image=photo.image.name, status=photo.status
+            )
+            blobs[sha256] = blob
+        blob.ref_count += 1
+        photo.blob = blob
+        photo.save(update_fields=["blob"])
+
+    for blob in blobs.values():
+        blob.save(update_fields=["ref_count"])
+
+    # Копии переходят к блобу; у склеенных фото оставляем по одной на размер
+    seen = set()
+    for rendition in PhotoRendition.objects.select_related("photo").order_by("id"):
+        key = (rendition.photo.blob_id, rendition.size)
+        if key in seen:
+            rendition.delete()
+            continue
+        seen.add(key)
+        rendition.blob_id = rendition.photo.blob_id
+        rendition.save(update_fields=["blob"])
+
+
+class Migration(migrations.Migration):
+    # Перенос данных идет в своей транзакции: на Postgres изменение схемы
+    # после записи FK-строк в той же транзакции падает на отложенных
+    # проверках ("pending trigger events")
+    atomic = False
+
+    dependencies = [
+        ("checklists", "0011_photouploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PhotoBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="SHA-256"
+                    ),
+                ),
+                (
+                    "image",
+                    models.ImageField(
+                        upload_to=checklists.models.photo_blob_upload_to,
+                        verbose_name="Фото",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Обрабатывается"),
+                            ("ready", "Готово"),
+                            ("failed", "Ошибка обработки"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус обработки",
+                    ),
+                ),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Ссылок"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Файл фото",
+                "verbose_name_plural": "Файлы фото",
+            },
+        ),
+        migrations.AddField(
+            model_name="violationphoto",
+            name="blob",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="photos",
+                to="checklists.photoblob",
+                verbose_name="Файл",
+            ),
+        ),
+        migrations.RemoveConstraint(
+            model_name="photorendition",
+            name="unique_photo_rendition_size",
+        ),
+        migrations.AddField(
+            model_name="photorendition",
+            name="blob",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="renditions",
+                to="checklists.photoblob",
+            ),
+        ),
+        migrations.RunPython(photos_to_blobs, migrations.RunPython.noop, atomic=True),
+        migrations.RemoveField(
+            model_name="photorendition",
+            name="photo",
+        ),
+        migrations.AlterField(
+            model_name="photorendition",
+            name="blob",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="renditions",
+                to="checklists.photoblob",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="photorendition",
+            constraint=models.UniqueConstraint(
+                fields=("blob", "size"), name="unique_blob_rendition_size"
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="violationphoto",
+            name="image",
+        ),
+        migrations.RemoveField(
+            model_name="violationphoto",
+            name="status",
+        ),
+        migrations.AlterField(
+            model_name="violationphoto",
+            name="blob",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="photos",
+                to="checklists.photoblob",
+                verbose_name="Файл",
+            ),
+        ),
+    ]
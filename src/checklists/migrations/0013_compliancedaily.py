@@ -0,0 +1,130 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_compliance_daily(apps, schema_editor):
+    # Итоги по уже завершенным отчетам (дальше пополняются при завершении).
+    # От отчетов, а не от пунктов: отчет без пунктов тоже учитывается
+    Inspection = apps.get_model("checklists", "Inspection")
+    ComplianceDaily = apps.get_model("checklists", "ComplianceDaily")
+
+    rows = (
+        Inspection.objects.filter(is_completed=True)
+        .order_by()
+        .values_list(
+            "date_check", "template_id", "template__location_id", "inspector_id"
+        )
+        .annotate(
+            inspections=models.Count("id", distinct=True),
+            total=models.Count("items"),
+            compliant=models.Count("items", filter=models.Q(items__is_compliant=True)),
+        )
+    )
+    ComplianceDaily.objects.bulk_create(
+        (
+            ComplianceDaily(
+                date=date,
+                template_id=template_id,
+                location_id=location_id,
+                inspector_id=inspector_id,
+                inspections_count=inspections,
+                total_items=total,
+                compliant_items=compliant,
+                score=round(compliant * 100 / total, 2) if total else 100.0,
+            )
+            for (
+                date,
+                template_id,
+                location_id,
+                inspector_id,
+                inspections,
+                total,
+                compliant,
+            ) in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0012_photoblob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ComplianceDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Дата")),
+                (
+                    "inspections_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Отчетов"),
+                ),
+                (
+                    "total_items",
+                    models.PositiveIntegerField(default=0, verbose_name="Пунктов"),
+                ),
+                (
+                    "compliant_items",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Без нарушений"
+                    ),
+                ),
+                ("score", models.FloatField(default=0, verbose_name="Балл, %")),
+                (
+                    "inspector",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Проверяющий",
+                    ),
+                ),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="checklists.location",
+                        verbose_name="Участок",
+                    ),
+                ),
+                (
+                    "template",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="checklists.checklisttemplate",
+                        verbose_name="Шаблон",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Итоги дня",
+                "verbose_name_plural": "Аналитика: Итоги по дням",
+                "indexes": [
+                    models.Index(fields=["date"], name="compliance_daily_date_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "template", "location", "inspector"),
+                        name="unique_compliance_daily",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_compliance_daily, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:31
+
+from django.db import migrations, models
+
+
+def _count(queryset, group_by):
+    # COUNT по связанной таблице подзапросом (0, если строк нет)
+    return models.functions.Coalesce(
+        models.Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(count=models.Count("id"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    # Счетчики существующих отчетов - одним UPDATE с подзапросами
+    Inspection = apps.get_model("checklists", "Inspection")
+    InspectionItem = apps.get_model("checklists", "InspectionItem")
+    ViolationPhoto = apps.get_model("checklists", "ViolationPhoto")
+
+    items = InspectionItem.objects.filter(inspection=models.OuterRef("pk"))
+    photos = ViolationPhoto.objects.filter(item__inspection=models.OuterRef("pk"))
+    Inspection.objects.update(
+        items_total=_count(items, "inspection"),
+        violations_total=_count(items.filter(is_compliant=False), "inspection"),
+        photos_total=_count(photos, "item__inspection"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0013_compliancedaily"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inspection",
+            name="items_total",
+            field=models.PositiveIntegerField(default=0, verbose_name="Пунктов"),
+        ),
+        migrations.AddField(
+            model_name="inspection",
+            name="photos_total",
+            field=models.PositiveIntegerField(default=0, verbose_name="Фото"),
+        ),
+        migrations.AddField(
+            model_name="inspection",
+            name="violations_total",
+            field=models.PositiveIntegerField(default=0, verbose_name="Нарушений"),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0014_inspection_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inspection",
+            index=models.Index(
+                condition=models.Q(("is_completed", True)),
+                fields=["-date_check", "-created_at", "-id"],
+                name="inspection_history_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_criterion_violations(apps, schema_editor):
+    # Открытые нарушения по истории: для каждого вопроса - последний ответ
+    InspectionItem = apps.get_model("checklists", "InspectionItem")
+    CriterionViolation = apps.get_model("checklists", "CriterionViolation")
+
+    items = (
+        InspectionItem.objects.filter(
+            inspection__is_completed=True, criteria_origin__isnull=False
+        )
+        .order_by("inspection__date_check", "inspection__created_at", "id")
+        .values_list(
+            "id", "criteria_origin_id", "is_compliant", "inspection__date_check"
+        )
+    )
+    latest = {}
+    for item_id, criteria_id, is_compliant, date_check in items.iterator():
+        latest[criteria_id] = (
+            None
+            if is_compliant
+            else CriterionViolation(
+                criteria_id=criteria_id, item_id=item_id, date_check=date_check
+            )
+        )
+    CriterionViolation.objects.bulk_create(
+        [violation for violation in latest.values() if violation], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0015_inspection_history_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CriterionViolation",
+            fields=[
+                (
+                    "criteria",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="open_violation",
+                        serialize=False,
+                        to="checklists.checklistcriteria",
+                        verbose_name="Вопрос",
+                    ),
+                ),
+                ("date_check", models.DateField(verbose_name="Дата нарушения")),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="checklists.inspectionitem",
+                        verbose_name="Пункт отчета",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Открытое нарушение",
+                "verbose_name_plural": "Аналитика: Открытые нарушения",
+            },
+        ),
+        migrations.RunPython(fill_criterion_violations, migrations.RunPython.noop),
+    ]
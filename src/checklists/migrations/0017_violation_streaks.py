@@ -0,0 +1,115 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_violation_streaks(apps, schema_editor):
+    # Серии нарушений по истории: ответы по вопросу - по порядку отчетов
+    InspectionItem = apps.get_model("checklists", "InspectionItem")
+    CriterionViolation = apps.get_model("checklists", "CriterionViolation")
+
+    items = (
+        InspectionItem.objects.filter(
+            inspection__is_completed=True, criteria_origin__isnull=False
+        )
+        .order_by("inspection__date_check", "inspection__created_at", "id")
+        .values_list(
+            "id", "criteria_origin_id", "is_compliant", "inspection__date_check"
+        )
+    )
+    states = {}
+    for item_id, criteria_id, is_compliant, date_check in items.iterator():
+        state = states.get(criteria_id)
+        if is_compliant:
+            if state is not None and state.is_open:
+                state.is_open = False
+                state.resolved_on = date_check
+            continue
+        if state is None:
+            state = states[criteria_id] = CriterionViolation(
+                criteria_id=criteria_id, first_seen=date_check, consecutive=0
+            )
+        elif not state.is_open:
+            state.is_open = True
+            state.first_seen = date_check
+            state.consecutive = 0
+            state.reopened += 1
+        state.consecutive += 1
+        state.item_id = item_id
+        state.last_seen = date_check
+
+    CriterionViolation.objects.all().delete()
+    CriterionViolation.objects.bulk_create(states.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0016_criterionviolation"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="criterionviolation",
+            options={
+                "verbose_name": "Нарушение по вопросу",
+                "verbose_name_plural": "Аналитика: Нарушения по вопросам",
+            },
+        ),
+        migrations.RenameField(
+            model_name="criterionviolation",
+            old_name="date_check",
+            new_name="last_seen",
+        ),
+        migrations.AlterField(
+            model_name="criterionviolation",
+            name="last_seen",
+            field=models.DateField(verbose_name="Последнее нарушение"),
+        ),
+        migrations.AlterField(
+            model_name="criterionviolation",
+            name="criteria",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                primary_key=True,
+                related_name="violation",
+                serialize=False,
+                to="checklists.checklistcriteria",
+                verbose_name="Вопрос",
+            ),
+        ),
+        migrations.AddField(
+            model_name="criterionviolation",
+            name="is_open",
+            field=models.BooleanField(default=True, verbose_name="Не устранено"),
+        ),
+        migrations.AddField(
+            model_name="criterionviolation",
+            name="consecutive",
+            field=models.PositiveIntegerField(
+                default=1, verbose_name="Проверок подряд"
+            ),
+        ),
+        migrations.AddField(
+            model_name="criterionviolation",
+            name="reopened",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Появлялось снова"
+            ),
+        ),
+        migrations.AddField(
+            model_name="criterionviolation",
+            name="resolved_on",
+            field=models.DateField(
+                blank=True, null=True, verbose_name="Последнее устранение"
+            ),
+        ),
+        # Сначала NULL; обязательным поле становится в 0019, отдельной
+        # миграцией после пересчета истории
+        migrations.AddField(
+            model_name="criterionviolation",
+            name="first_seen",
+            field=models.DateField(null=True, verbose_name="Начало серии"),
+        ),
+        migrations.RunPython(fill_violation_streaks, migrations.RunPython.noop),
+    ]
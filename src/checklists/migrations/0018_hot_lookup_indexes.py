@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checklists", "0017_violation_streaks"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inspection",
+            index=models.Index(
+                condition=models.Q(("is_completed", True)),
+                fields=["template", "-date_check"],
+                name="inspection_template_done_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inspection",
+            index=models.Index(
+                fields=["inspector", "-created_at"], name="inspection_inspector_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inspectionitem",
+            index=models.Index(
+                fields=["inspection", "is_compliant"],
+                name="inspection_item_compliance_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(
+                fields=["inspector", "date"], name="schedule_inspector_date_idx"
+            ),
+        ),
+        # Одиночные индексы по FK заменены составными (префикс - тот же FK)
+        migrations.AlterField(
+            model_name="inspection",
+            name="inspector",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Проверяющий",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="inspectionitem",
+            name="inspection",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="items",
+                to="checklists.inspection",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="schedule",
+            name="inspector",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="schedule_items",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Назначенный сотрудник",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Отдельно от пересчета в 0017: на Postgres изменение схемы после
+    # записи строк в той же транзакции падает ("pending trigger events")
+    dependencies = [
+        ("checklists", "0018_hot_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="criterionviolation",
+            name="first_seen",
+            field=models.DateField(verbose_name="Начало серии"),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import os
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
@@ -100,8 +103,12 @@ class Inspection(models.Model):
     Шапка отчета о проверке.
     """
 
+    # Отдельный индекс по FK не нужен: его заменяет inspection_inspector_idx
     inspector = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, verbose_name="Проверяющий"
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        db_index=False,
+        verbose_name="Проверяющий",
     )
     template = models.ForeignKey(
         ChecklistTemplate,
@@ -117,6 +124,18 @@ class Inspection(models.Model):
     # Статус отчета (опционально, на будущее)
     is_completed = models.BooleanField("Проверка завершена", default=False)
 
+    # Ревизия черновика: растет при каждом сохранении (оптимистичная блокировка
+    # для автосохранения, чтобы две вкладки не затирали друг друга)
+    revision = models.PositiveIntegerField("Ревизия черновика", default=0)
+
+    # --- СЧЕТЧИКИ (денормализация для журнала) ---
+    # Ведутся при сохранении отчета (services.py, сигналы удаления фото),
+    # чтобы списки не пересчитывали пункты через COUNT.
+    # Сверка/пересчет: manage.py recount_inspection_counters
+    items_total = models.PositiveIntegerField("Пунктов", default=0)
+    violations_total = models.PositiveIntegerField("Нарушений", default=0)
+    photos_total = models.PositiveIntegerField("Фото", default=0)
+
     def __str__(self):
         return f"Отчет от {self.date_check} - {self.location_snapshot}"
 
@@ -129,6 +148,29 @@ class Inspection(models.Model):
         # Уникальная пара: Шаблон + Дата
         unique_together = ["template", "date_check"]
 
+        indexes = [
+            # Журнал проверок: постраничный вывод по ключу (см. history.py).
+            # Порядок колонок совпадает с сортировкой журнала, в индекс
+            # попадают только завершенные отчеты.
+            models.Index(
+                fields=["-date_check", "-created_at", "-id"],
+                condition=models.Q(is_completed=True),
+                name="inspection_history_idx",
+            ),
+            # Завершенные отчеты шаблона по дате: журнал с фильтром по шаблону,
+            # история пунктов для формы, аналитика по периоду
+            models.Index(
+                fields=["template", "-date_check"],
+                condition=models.Q(is_completed=True),
+                name="inspection_template_done_idx",
+            ),
+            # Кабинет сотрудника: последние отчеты проверяющего
+            models.Index(
+                fields=["inspector", "-created_at"],
+                name="inspection_inspector_idx",
+            ),
+        ]
+
 
 class InspectionItem(models.Model):
     """
@@ -136,8 +178,9 @@ class InspectionItem(models.Model):
     Хранит копию вопроса на момент создания отчета.
     """
 
+    # Индекс по FK - префикс inspection_item_compliance_idx
     inspection = models.ForeignKey(
-        Inspection, on_delete=models.CASCADE, related_name="items"
+        Inspection, on_delete=models.CASCADE, related_name="items", db_index=False
     )
 
     # Ссылка на оригинал (может быть null, если вопрос удалили из справочника)
@@ -173,16 +216,71 @@ class InspectionItem(models.Model):
         verbose_name = "Результат пункта"
         verbose_name_plural = "Результаты пунктов"
 
+        indexes = [
+            # Итоги и счетчики отчета: COUNT пунктов/нарушений одного отчета
+            # читается из индекса, без обращения к строкам таблицы
+            models.Index(
+                fields=["inspection", "is_compliant"],
+                name="inspection_item_compliance_idx",
+            ),
+        ]
+
+
+def photo_blob_upload_to(instance, filename):
+    # Путь по хешу содержимого: violations/blobs/ab/abcdef....jpg
+    ext = os.path.splitext(filename)[1].lower()
+    return f"violations/blobs/{instance.sha256[:2]}/{instance.sha256}{ext}"
+
+
+class PhotoBlob(models.Model):
+    """
+    Файл фото, адресуемый по хешу содержимого (SHA-256).
+    Одинаковые фото (повторная загрузка, одно фото к нескольким пунктам)
+    хранятся на диске один раз, а ViolationPhoto ссылаются на общий файл.
+    ref_count - сколько ViolationPhoto ссылается; на нуле файл удаляется.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_READY = "ready"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Обрабатывается"),
+        (STATUS_READY, "Готово"),
+        (STATUS_FAILED, "Ошибка обработки"),
+    ]
+
+    # Хеш ИСХОДНОГО файла с телефона (до конвертации в JPEG)
+    sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    image = models.ImageField("Фото", upload_to=photo_blob_upload_to)
+    # Оригинал с телефона сначала сохраняется как есть, потом Celery
+    # приводит его к JPEG и делает уменьшенные копии (PhotoRendition)
+    status = models.CharField(
+        "Статус обработки",
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    ref_count = models.PositiveIntegerField("Ссылок", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Файл фото"
+        verbose_name_plural = "Файлы фото"
+
 
 class ViolationPhoto(models.Model):
     """
     Фотографии нарушений.
+    Сам файл - в PhotoBlob (общий для одинаковых фото).
     """
 
     item = models.ForeignKey(
         InspectionItem, on_delete=models.CASCADE, related_name="photos"
     )
-    image = models.ImageField("Фото", upload_to="violations/%Y/%m/%d/")
+    # PROTECT: файл удаляется только через счетчик ссылок (см. signals)
+    blob = models.ForeignKey(
+        PhotoBlob, on_delete=models.PROTECT, related_name="photos", verbose_name="Файл"
+    )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -190,6 +288,55 @@ class ViolationPhoto(models.Model):
         verbose_name_plural = "Фото нарушений"
 
 
+class PhotoRendition(models.Model):
+    """
+    Уменьшенная копия фото нарушения (превью для списка, версия для экрана).
+    Оригинал открывается только по клику.
+    """
+
+    blob = models.ForeignKey(
+        PhotoBlob, on_delete=models.CASCADE, related_name="renditions"
+    )
+    # Длинная сторона в пикселях (см. checklists.photos.RENDITION_SIZES)
+    size = models.PositiveSmallIntegerField("Размер, px")
+    image = models.ImageField("Файл", upload_to="violations/renditions/%Y/%m/%d/")
+    width = models.PositiveSmallIntegerField("Ширина")
+    height = models.PositiveSmallIntegerField("Высота")
+
+    class Meta:
+        verbose_name = "Копия фото"
+        verbose_name_plural = "Копии фото"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["blob", "size"], name="unique_blob_rendition_size"
+            )
+        ]
+
+
+class PhotoUploadSession(models.Model):
+    """
+    Загрузка фото по частям (докачка при обрыве Wi-Fi).
+    Части дописываются во временный файл; последняя часть создает ViolationPhoto,
+    после чего сессия удаляется.
+    """
+
+    # UUID вместо числового ID: его нельзя подобрать перебором
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    item = models.ForeignKey(
+        InspectionItem, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    filename = models.CharField("Имя файла", max_length=255)
+    total_size = models.PositiveBigIntegerField("Размер файла, байт")
+    # Сколько байт уже получено (смещение следующей части)
+    received = models.PositiveBigIntegerField("Получено, байт", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Загрузка фото"
+        verbose_name_plural = "Загрузки фото (незавершенные)"
+
+
 class Schedule(models.Model):
     """
     План-график проверок.
@@ -197,9 +344,11 @@ class Schedule(models.Model):
     """
 
     # Кто проверяет? (Вася)
+    # Индекс по FK - префикс schedule_inspector_date_idx
     inspector = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name="schedule_items",
         verbose_name="Назначенный сотрудник",
     )
@@ -235,11 +384,91 @@ class Schedule(models.Model):
         # (Если у вас по бизнес-логике можно проверять один цех 2 раза в день — убери эту строку).
         unique_together = ["template", "date"]
 
+        indexes = [
+            # Поиск кандидата для автозамены: первый свободный "чистый" слот.
+            # Частичный индекс содержит только такие слоты, поэтому остается
+            # маленьким, сколько бы ни росло расписание.
+            models.Index(
+                fields=["date", "id"],
+                condition=models.Q(inspection__isnull=True, is_swapped=False),
+                name="schedule_free_slot_idx",
+            ),
+            # Кабинет и старт проверки: задания сотрудника на день/неделю
+            models.Index(
+                fields=["inspector", "date"],
+                name="schedule_inspector_date_idx",
+            ),
+        ]
+
         ordering = ["date", "template"]
         verbose_name = "Запись в расписании"
         verbose_name_plural = "График проверок"
 
 
+class SchedulerState(models.Model):
+    """
+    Состояние автогенератора расписания (всегда одна строка, pk=1).
+    Курсор очереди Round Robin хранится здесь, а не вычисляется
+    по последней записи расписания.
+    """
+
+    # Кто был назначен последним (следующим будет следующий по ID)
+    last_inspector = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Последний назначенный",
+    )
+    # До какой даты (включительно) расписание уже построено
+    generated_until = models.DateField("Расписание построено до", null=True, blank=True)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    def __str__(self):
+        return f"Расписание построено до {self.generated_until or '-'}"
+
+    @classmethod
+    def load(cls, for_update=False):
+        """
+        Возвращает единственную строку состояния (создает при первом обращении).
+        for_update=True - блокирует строку до конца транзакции.
+        """
+        state, _ = cls.objects.get_or_create(pk=1)
+        if for_update:
+            state = cls.objects.select_for_update().get(pk=1)
+        return state
+
+    class Meta:
+        verbose_name = "Состояние генератора расписания"
+        verbose_name_plural = "Состояние генератора расписания"
+
+
+class CalendarOverride(models.Model):
+    """
+    Ручная правка производственного календаря.
+    Нужна для официальных переносов (постановление Совмина), которых
+    еще нет в библиотеке holidays: рабочая суббота или дополнительный выходной.
+    """
+
+    date = models.DateField("Дата", unique=True)
+    is_working_day = models.BooleanField(
+        "Рабочий день",
+        help_text="Отмечено - день рабочий (перенос на субботу). "
+        "Не отмечено - выходной.",
+    )
+    comment = models.CharField("Основание", max_length=200, blank=True)
+
+    def __str__(self):
+        kind = "Рабочий" if self.is_working_day else "Выходной"
+        return f"{self.date}: {kind}"
+
+    class Meta:
+        ordering = ["date"]
+        verbose_name = "Перенос дня"
+        verbose_name_plural = "Календарь: Переносы дней"
+
+
 class SwapLog(models.Model):
     """
     История замен (кто, когда и почему отказался).
@@ -275,3 +504,96 @@ class SwapLog(models.Model):
         verbose_name = "История замен"
         verbose_name_plural = "Журнал: Замены"
         ordering = ["-created_at"]
+
+
+# ==========================================
+# БЛОК 3: АНАЛИТИКА (Предрасчитанные итоги)
+# ==========================================
+
+
+class ComplianceDaily(models.Model):
+    """
+    Итоги проверок за день: шаблон + участок + проверяющий + дата.
+    Пополняется при завершении отчета (checklists.compliance), поэтому
+    дашборды читают сотни готовых строк, а не все пункты всех отчетов.
+    Месячные итоги считаются из этой же таблицы.
+    """
+
+    date = models.DateField("Дата")
+    template = models.ForeignKey(
+        ChecklistTemplate,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Шаблон",
+    )
+    location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name="+", verbose_name="Участок"
+    )
+    inspector = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Проверяющий",
+    )
+    inspections_count = models.PositiveIntegerField("Отчетов", default=0)
+    total_items = models.PositiveIntegerField("Пунктов", default=0)
+    compliant_items = models.PositiveIntegerField("Без нарушений", default=0)
+    # Процент пунктов без нарушений (0-100)
+    score = models.FloatField("Балл, %", default=0)
+
+    class Meta:
+        verbose_name = "Итоги дня"
+        verbose_name_plural = "Аналитика: Итоги по дням"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "template", "location", "inspector"],
+                name="unique_compliance_daily",
+            )
+        ]
+        indexes = [models.Index(fields=["date"], name="compliance_daily_date_idx")]
+
+
+class CriterionViolation(models.Model):
+    """
+    Состояние нарушений по вопросу справочника (одна строка на вопрос):
+    открыто ли нарушение сейчас, с какой даты длится серия, сколько
+    проверок подряд и сколько раз нарушение появлялось снова после устранения.
+
+    Ведется при завершении отчета (checklists.violations) - пошагово,
+    по ответам нового отчета, без оконных запросов по истории пунктов.
+    Форма проверки берет открытые нарушения всех вопросов одним запросом
+    по ключу criteria_id.
+    """
+
+    criteria = models.OneToOneField(
+        ChecklistCriteria,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="violation",
+        verbose_name="Вопрос",
+    )
+    # Последний пункт с нарушением (комментарий и фото берем из него)
+    item = models.ForeignKey(
+        InspectionItem,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Пункт отчета",
+    )
+    is_open = models.BooleanField("Не устранено", default=True)
+
+    # Текущая (или последняя) серия нарушений подряд
+    first_seen = models.DateField("Начало серии")
+    # Дата отчета последнего нарушения (копия - чтобы не JOIN-ить отчет)
+    last_seen = models.DateField("Последнее нарушение")
+    consecutive = models.PositiveIntegerField("Проверок подряд", default=1)
+
+    # Повторы: нарушение устранили, а потом оно появилось снова
+    reopened = models.PositiveIntegerField("Появлялось снова", default=0)
+    resolved_on = models.DateField("Последнее устранение", null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.criteria} ({self.first_seen} - {self.last_seen})"
+
+    class Meta:
+        verbose_name = "Нарушение по вопросу"
+        verbose_name_plural = "Аналитика: Нарушения по вопросам"
@@ -0,0 +1,303 @@
+import hashlib
+import io
+import os
+from collections import Counter, defaultdict
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Greatest
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+from checklists.models import PhotoBlob, PhotoRendition, ViolationPhoto
+
+# HEIC (iPhone) Pillow сам не читает - нужен плагин pillow-heif.
+# Без него HEIC-фото получат статус "Ошибка обработки".
+try:
+    from pillow_heif import register_heif_opener
+except ImportError:
+    pass
+else:
+    register_heif_opener()
+
+# Длинная сторона копий в пикселях
+THUMB_SIZE = 320  # Превью в форме и отчете
+WEB_SIZE = 1280  # Просмотр на экране
+RENDITION_SIZES = (THUMB_SIZE, WEB_SIZE)
+
+JPEG_QUALITY = 85
+
+# Сколько раз повторять запись блоба при гонке одинаковых загрузок
+BLOB_CREATE_ATTEMPTS = 3
+
+
+# ==========================================
+# Работа с изображением (Pillow)
+# ==========================================
+
+
+def _to_jpeg(image, max_size=None):
+    """
+    Приводит картинку к JPEG без EXIF (GPS, модель телефона и т.п.).
+    max_size - ограничение длинной стороны (пропорции сохраняются).
+    Возвращает (байты, ширина, высота).
+    """
+    if max_size:
+        image = image.copy()
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    # EXIF не передаем - в файл он не попадет
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), image.width, image.height
+
+
+def _open_normalized(file):
+    """
+    Открывает фото и поворачивает по EXIF-ориентации
+    (телефон пишет "повернуть на 90", а пиксели хранит как есть).
+    """
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        # PNG с прозрачностью, HEIC в 16 бит и т.п. -> обычный RGB
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.load()
+        return image
+
+
+def _jpeg_name(path, suffix=""):
+    base = os.path.splitext(os.path.basename(path))[0]
+    return f"{base}{suffix}.jpg"
+
+
+def _build_rendition(blob, image, size):
+    """
+    Уменьшенная копия: файл пишется на диск сразу, запись в БД - не сохраняется.
+    """
+    data, width, height = _to_jpeg(image, max_size=size)
+    rendition = PhotoRendition(blob=blob, size=size, width=width, height=height)
+    rendition.image.save(
+        _jpeg_name(blob.image.name, f"_{size}"), ContentFile(data), save=False
+    )
+    return rendition
+
+
+# ==========================================
+# Хранение по хешу содержимого (дедупликация)
+# ==========================================
+
+
+def file_sha256(file):
+    """
+    SHA-256 загруженного файла. Читается кусками, в память целиком не попадает.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def store_blobs(files):
+    """
+    Сохраняет файлы по хешу содержимого и увеличивает счетчики ссылок.
+    Файл, который уже есть на диске (то же фото еще раз), повторно не пишется.
+
+    Возвращает (блобы в порядке files, новые блобы - их нужно обработать).
+    Вызывать внутри транзакции вместе с созданием ViolationPhoto.
+    """
+    hashes = [file_sha256(file) for file in files]
+    refs = Counter(hashes)
+    # Одинаковое число ссылок - один UPDATE (обычно все по 1)
+    shas_by_refs = defaultdict(list)
+    for sha256, count in refs.items():
+        shas_by_refs[count].append(sha256)
+
+    for _ in range(BLOB_CREATE_ATTEMPTS):
+        new_blobs = []
+        try:
+            with transaction.atomic():
+                # Сначала увеличиваем счетчики: UPDATE блокирует строки,
+                # и параллельное удаление "последней ссылки" блоб уже не снесет
+                for count, shas in shas_by_refs.items():
+                    PhotoBlob.objects.filter(sha256__in=shas).update(
+                        ref_count=F("ref_count") + count
+                    )
+                blobs = PhotoBlob.objects.in_bulk(refs, field_name="sha256")
+
+                for sha256, file in zip(hashes, files):
+                    if sha256 not in blobs:
+                        blobs[sha256] = PhotoBlob(
+                            sha256=sha256, image=file, ref_count=refs[sha256]
+                        )
+                        new_blobs.append(blobs[sha256])
+                # Файлы сохраняются в хранилище при вставке (FileField.pre_save)
+                PhotoBlob.objects.bulk_create(new_blobs)
+        except IntegrityError:
+            # Такой же файл параллельно загрузил кто-то еще - наш дубль убираем
+            # и повторяем: теперь блоб найдется среди существующих
+            for blob in new_blobs:
+                if blob.image.name:
+                    blob.image.storage.delete(blob.image.name)
+            continue
+        return [blobs[sha256] for sha256 in hashes], new_blobs
+
+    raise IntegrityError("Не удалось сохранить фото: конфликт при записи файла.")
+
+
+def release_blobs(blob_ids):
+    """
+    Уменьшает счетчики ссылок (по одному на каждый ID в blob_ids) и удаляет
+    блобы, на которые больше никто не ссылается. Файлы (оригинал и копии)
+    удаляются с диска после COMMIT.
+    """
+    with transaction.atomic():
+        for blob_id, count in Counter(blob_ids).items():
+            PhotoBlob.objects.filter(id=blob_id).update(
+                ref_count=Greatest(F("ref_count") - count, 0)
+            )
+
+        # Дополнительно проверяем, что ссылок действительно нет
+        # (счетчик мог разойтись, например после ручной правки в админке)
+        orphans = list(
+            PhotoBlob.objects.select_for_update()
+            .filter(id__in=set(blob_ids), ref_count=0)
+            .exclude(Exists(ViolationPhoto.objects.filter(blob=OuterRef("pk"))))
+            .prefetch_related("renditions")
+        )
+        if not orphans:
+            return
+
+        names = []
+        for blob in orphans:
+            names.append(blob.image.name)
+            names.extend(rendition.image.name for rendition in blob.renditions.all())
+        PhotoBlob.objects.filter(id__in=[blob.id for blob in orphans]).delete()
+
+        storage = PhotoBlob._meta.get_field("image").storage
+
+        def delete_files():
+            for name in names:
+                storage.delete(name)
+
+        transaction.on_commit(delete_files)
+
+
+# ==========================================
+# Обработка загруженного фото (вызывается из Celery)
+# ==========================================
+
+
+def process_blob(blob_id):
+    """
+    Нормализует оригинал (JPEG, ориентация, без EXIF) и создает копии
+    RENDITION_SIZES. Повторный запуск безопасен: готовые фото пропускаются.
+    Возвращает итоговый статус.
+    """
+    blob = PhotoBlob.objects.filter(id=blob_id).first()
+    if blob is None:
+        # Фото удалили раньше, чем очередь до него дошла
+        return None
+    if blob.status == PhotoBlob.STATUS_READY:
+        return blob.status
+
+    try:
+        with blob.image.open("rb") as file:
+            image = _open_normalized(file)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        PhotoBlob.objects.filter(id=blob.id).update(status=PhotoBlob.STATUS_FAILED)
+        return PhotoBlob.STATUS_FAILED
+
+    raw_name = blob.image.name
+    content, _, _ = _to_jpeg(image)
+    renditions = [_build_rendition(blob, image, size) for size in RENDITION_SIZES]
+
+    # Нормализованный оригинал заменяет сырой файл с телефона
+    blob.image.save(_jpeg_name(raw_name), ContentFile(content), save=False)
+    blob.status = PhotoBlob.STATUS_READY
+
+    with transaction.atomic():
+        updated = PhotoBlob.objects.filter(id=blob.id).update(
+            image=blob.image.name, status=blob.status
+        )
+        if updated:
+            PhotoRendition.objects.filter(blob=blob).delete()
+            PhotoRendition.objects.bulk_create(renditions)
+
+    storage = blob.image.storage
+    if not updated:
+        # Фото удалили, пока мы его обрабатывали - убираем новые файлы
+        for name in [blob.image.name] + [r.image.name for r in renditions]:
+            storage.delete(name)
+        return None
+
+    if raw_name != blob.image.name:
+        storage.delete(raw_name)
+
+    return blob.status
+
+
+# ==========================================
+# Выбор и ленивое создание копий (для шаблонов)
+# ==========================================
+
+
+def pick_rendition_size(display_px):
+    """
+    Наименьшая копия, которая не будет мутной на экране с плотностью 2x.
+    Если все копии меньше - берем самую большую.
+    """
+    needed = display_px * 2
+    for size in sorted(RENDITION_SIZES):
+        if size >= needed:
+            return size
+    return max(RENDITION_SIZES)
+
+
+def rendition_url(photo, display_px):
+    """
+    URL копии для показа фото шириной display_px.
+
+    Если копия уже есть среди подгруженных renditions
+    (prefetch_related("photos__blob__renditions")) - прямая ссылка на файл,
+    без запросов. Иначе - ссылка на view, которая создаст копию при первом
+    обращении и перенаправит на файл.
+    None - фото еще не обработано, показывать нечего.
+    """
+    if photo.blob.status != PhotoBlob.STATUS_READY:
+        return None
+
+    size = pick_rendition_size(display_px)
+    for rendition in photo.blob.renditions.all():
+        if rendition.size == size:
+            return rendition.image.url
+    return reverse("photo_rendition", args=[photo.id, size])
+
+
+def get_or_create_rendition(blob, size):
+    """
+    Копия нужного размера: из БД или создается на лету и остается на диске
+    (для фото, загруженных до появления копий).
+    None - оригинал не читается (файл пропал, битый или "бомба"), копии не будет.
+    """
+    rendition = PhotoRendition.objects.filter(blob=blob, size=size).first()
+    if rendition is not None:
+        return rendition
+
+    try:
+        with blob.image.open("rb") as file:
+            image = _open_normalized(file)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    rendition = _build_rendition(blob, image, size)
+
+    try:
+        # Отдельная точка сохранения: параллельный запрос мог создать копию раньше
+        with transaction.atomic():
+            rendition.save()
+    except IntegrityError:
+        rendition.image.storage.delete(rendition.image.name)
+        rendition = PhotoRendition.objects.get(blob=blob, size=size)
+    return rendition
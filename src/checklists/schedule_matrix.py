@@ -0,0 +1,164 @@
+import datetime
+
+from django.core.cache import cache
+
+from checklists.caching import (
+    bump_version,
+    get_version,
+    record_cache_lookup,
+    versioned_key,
+)
+from checklists.models import ChecklistTemplate, Schedule
+from checklists.workcalendar import get_work_calendar
+
+# Общая версия матриц: меняется при правке шаблонов/участков (строки таблицы)
+SCHEDULE_NAMESPACE = "checklists:schedule"
+
+# Матрица недели живет сутки: правки расписания и отчетов сбрасывают ее
+# сигналами сразу, а таймаут ограничивает только редкие случаи без сигнала
+# (например, сотрудник поменял фамилию)
+SCHEDULE_WEEK_TIMEOUT = 60 * 60 * 24
+
+# Сколько недель можно показать на одной странице
+MAX_WEEKS = 8
+
+
+def week_start(date):
+    """
+    Понедельник недели, в которую попадает date.
+    """
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def _week_namespace(monday):
+    return f"{SCHEDULE_NAMESPACE}:week:{monday.isoformat()}"
+
+
+def _week_key(monday, templates_version, calendar):
+    # В ключе: версия недели, общая версия шаблонов и версия календаря
+    # (перенос рабочего дня меняет колонки)
+    return versioned_key(
+        _week_namespace(monday), "matrix", templates_version, calendar.version
+    )
+
+
+def _inspector_short_name(user):
+    # "Иванов И."
+    initial = f" {user.first_name[:1]}." if user.first_name else ""
+    return f"{user.last_name}{initial}"
+
+
+def build_schedule_matrices(mondays, calendar):
+    """
+    Строит матрицы "Шаблон x Рабочий день" для списка недель.
+    На любое число недель - 2 запроса: шаблоны (с участками) и расписание.
+
+    Матрица - обычные словари и списки (без моделей), чтобы хранить в Redis:
+    {"start", "end", "days": [даты], "rows": [{"template_id", "template",
+    "location", "cells": [None | {"inspector", "inspection_id",
+    "is_completed", "is_swapped"}]}]}
+    Возвращает {понедельник: матрица}.
+    """
+    if not mondays:
+        return {}
+
+    templates = list(
+        ChecklistTemplate.objects.select_related("location")
+        .order_by("id")
+        .only("id", "name", "location__name")
+    )
+
+    start = min(mondays)
+    end = max(mondays) + datetime.timedelta(days=6)
+    schedules = (
+        Schedule.objects.filter(date__range=(start, end))
+        .select_related("inspector", "inspection")
+        .only(
+            "date",
+            "template_id",
+            "is_swapped",
+            "inspector__first_name",
+            "inspector__last_name",
+            "inspection__is_completed",
+        )
+        .order_by()
+    )
+    # Ключ: (template_id, date) -> ячейка
+    cells = {
+        (item.template_id, item.date): {
+            "inspector": _inspector_short_name(item.inspector),
+            "inspection_id": item.inspection_id,
+            "is_completed": bool(item.inspection and item.inspection.is_completed),
+            "is_swapped": item.is_swapped,
+        }
+        for item in schedules
+    }
+
+    matrices = {}
+    for monday in mondays:
+        sunday = monday + datetime.timedelta(days=6)
+        # Рабочие дни Пн-Вс по производственному календарю
+        # (без праздников, но с рабочими субботами по переносу)
+        days = calendar.working_days(monday, sunday)
+        matrices[monday] = {
+            "start": monday,
+            "end": sunday,
+            "days": days,
+            "rows": [
+                {
+                    "template_id": template.id,
+                    "template": template.name,
+                    "location": template.location.name,
+                    "cells": [cells.get((template.id, day)) for day in days],
+                }
+                for template in templates
+            ],
+        }
+    return matrices
+
+
+def get_schedule_matrices(first_monday, weeks=1):
+    """
+    Матрицы weeks недель подряд начиная с first_monday - из Redis.
+    Одно чтение кеша на все недели; в Postgres идем только за теми
+    неделями, которых нет в кеше (и строим их одним заходом).
+    """
+    calendar = get_work_calendar()
+    mondays = [first_monday + datetime.timedelta(weeks=i) for i in range(weeks)]
+    templates_version = get_version(SCHEDULE_NAMESPACE)
+    keys = {
+        monday: _week_key(monday, templates_version, calendar) for monday in mondays
+    }
+
+    cached = cache.get_many(keys.values())
+    missing = [monday for monday in mondays if keys[monday] not in cached]
+    record_cache_lookup(hits=len(cached), misses=len(missing))
+
+    built = build_schedule_matrices(missing, calendar)
+    if built:
+        cache.set_many(
+            {keys[monday]: matrix for monday, matrix in built.items()},
+            SCHEDULE_WEEK_TIMEOUT,
+        )
+
+    return [
+        built[monday] if monday in built else cached[keys[monday]] for monday in mondays
+    ]
+
+
+def invalidate_schedule_weeks(start_date, end_date=None):
+    """
+    Сбрасывает матрицы недель, в которые попадает [start_date, end_date].
+    """
+    monday = week_start(start_date)
+    last_monday = week_start(end_date or start_date)
+    while monday <= last_monday:
+        bump_version(_week_namespace(monday))
+        monday += datetime.timedelta(weeks=1)
+
+
+def invalidate_schedule_matrices():
+    """
+    Сбрасывает матрицы всех недель (поменялся список шаблонов или участков).
+    """
+    bump_version(SCHEDULE_NAMESPACE)
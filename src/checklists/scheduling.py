@@ -0,0 +1,201 @@
+import heapq
+import statistics
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db.models import Count
+
+from checklists.models import Schedule
+
+# За какой период (дней назад) балансировщик учитывает прошлые назначения
+FAIRNESS_WINDOW_DAYS = 90
+
+
+# ==========================================
+# Алгоритмы назначения проверяющих
+# ==========================================
+
+
+class RoundRobinEngine:
+    """
+    Круговая очередь: каждый следующий слот - следующему сотруднику по ID.
+    Отсутствующих в этот день пропускаем.
+    """
+
+    def __init__(self, inspector_ids, absences, last_inspector_id=None):
+        self.inspector_ids = inspector_ids
+        self.absences = absences
+
+        # Следующим будет первый сотрудник с ID больше последнего.
+        # Если последний уволен - очередь продолжается с его "соседа", а не с 0.
+        self.current_idx = 0
+        if last_inspector_id is not None:
+            self.current_idx = bisect_right(inspector_ids, last_inspector_id) % len(
+                inspector_ids
+            )
+
+    def assign(self, template_id, date):
+        """
+        Возвращает ID сотрудника для слота или None (все отсутствуют).
+        """
+        count = len(self.inspector_ids)
+        for step in range(count):
+            idx = (self.current_idx + step) % count
+            inspector_id = self.inspector_ids[idx]
+            if not self.absences.is_absent(inspector_id, date):
+                # Сдвигаем очередь! Следующий цех проверяет следующий человек.
+                self.current_idx = (idx + 1) % count
+                return inspector_id
+        return None
+
+
+class BalancedEngine:
+    """
+    Балансировка нагрузки: слот получает сотрудник с наименьшим числом
+    назначений за последние FAIRNESS_WINDOW_DAYS дней (куча по нагрузке).
+    При равной нагрузке - тот, кто реже проверял ЭТОТ шаблон.
+
+    Нагрузка берется из истории расписания ОДНИМ агрегирующим запросом,
+    поэтому уход/приход сотрудников не перекашивает очередь.
+    """
+
+    def __init__(self, inspector_ids, absences, load_by_pair=None):
+        self.absences = absences
+        # (inspector_id, template_id) -> сколько раз назначен
+        self.pair_load = Counter(load_by_pair or {})
+        # inspector_id -> всего назначений
+        self.load = dict.fromkeys(inspector_ids, 0)
+        for (inspector_id, _), count in self.pair_load.items():
+            if inspector_id in self.load:
+                self.load[inspector_id] += count
+
+        # Куча: (нагрузка, порядковый номер, inspector_id).
+        # Порядковый номер при равной нагрузке дает очередь "кто дольше ждал".
+        self._seq = 0
+        self._heap = []
+        for inspector_id in inspector_ids:
+            self._push(inspector_id)
+
+    @classmethod
+    def from_history(cls, inspector_ids, absences, window_start, window_end):
+        """
+        Загружает нагрузку за окно [window_start, window_end] одним запросом.
+        """
+        rows = (
+            Schedule.objects.filter(
+                date__range=(window_start, window_end),
+                inspector_id__in=inspector_ids,
+            )
+            .order_by()
+            .values_list("inspector_id", "template_id")
+            .annotate(total=Count("id"))
+        )
+        load_by_pair = {(inspector_id, tpl): n for inspector_id, tpl, n in rows}
+        return cls(inspector_ids, absences, load_by_pair)
+
+    def _push(self, inspector_id):
+        self._seq += 1
+        heapq.heappush(self._heap, (self.load[inspector_id], self._seq, inspector_id))
+
+    def assign(self, template_id, date):
+        """
+        Возвращает ID сотрудника для слота или None (все отсутствуют).
+        """
+        chosen = None
+        popped = []
+
+        while self._heap:
+            load, seq, inspector_id = heapq.heappop(self._heap)
+            popped.append((load, seq, inspector_id))
+
+            # Кандидаты с большей нагрузкой уже не интересны
+            if chosen is not None and load > chosen[0]:
+                break
+            if self.absences.is_absent(inspector_id, date):
+                continue
+
+            key = (load, self.pair_load[(inspector_id, template_id)], seq)
+            if chosen is None or key < chosen:
+                chosen = key + (inspector_id,)
+
+        # Возвращаем в кучу всех, кого посмотрели, кроме выбранного
+        for entry in popped:
+            if chosen is None or entry[2] != chosen[3]:
+                heapq.heappush(self._heap, entry)
+
+        if chosen is None:
+            return None
+
+        inspector_id = chosen[3]
+        self.load[inspector_id] += 1
+        self.pair_load[(inspector_id, template_id)] += 1
+        self._push(inspector_id)
+        return inspector_id
+
+
+SCHEDULE_ENGINES = {
+    "round_robin": RoundRobinEngine,
+    "balanced": BalancedEngine,
+}
+
+
+# ==========================================
+# Отчет о равномерности нагрузки
+# ==========================================
+
+
+@dataclass
+class FairnessReport:
+    """
+    Равномерность распределения проверок между сотрудниками за период.
+    """
+
+    start_date: object
+    end_date: object
+    # inspector_id -> количество назначений
+    per_inspector: dict = field(default_factory=dict)
+    # template_id -> {inspector_id: количество}
+    per_template: dict = field(default_factory=dict)
+
+    @property
+    def min(self):
+        return min(self.per_inspector.values(), default=0)
+
+    @property
+    def max(self):
+        return max(self.per_inspector.values(), default=0)
+
+    @property
+    def stddev(self):
+        return statistics.pstdev(list(self.per_inspector.values()) or [0])
+
+    def __str__(self):
+        return (
+            f"Нагрузка {self.start_date} - {self.end_date}: "
+            f"мин {self.min}, макс {self.max}, ст. откл. {self.stddev:.2f}"
+        )
+
+
+def build_fairness_report(start_date, end_date, inspector_ids):
+    """
+    Считает нагрузку за период ОДНИМ агрегирующим запросом.
+    Сотрудники без назначений тоже учитываются (с нулем).
+    """
+    report = FairnessReport(
+        start_date=start_date,
+        end_date=end_date,
+        per_inspector=dict.fromkeys(inspector_ids, 0),
+    )
+    rows = (
+        Schedule.objects.filter(
+            date__range=(start_date, end_date), inspector_id__in=inspector_ids
+        )
+        .order_by()
+        .values_list("inspector_id", "template_id")
+        .annotate(total=Count("id"))
+    )
+    for inspector_id, template_id, total in rows:
+        report.per_inspector[inspector_id] += total
+        report.per_template.setdefault(template_id, {})[inspector_id] = total
+    return report
@@ -1,103 +1,295 @@
 import datetime
-import holidays
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from checklists.models import (
     Inspection,
     InspectionItem,
+    ViolationPhoto,
     Schedule,
+    SchedulerState,
     ChecklistTemplate,
     SwapLog,
 )
+from checklists.scheduling import (
+    FAIRNESS_WINDOW_DAYS,
+    SCHEDULE_ENGINES,
+    BalancedEngine,
+    RoundRobinEngine,
+    build_fairness_report,
+)
+from checklists.analytics import invalidate_analytics
+from checklists.compliance import record_completed_inspection
+from checklists.photos import store_blobs
+from checklists.schedule_matrix import invalidate_schedule_weeks
+from checklists.snapshots import get_template_snapshot, snapshot_template
+from checklists.violations import record_inspection_violations
+from checklists.workcalendar import get_work_calendar
+from users.services import AbsenceIndex
 
 User = get_user_model()
 
 
-def generate_schedule(start_date, days_count=7):
+# Сколько записей расписания вставлять одним INSERT
+SCHEDULE_BATCH_SIZE = 1000
+
+# Сколько пунктов отчета обновлять одним UPDATE
+ITEMS_UPDATE_BATCH_SIZE = 500
+
+# Ключ advisory-блокировки Postgres для генерации расписания (любое уникальное число)
+SCHEDULE_LOCK_ID = 20251210
+
+
+@dataclass
+class ScheduleResult:
+    """
+    Итог генерации расписания (вместо строки-сообщения).
+    """
+
+    start_date: datetime.date
+    end_date: datetime.date
+    # Сколько записей реально добавлено в расписание
+    created: int = 0
+    # Сколько слотов (шаблон + день) уже было занято и пропущено
+    skipped_existing: int = 0
+    # Выходные и праздники, на которые ничего не назначали
+    skipped_days: list = field(default_factory=list)
+    # Слоты (template_id, date), на которые некого назначить (все отсутствуют)
+    unassigned: list = field(default_factory=list)
+    # Причина, по которой генерация не выполнялась (пусто = все хорошо)
+    error: str = ""
+    # Равномерность нагрузки (FairnessReport) за окно балансировки
+    fairness: object = None
+
+    @property
+    def ok(self):
+        return not self.error
+
+    def __str__(self):
+        if self.error:
+            return f"Ошибка: {self.error}"
+        return (
+            f"Генерация завершена ({self.start_date} - {self.end_date}). "
+            f"Создано записей: {self.created}. "
+            f"Пропущено занятых слотов: {self.skipped_existing}. "
+            f"Не назначено (все в отсутствии): {len(self.unassigned)}."
+        )
+
+
+def _acquire_schedule_lock(wait=True):
+    """
+    Advisory-блокировка Postgres на время транзакции: генерировать расписание
+    одновременно может только один процесс (Celery beat, админ из shell...).
+    wait=False - не ждем, а сразу возвращаем False, если блокировка занята.
+    """
+    if connection.vendor != "postgresql":
+        return True
+    function = "pg_advisory_xact_lock" if wait else "pg_try_advisory_xact_lock"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {function}(%s)", [SCHEDULE_LOCK_ID])
+        acquired = cursor.fetchone()[0]
+    # pg_advisory_xact_lock возвращает void (None) - значит дождались
+    return acquired is not False
+
+
+def generate_schedule(start_date, days_count=7, engine="round_robin"):
     """
     Генерирует расписание.
-    Алгоритм: Round Robin (Круговая очередь) с памятью в БД.
+    Алгоритм (engine):
+    - "round_robin" - Круговая очередь, курсор хранится в SchedulerState;
+    - "balanced" - балансировка по истории назначений (см. scheduling.py).
+
+    Работает "множествами": занятые слоты (шаблон, дата) за весь период
+    читаются ОДНИМ запросом, назначения считаются в памяти и пишутся
+    ОДНИМ bulk_create. Возвращает ScheduleResult.
+
+    Сотрудники в отпуске/на больничном (UserAbsence) пропускаются:
+    отсутствия загружаются один раз в AbsenceIndex, проверка слота - O(log n).
     """
-    # 1. Загружаем праздники Беларуси
-    by_holidays = holidays.BY()
+    # Вся генерация - одна транзакция под advisory-блокировкой,
+    # чтобы параллельные запуски не читали один и тот же курсор.
+    with transaction.atomic():
+        _acquire_schedule_lock()
+        return _generate_schedule(start_date, days_count, engine)
+
+
+def _generate_schedule(start_date, days_count, engine):
+    end_date = start_date + datetime.timedelta(days=max(days_count, 1) - 1)
+    result = ScheduleResult(start_date=start_date, end_date=end_date)
 
-    # 2. Получаем ресурсы
+    if days_count < 1:
+        result.error = "Количество дней должно быть больше 0."
+        return result
+    if engine not in SCHEDULE_ENGINES:
+        result.error = f"Неизвестный алгоритм расписания: {engine}."
+        return result
+
+    # 1. Производственный календарь (праздники, выходные, переносы РБ)
+    calendar = get_work_calendar()
+
+    # 2. Получаем ресурсы (нужны только ID)
     # Шаблоны сортируем по ID, чтобы порядок всегда был одинаковый
-    templates = list(ChecklistTemplate.objects.all().order_by("id"))
+    template_ids = list(
+        ChecklistTemplate.objects.order_by("id").values_list("id", flat=True)
+    )
 
     # Инспекторы: только активные и с допуском. Сортируем по ID (стабильность списка)
-    inspectors = list(
-        User.objects.filter(is_active=True, can_perform_inspections=True).order_by("id")
+    inspector_ids = list(
+        User.objects.filter(is_active=True, can_perform_inspections=True)
+        .order_by("id")
+        .values_list("id", flat=True)
     )
 
-    if not templates:
-        return "Ошибка: Нет шаблонов (ChecklistTemplate)."
-    if not inspectors:
-        return "Ошибка: Нет сотрудников (User с can_perform_inspections=True)."
+    if not template_ids:
+        result.error = "Нет шаблонов (ChecklistTemplate)."
+        return result
+    if not inspector_ids:
+        result.error = "Нет сотрудников (User с can_perform_inspections=True)."
+        return result
 
     # 3. ОПРЕДЕЛЯЕМ ТОЧКУ СТАРТА ОЧЕРЕДИ
-    # Смотрим, кто был последним назначенным в расписании ВООБЩЕ
-    last_entry = Schedule.objects.order_by("-date", "-id").first()
-
-    start_index = 0
-    if last_entry:
-        try:
-            # Находим, каким по счету в нашем списке стоит этот сотрудник
-            last_inspector_index = inspectors.index(last_entry.inspector)
-            # Следующим будет (index + 1)
-            start_index = (last_inspector_index + 1) % len(inspectors)
-        except ValueError:
-            # Если сотрудник был уволен и его нет в списке inspectors -> начинаем с 0
-            start_index = 0
-
-    # Текущий указатель (кто сейчас дежурит)
-    current_inspector_idx = start_index
-
-    # 4. ГЕНЕРАЦИЯ ПО ДНЯМ
-    created_total = 0
+    # Курсор хранится в SchedulerState: кто был последним назначенным
+    state = SchedulerState.load(for_update=True)
+    last_inspector_id = state.last_inspector_id
+
+    if last_inspector_id is None:
+        # Курсора еще нет (первый запуск) - берем последнюю запись расписания
+        last_inspector_id = (
+            Schedule.objects.order_by("-date", "-id")
+            .values_list("inspector_id", flat=True)
+            .first()
+        )
+
+    # 4. Все уже занятые слоты периода - ОДНИМ запросом
+    occupied = set(
+        Schedule.objects.filter(date__range=(start_date, end_date)).values_list(
+            "template_id", "date"
+        )
+    )
+
+    # 5. Отсутствия сотрудников на весь период - ОДНИМ запросом
+    absences = AbsenceIndex.load(start_date, end_date, user_ids=inspector_ids)
+
+    # Окно истории, по которому считаем равномерность нагрузки
+    window_start = start_date - datetime.timedelta(days=FAIRNESS_WINDOW_DAYS)
+
+    if engine == "balanced":
+        assigner = BalancedEngine.from_history(
+            inspector_ids, absences, window_start, end_date
+        )
+    else:
+        assigner = RoundRobinEngine(inspector_ids, absences, last_inspector_id)
+
+    # 6. ГЕНЕРАЦИЯ ПО ДНЯМ (в памяти, без запросов)
+    new_entries = []
     current_date = start_date
 
-    # transaction.atomic гарантирует: либо создадим всё, либо (при ошибке) ничего.
-    with transaction.atomic():
-        for _ in range(days_count):
-            # А. Проверка на Выходные (Saturday=5, Sunday=6)
-            if current_date.weekday() >= 5:
-                # print(f"Пропуск: {current_date} (Выходной)")
-                current_date += datetime.timedelta(days=1)
+    for _ in range(days_count):
+        # А. Проверка на Выходные и Праздники (с учетом рабочих суббот)
+        if not calendar.is_working_day(current_date):
+            result.skipped_days.append(current_date)
+            current_date += datetime.timedelta(days=1)
+            continue
+
+        # Б. Назначение проверок
+        # Для каждого шаблона (Цеха) берем СЛЕДУЮЩЕГО сотрудника
+        for template_id in template_ids:
+            # Защита от дублей: слот уже есть в расписании
+            if (template_id, current_date) in occupied:
+                result.skipped_existing += 1
                 continue
 
-            # Б. Проверка на Праздники
-            if current_date in by_holidays:
-                # print(f"Пропуск: {current_date} (Праздник: {by_holidays.get(current_date)})")
-                current_date += datetime.timedelta(days=1)
+            # Берем сотрудника, который НЕ отсутствует в этот день
+            inspector_id = assigner.assign(template_id, current_date)
+            if inspector_id is None:
+                # Все в отпуске - оставляем слот админу
+                result.unassigned.append((template_id, current_date))
                 continue
 
-            # В. Назначение проверок
-            # Для каждого шаблона (Цеха) берем СЛЕДУЮЩЕГО сотрудника
-            for template in templates:
-                inspector = inspectors[current_inspector_idx]
-
-                # Проверяем, не создано ли уже расписание на этот день (защита от дублей)
-                if not Schedule.objects.filter(
-                    date=current_date, template=template
-                ).exists():
-                    Schedule.objects.create(
-                        date=current_date, template=template, inspector=inspector
-                    )
-                    created_total += 1
-
-                    # Сдвигаем очередь! Следующий цех проверяет следующий человек.
-                    # Это обеспечивает равномерную нагрузку.
-                    current_inspector_idx = (current_inspector_idx + 1) % len(
-                        inspectors
-                    )
-
-            # Переходим к следующему дню
-            current_date += datetime.timedelta(days=1)
+            new_entries.append(
+                Schedule(
+                    date=current_date,
+                    template_id=template_id,
+                    inspector_id=inspector_id,
+                )
+            )
 
-    return f"Генерация завершена. Создано записей: {created_total}."
+        # Переходим к следующему дню
+        current_date += datetime.timedelta(days=1)
+
+    # 7. ЗАПИСЬ ОДНОЙ ПАЧКОЙ
+    # ignore_conflicts: если параллельный запуск уже занял слот,
+    # unique_together (template, date) просто отбросит дубль.
+    Schedule.objects.bulk_create(
+        new_entries, batch_size=SCHEDULE_BATCH_SIZE, ignore_conflicts=True
+    )
+    total = Schedule.objects.filter(date__range=(start_date, end_date)).count()
+    result.created = total - len(occupied)
+
+    # 8. Запоминаем курсор очереди и до какой даты построено расписание.
+    # Горизонт двигаем, только если период примыкает к уже построенному:
+    # ручной запуск "на месяц вперед" не должен перепрыгнуть пробел,
+    # который extend_schedule_horizon тогда никогда не заполнит.
+    if new_entries:
+        state.last_inspector_id = new_entries[-1].inspector_id
+    built_until = state.generated_until
+    yesterday = timezone.now().date() - datetime.timedelta(days=1)
+    if built_until is None or built_until < yesterday:
+        # Построенное в прошлом не считается: горизонт начинается с сегодня
+        built_until = yesterday
+    if (
+        start_date <= built_until + datetime.timedelta(days=1)
+        and end_date > built_until
+    ):
+        state.generated_until = end_date
+    state.save()
+
+    # bulk_create не шлет сигналы - матрицы недель периода сбрасываем сами
+    if new_entries:
+        transaction.on_commit(lambda: invalidate_schedule_weeks(start_date, end_date))
+
+    result.fairness = build_fairness_report(window_start, end_date, inspector_ids)
+    return result
+
+
+def extend_schedule_horizon(weeks=None, engine=None):
+    """
+    Поддерживает "скользящий горизонт": расписание всегда построено
+    на N недель вперед (settings.SCHEDULE_HORIZON_WEEKS).
+    Генерирует только недостающий "хвост" после SchedulerState.generated_until.
+    Запускается из Celery beat (checklists.tasks).
+    """
+    weeks = weeks or settings.SCHEDULE_HORIZON_WEEKS
+    engine = engine or settings.SCHEDULE_ENGINE
+    today = timezone.now().date()
+    horizon_end = today + datetime.timedelta(weeks=weeks)
+
+    with transaction.atomic():
+        # Другой процесс уже генерирует - не ждем, он сделает то же самое
+        if not _acquire_schedule_lock(wait=False):
+            return ScheduleResult(
+                start_date=today,
+                end_date=horizon_end,
+                error="Генерация уже выполняется другим процессом.",
+            )
+
+        state = SchedulerState.load()
+        start_date = today
+        if state.generated_until and state.generated_until >= today:
+            start_date = state.generated_until + datetime.timedelta(days=1)
+
+        if start_date > horizon_end:
+            # Горизонт уже заполнен - делать нечего
+            return ScheduleResult(start_date=today, end_date=horizon_end)
+
+        return generate_schedule(
+            start_date, (horizon_end - start_date).days + 1, engine=engine
+        )
 
 
 def create_inspection_from_template(template, user, date, location_snapshot):
@@ -109,38 +301,229 @@ def create_inspection_from_template(template, user, date, location_snapshot):
     # transaction.atomic() гарантирует: либо создастся всё целиком,
     # либо (если произойдет ошибка) не создастся ничего. Не будет "половинчатых" отчетов.
     with transaction.atomic():
+        # Снимок шаблона берем заранее: счетчик пунктов пишется сразу в шапку
+        snapshot = get_template_snapshot(template.id)
+
         # 1. Создаем шапку отчета
         inspection = Inspection.objects.create(
             template=template,
             inspector=user,
             date_check=date,
             location_snapshot=location_snapshot,
+            # Новые пункты "Соответствует" - нарушений и фото пока нет
+            items_total=len(snapshot),
         )
 
-        # 2. Получаем все разделы шаблона (упорядоченные по order)
-        sections = template.sections.all().order_by("order")
-
-        # 3. Итерируемся по разделам
-        for section in sections:
-            # Получаем вопросы внутри раздела
-            criteria_list = section.criteria.all().order_by("order")
-
-            for criteria in criteria_list:
-                # 4. Создаем строку отчета (Snapshot)
-                InspectionItem.objects.create(
-                    inspection=inspection,
-                    criteria_origin=criteria,  # Ссылка на родителя (если нужно для аналитики)
-                    # КОПИРУЕМ ДАННЫЕ (фиксируем историю)
-                    section_name=section.title,
-                    criteria_text=criteria.text,
-                    criteria_order=criteria.order,
-                    # Значение по умолчанию
-                    is_compliant=True,
-                )
+        # 2. Копируем вопросы шаблона (Snapshot):
+        # всё дерево Разделы -> Вопросы одним запросом, строки отчета одним INSERT.
+        snapshot_template(inspection, template, snapshot)
 
         return inspection
 
 
+def _apply_item_changes(item, is_compliant=None, comment=None):
+    """
+    Применяет новые значения к пункту в памяти.
+    Возвращает кортеж реально изменившихся полей (пустой - ничего не менялось).
+    None - значение не присылали (оставляем как есть).
+    """
+    fields = []
+    if is_compliant is not None and is_compliant != item.is_compliant:
+        item.is_compliant = is_compliant
+        fields.append("is_compliant")
+    if comment is not None and comment != item.comment:
+        item.comment = comment
+        fields.append("comment")
+    return tuple(fields)
+
+
+def _violations_delta(changed):
+    """
+    На сколько изменилось число нарушений отчета после _apply_item_changes.
+    is_compliant - bool: раз поле изменилось, значит статус перевернулся.
+    """
+    delta = 0
+    for fields, changed_items in changed.items():
+        if "is_compliant" in fields:
+            delta += sum(-1 if item.is_compliant else 1 for item in changed_items)
+    return delta
+
+
+def _bulk_update_items(changed):
+    """
+    changed: {(поля,): [пункты]} -> один UPDATE на каждый набор полей.
+    """
+    for fields, changed_items in changed.items():
+        InspectionItem.objects.bulk_update(
+            changed_items, fields, batch_size=ITEMS_UPDATE_BATCH_SIZE
+        )
+
+
+def _editable_items(inspection, item_ids=None):
+    # Только нужные поля и без сортировки (Meta.ordering тянет JOIN на отчет)
+    items = InspectionItem.objects.filter(inspection=inspection)
+    if item_ids is not None:
+        items = items.filter(id__in=item_ids)
+    return items.only("id", "inspection_id", "is_compliant", "comment").order_by()
+
+
+def save_inspection_answers(inspection, data, files, complete=False):
+    """
+    Сохраняет ответы формы отчета (POST) одной транзакцией.
+
+    Форма присылает все пункты, но пишем только то, что реально изменилось:
+    пункты группируются по набору измененных полей, и на каждую группу
+    делается один bulk_update. Фото всех пунктов - один bulk_create.
+    complete=True - заодно помечаем отчет завершенным.
+    """
+    with transaction.atomic():
+        # (поля,) -> [пункты, где изменились именно эти поля]
+        changed = defaultdict(list)
+        photos = []
+
+        for item in _editable_items(inspection):
+            # Формируем имена полей, которые мы ждем от HTML
+            # Например: "compliant_15" (где 15 - id пункта)
+            status_key = f"compliant_{item.id}"
+            comment_key = f"comment_{item.id}"
+            photos_key = f"photos_{item.id}"
+
+            # Если ключа нет в POST, значит галочку не трогали (оставляем как есть)
+            fields = _apply_item_changes(
+                item,
+                # Превращаем строку 'true'/'false' в Python Boolean
+                is_compliant=data[status_key] == "true" if status_key in data else None,
+                comment=data.get(comment_key),
+            )
+            if fields:
+                changed[fields].append(item)
+
+            for file in files.getlist(photos_key):
+                photos.append((item, file))
+
+        _bulk_update_items(changed)
+        # Счетчик фото увеличивает attach_photos (общий путь для всех загрузок)
+        attach_photos(photos)
+
+        # Любое изменение - новая ревизия (автосохранение со старой ревизией
+        # получит конфликт и не затрет эти данные).
+        # Счетчик нарушений - в том же UPDATE, отдельного запроса нет.
+        updates = {"revision": F("revision") + 1}
+        violations_delta = _violations_delta(changed)
+        if violations_delta:
+            updates["violations_total"] = F("violations_total") + violations_delta
+
+        # Условный UPDATE: в итоги дня отчет попадает ровно один раз,
+        # даже если "Завершить" нажали дважды
+        if complete and Inspection.objects.filter(
+            pk=inspection.pk, is_completed=False
+        ).update(is_completed=True, **updates):
+            record_completed_inspection(inspection)
+            record_inspection_violations(inspection)
+            # UPDATE без сигналов: ячейка "Сдано" в матрице расписания
+            # и аналитика нарушений сбрасываются здесь
+            transaction.on_commit(
+                lambda: invalidate_schedule_weeks(inspection.date_check)
+            )
+            transaction.on_commit(invalidate_analytics)
+        elif changed or photos:
+            Inspection.objects.filter(pk=inspection.pk).update(**updates)
+
+
+def attach_photos(item_files):
+    """
+    Единая точка загрузки фото нарушений (форма, AJAX, загрузка по частям).
+    item_files: [(пункт, файл), ...]
+
+    Файлы хранятся по хешу содержимого (PhotoBlob): одинаковое фото второй
+    раз на диск не пишется, только растет счетчик ссылок.
+    Новые файлы сохраняются как есть (статус "Обрабатывается"), а конвертация
+    в JPEG и уменьшенные копии уходят в Celery ПОСЛЕ коммита транзакции -
+    запрос пользователя не ждет Pillow.
+    Возвращает созданные ViolationPhoto.
+    """
+    # Импорт здесь: tasks импортирует services
+    from checklists.tasks import process_photo_blob_task
+
+    item_files = list(item_files)
+    if not item_files:
+        return []
+
+    with transaction.atomic():
+        blobs, new_blobs = store_blobs([file for _, file in item_files])
+        photos = ViolationPhoto.objects.bulk_create(
+            ViolationPhoto(item=item, blob=blob)
+            for (item, _), blob in zip(item_files, blobs)
+        )
+
+        # Счетчики фото отчетов: обычно все фото из одного отчета - один UPDATE
+        per_inspection = Counter(item.inspection_id for item, _ in item_files)
+        inspections_by_count = defaultdict(list)
+        for inspection_id, count in per_inspection.items():
+            inspections_by_count[count].append(inspection_id)
+        for count, inspection_ids in inspections_by_count.items():
+            Inspection.objects.filter(id__in=inspection_ids).update(
+                photos_total=F("photos_total") + count
+            )
+
+    blob_ids = [blob.id for blob in new_blobs]
+
+    def enqueue():
+        for blob_id in blob_ids:
+            process_photo_blob_task.delay(blob_id)
+
+    if blob_ids:
+        transaction.on_commit(enqueue)
+    return photos
+
+
+def autosave_inspection(inspection, revision, deltas):
+    """
+    Автосохранение черновика: пачка изменений пунктов от браузера.
+    deltas: {item_id: {"is_compliant": bool, "comment": str}} (любой ключ можно опустить)
+
+    Оптимистичная блокировка: изменения применяются, только если ревизия
+    отчета в БД совпадает с ревизией клиента. Иначе кто-то сохранил раньше
+    (другая вкладка/телефон) - возвращаем конфликт и текущую ревизию.
+
+    Возвращает (успех, ревизия).
+    """
+    with transaction.atomic():
+        # Проверка и увеличение ревизии - одним UPDATE (атомарно)
+        updated = Inspection.objects.filter(
+            pk=inspection.pk, revision=revision, is_completed=False
+        ).update(revision=F("revision") + 1)
+
+        if not updated:
+            current = (
+                Inspection.objects.filter(pk=inspection.pk)
+                .values_list("revision", flat=True)
+                .first()
+            )
+            return False, current
+
+        changed = defaultdict(list)
+        for item in _editable_items(inspection, item_ids=deltas.keys()):
+            delta = deltas[item.id]
+            fields = _apply_item_changes(
+                item,
+                is_compliant=delta.get("is_compliant"),
+                comment=delta.get("comment"),
+            )
+            if fields:
+                changed[fields].append(item)
+
+        _bulk_update_items(changed)
+
+        violations_delta = _violations_delta(changed)
+        if violations_delta:
+            Inspection.objects.filter(pk=inspection.pk).update(
+                violations_total=F("violations_total") + violations_delta
+            )
+
+    return True, revision + 1
+
+
 def perform_auto_swap(schedule_item, reason):
     """
     Меняет смены местами.
@@ -157,35 +540,66 @@ def perform_auto_swap(schedule_item, reason):
         days_until_next_monday = 7
 
     start_of_next_week = today + datetime.timedelta(days=days_until_next_monday)
+    # Если понедельник - праздник, неделя фактически начинается позже
+    start_of_next_week = get_work_calendar().next_working_days(start_of_next_week, 1)[0]
 
-    # 2. Ищем кандидата
-    # Условия:
+    # 2. Условия для кандидата:
     # - Дата >= Понедельник следующей недели
     # - Инспектор НЕ я
     # - Отчет еще не начат
     # - is_swapped = False (ГЛАВНОЕ: Ищем только "чистые" слоты, тех, кто еще не менялся)
+    # - Кандидат НЕ отсутствует в день, который он у меня забирает
+    # - Я НЕ отсутствую в день, который забираю у кандидата
 
-    candidate = (
-        Schedule.objects.filter(
-            date__gte=start_of_next_week,
-            inspection__isnull=True,
-            is_swapped=False,  # <--- ЗАЩИТА ОТ ПИНГ-ПОНГА
-        )
-        .exclude(inspector=schedule_item.inspector)
-        .order_by("date", "id")
-        .first()
-    )
+    # Отсутствия загружаем один раз (все, что не закончились до нужных дат)
+    absences = AbsenceIndex.load(min(schedule_item.date, start_of_next_week))
 
-    if not candidate:
-        # Если "чистых" кандидатов нет, пробуем искать любых (крайний случай),
-        # но лучше просто вернуть ошибку, чтобы админ расширил расписание.
-        return (
-            False,
-            "Нет доступных кандидатов на следующей неделе. Попросите администратора сгенерировать расписание дальше.",
+    # 3. Поиск и обмен - в одной транзакции под блокировками строк.
+    # Два сотрудника, нажавшие "Автозамена" одновременно, не получат один слот:
+    # кандидат берется через SELECT ... FOR UPDATE SKIP LOCKED,
+    # т.е. слот, который уже "держит" параллельный обмен, просто пропускается.
+    with transaction.atomic():
+        # Блокируем свой слот и перечитываем его: пока мы думали,
+        # его могли уже отдать по другому обмену или начать проверку.
+        initiator_id = schedule_item.inspector_id
+        schedule_item = (
+            Schedule.objects.select_for_update(of=("self",))
+            .select_related("inspector")
+            .get(pk=schedule_item.pk)
+        )
+        if schedule_item.inspector_id != initiator_id or schedule_item.inspection_id:
+            return False, "Задание уже изменено. Обновите страницу."
+
+        candidates = (
+            Schedule.objects.filter(
+                date__gte=start_of_next_week,
+                inspection__isnull=True,
+                is_swapped=False,  # <--- ЗАЩИТА ОТ ПИНГ-ПОНГА
+            )
+            .exclude(inspector_id=initiator_id)
+            .exclude(inspector_id__in=absences.absent_on(schedule_item.date))
+        )
+        for absent_from, absent_to in absences.intervals(initiator_id):
+            candidates = candidates.exclude(date__range=(absent_from, absent_to))
+
+        # Частичный индекс schedule_free_slot_idx (date, id) отдает первый
+        # свободный слот без сканирования всего расписания.
+        candidate = (
+            candidates.select_for_update(skip_locked=True, of=("self",))
+            .select_related("inspector")
+            .order_by("date", "id")
+            .first()
         )
 
-    # 3. Совершаем обмен
-    with transaction.atomic():
+        if not candidate:
+            # Если "чистых" кандидатов нет, пробуем искать любых (крайний случай),
+            # но лучше просто вернуть ошибку, чтобы админ расширил расписание.
+            return (
+                False,
+                "Нет доступных кандидатов на следующей неделе. Попросите администратора сгенерировать расписание дальше.",
+            )
+
+        # 4. Совершаем обмен
         initiator = schedule_item.inspector
         target_user = candidate.inspector
 
@@ -206,10 +620,10 @@ def perform_auto_swap(schedule_item, reason):
         # Давай оставим False, чтобы "Жертва" тоже имела право отказаться, если у неё форс-мажор.
         schedule_item.is_swapped = False
 
-        schedule_item.save()
-        candidate.save()
+        schedule_item.save(update_fields=["inspector", "is_swapped"])
+        candidate.save(update_fields=["inspector", "is_swapped"])
 
-        # 4. Пишем в Историю
+        # 5. Пишем в Историю
         SwapLog.objects.create(
             requestor=initiator,
             target_user=target_user,
@@ -0,0 +1,154 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from checklists.analytics import invalidate_analytics
+from checklists.models import (
+    CalendarOverride,
+    ChecklistCriteria,
+    ChecklistSection,
+    ChecklistTemplate,
+    Inspection,
+    Location,
+    Schedule,
+    ViolationPhoto,
+)
+from checklists.photos import release_blobs
+from checklists.schedule_matrix import (
+    invalidate_schedule_matrices,
+    invalidate_schedule_weeks,
+)
+from checklists.snapshots import invalidate_template_snapshot
+from checklists.workcalendar import invalidate_work_calendar
+
+
+def _invalidate_on_commit(template_id):
+    # Сбрасываем кеш только после COMMIT, иначе параллельный запрос успеет
+    # закешировать старые данные под новой версией.
+    if template_id:
+        transaction.on_commit(lambda: invalidate_template_snapshot(template_id))
+
+
+# --- Справочники шаблонов: любая правка сбрасывает снимок шаблона ---
+
+
+@receiver([post_save, post_delete], sender=ChecklistTemplate)
+def template_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.id)
+    # Строки матрицы расписания - это шаблоны
+    transaction.on_commit(invalidate_schedule_matrices)
+
+
+@receiver([post_save, post_delete], sender=Location)
+def location_changed(sender, instance, **kwargs):
+    # Название участка выводится в матрице расписания
+    transaction.on_commit(invalidate_schedule_matrices)
+
+
+@receiver(pre_save, sender=ChecklistSection)
+def section_moving(sender, instance, **kwargs):
+    # Раздел переносят в другой шаблон - сбросить нужно и снимок старого
+    instance._previous_template_id = None
+    if instance.pk:
+        instance._previous_template_id = (
+            ChecklistSection.objects.filter(pk=instance.pk)
+            .values_list("template_id", flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=ChecklistSection)
+def section_changed(sender, instance, **kwargs):
+    for template_id in {
+        instance.template_id,
+        getattr(instance, "_previous_template_id", None),
+    }:
+        _invalidate_on_commit(template_id)
+
+
+@receiver(pre_save, sender=ChecklistCriteria)
+def criteria_moving(sender, instance, **kwargs):
+    # Вопрос переносят в раздел другого шаблона - сбросить нужно и старый
+    instance._previous_template_id = None
+    if instance.pk:
+        instance._previous_template_id = (
+            ChecklistCriteria.objects.filter(pk=instance.pk)
+            .values_list("section__template_id", flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=ChecklistCriteria)
+def criteria_changed(sender, instance, **kwargs):
+    # У вопроса нет прямой ссылки на шаблон - берем через раздел
+    current = (
+        ChecklistSection.objects.filter(id=instance.section_id)
+        .values_list("template_id", flat=True)
+        .first()
+    )
+    for template_id in {current, getattr(instance, "_previous_template_id", None)}:
+        _invalidate_on_commit(template_id)
+
+
+# --- Производственный календарь: перенос дня пересчитывает карту рабочих дней ---
+
+
+@receiver([post_save, post_delete], sender=CalendarOverride)
+def calendar_override_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_work_calendar)
+
+
+# --- Расписание: правка слота или отчета сбрасывает матрицу его недели ---
+# Массовые изменения без сигналов (bulk_create, update) сбрасывают кеш сами:
+# см. generate_schedule и save_inspection_answers.
+
+
+def _invalidate_weeks_on_commit(*dates):
+    # Каждую неделю отдельно: перенос слота на месяц вперед
+    # не должен сбрасывать все недели между датами
+    for date in {date for date in dates if date}:
+        transaction.on_commit(lambda date=date: invalidate_schedule_weeks(date))
+
+
+@receiver(pre_save, sender=Schedule)
+def schedule_moving(sender, instance, update_fields=None, **kwargs):
+    # Слот переносят на другую дату (админка) - сбросить нужно и старую неделю
+    instance._previous_date = None
+    if instance.pk and (update_fields is None or "date" in update_fields):
+        instance._previous_date = (
+            Schedule.objects.filter(pk=instance.pk)
+            .values_list("date", flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Schedule)
+def schedule_changed(sender, instance, **kwargs):
+    _invalidate_weeks_on_commit(
+        instance.date, getattr(instance, "_previous_date", None)
+    )
+
+
+@receiver([post_save, post_delete], sender=Inspection)
+def inspection_changed(sender, instance, signal, **kwargs):
+    # Статус отчета ("Сдано"/"Ожидание") виден в ячейке расписания
+    _invalidate_weeks_on_commit(instance.date_check)
+    # В аналитику входят только завершенные отчеты (черновики ее не меняют)
+    if instance.is_completed or signal is post_delete:
+        transaction.on_commit(invalidate_analytics)
+
+
+# --- Фото: удаление последней ссылки удаляет файл (см. PhotoBlob.ref_count) ---
+
+
+@receiver(post_delete, sender=ViolationPhoto)
+def violation_photo_deleted(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении пункта/отчета
+    release_blobs([instance.blob_id])
+    # Счетчик фото отчета (в той же транзакции, что и удаление).
+    # Greatest - на случай, если счетчик уже разошелся (см. recount_inspection_counters)
+    Inspection.objects.filter(items__id=instance.item_id).update(
+        photos_total=Greatest(F("photos_total") - 1, 0)
+    )
@@ -0,0 +1,125 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from checklists.caching import bump_version, record_cache_lookup, versioned_key
+from checklists.models import ChecklistCriteria, ChecklistSection, InspectionItem
+
+# Сколько строк отчета вставлять одним INSERT.
+# 300 вопросов шаблона укладываются в 1 запрос.
+ITEMS_BATCH_SIZE = 500
+
+# Справочники меняются редко, а версия сбрасывается сигналами при каждой правке.
+# Таймаут нужен только чтобы Redis не копил снимки удаленных шаблонов.
+SNAPSHOT_TIMEOUT = 60 * 60 * 24 * 7
+
+# Одна строка "скомпилированного" шаблона (плоский список, порядок как в шаблоне)
+SnapshotRow = namedtuple(
+    "SnapshotRow",
+    ["section_title", "criteria_text", "order", "criteria_id", "section_id"],
+)
+
+# Формат строки снимка в ключе кеша: поменяли SnapshotRow - старые снимки
+# из Redis не читаются
+SNAPSHOT_FORMAT = 2
+
+
+def _template_namespace(template_id):
+    return f"checklists:template:{template_id}"
+
+
+def compile_template_snapshot(template_id):
+    """
+    Компилирует ВСЁ дерево шаблона (Разделы + Вопросы) в плоский список
+    SnapshotRow ОДНИМ запросом (JOIN criteria -> section).
+    Порядок: как в шаблоне (раздел по order, внутри раздела вопрос по order).
+    """
+    rows = (
+        ChecklistCriteria.objects.filter(section__template_id=template_id)
+        .order_by("section__order", "section_id", "order", "id")
+        .values_list("section__title", "text", "order", "id", "section_id")
+    )
+    return [SnapshotRow(*row) for row in rows]
+
+
+def get_template_snapshot(template_id):
+    """
+    Скомпилированный шаблон из Redis.
+    В Postgres идем только если версия шаблона изменилась (правка в админке).
+    """
+    key = versioned_key(_template_namespace(template_id), "snapshot", SNAPSHOT_FORMAT)
+    snapshot = cache.get(key)
+    record_cache_lookup(hits=snapshot is not None, misses=snapshot is None)
+    if snapshot is None:
+        snapshot = compile_template_snapshot(template_id)
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def invalidate_template_snapshot(template_id):
+    """
+    Сбрасывает снимок шаблона (вызывается из сигналов при правке справочников).
+    """
+    bump_version(_template_namespace(template_id))
+
+
+def group_snapshot_by_section(snapshot, sections=()):
+    """
+    Группирует плоский снимок по разделам для вывода в HTML:
+    [{"title": "Раздел А", "criteria": [SnapshotRow, ...]}, ...]
+    Группа - по ID раздела: у разных разделов может быть одно название.
+    sections - [(id, title), ...] всех разделов шаблона по порядку;
+    тогда в выводе есть и разделы без вопросов (в снимке их нет).
+    """
+    groups = {
+        section_id: {"title": title, "criteria": []} for section_id, title in sections
+    }
+    for row in snapshot:
+        group = groups.setdefault(
+            row.section_id, {"title": row.section_title, "criteria": []}
+        )
+        group["criteria"].append(row)
+    return list(groups.values())
+
+
+def template_sections(template_id):
+    """
+    Все разделы шаблона [(id, title), ...] в порядке шаблона
+    (включая пустые) - для предпросмотра, см. group_snapshot_by_section.
+    """
+    return list(
+        ChecklistSection.objects.filter(template_id=template_id)
+        .order_by("order", "id")
+        .values_list("id", "title")
+    )
+
+
+def build_inspection_items(inspection, snapshot):
+    """
+    Превращает снимок шаблона в строки отчета БЕЗ записи в БД.
+    """
+    return [
+        InspectionItem(
+            inspection=inspection,
+            criteria_origin_id=row.criteria_id,  # Ссылка на родителя (для аналитики)
+            # КОПИРУЕМ ДАННЫЕ (фиксируем историю)
+            section_name=row.section_title,
+            criteria_text=row.criteria_text,
+            criteria_order=row.order,
+            # Значение по умолчанию
+            is_compliant=True,
+        )
+        for row in snapshot
+    ]
+
+
+def snapshot_template(inspection, template, snapshot=None):
+    """
+    Копирует вопросы шаблона в отчет.
+    snapshot - уже полученный снимок (иначе берется из кеша).
+    Итого: 0 SELECT (снимок из Redis) + 1 INSERT (все строки пачкой).
+    """
+    if snapshot is None:
+        snapshot = get_template_snapshot(template.id)
+    items = build_inspection_items(inspection, snapshot)
+    return InspectionItem.objects.bulk_create(items, batch_size=ITEMS_BATCH_SIZE)
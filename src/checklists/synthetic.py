@@ -0,0 +1,264 @@
+import datetime
+import hashlib
+import io
+import random
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from checklists.analytics import invalidate_analytics
+from checklists.compliance import rebuild_compliance_daily
+from checklists.models import (
+    ChecklistCriteria,
+    ChecklistSection,
+    ChecklistTemplate,
+    Inspection,
+    InspectionItem,
+    Location,
+    PhotoBlob,
+    Schedule,
+    ViolationPhoto,
+)
+from checklists.schedule_matrix import invalidate_schedule_matrices
+from checklists.snapshots import build_inspection_items, get_template_snapshot
+from checklists.violations import rebuild_criterion_violations
+from checklists.workcalendar import get_work_calendar
+
+User = get_user_model()
+
+# Метка синтетических данных: по ней их находят и удаляют
+SYNTHETIC_LOCATION_PREFIX = "Синтетика"
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.example.com"
+
+# Размер пачки INSERT (пунктов отчетов бывают сотни тысяч)
+SYNTHETIC_BATCH_SIZE = 5000
+
+
+@dataclass
+class SyntheticVolumes:
+    """
+    Объемы синтетических данных. Отчетов получается
+    locations * templates_per_location * (рабочих дней за days).
+    """
+
+    locations: int = 5
+    templates_per_location: int = 4
+    sections: int = 5
+    criteria_per_section: int = 10
+    inspectors: int = 30
+    days: int = 90
+    # Доля пунктов с нарушением
+    violation_rate: float = 0.05
+    # Доля нарушений с фото
+    photo_rate: float = 0.5
+    seed: int = 0
+
+
+@dataclass
+class SyntheticResult:
+    """
+    Сколько строк создано.
+    """
+
+    templates: int = 0
+    criteria: int = 0
+    inspectors: int = 0
+    schedules: int = 0
+    inspections: int = 0
+    items: int = 0
+    photos: int = 0
+
+    def __str__(self):
+        return (
+            f"Шаблонов: {self.templates}, вопросов: {self.criteria}, "
+            f"сотрудников: {self.inspectors}, записей расписания: {self.schedules}, "
+            f"отчетов: {self.inspections}, пунктов: {self.items}, фото: {self.photos}"
+        )
+
+
+def clear_synthetic_data():
+    """
+    Удаляет синтетические данные (участки с меткой и все, что от них зависит).
+    Фото удаляются по одному (сигналы ведут счетчики ссылок на файлы),
+    поэтому на больших объемах это небыстро.
+    """
+    templates = ChecklistTemplate.objects.filter(
+        location__name__startswith=SYNTHETIC_LOCATION_PREFIX
+    )
+    with transaction.atomic():
+        # Отчеты защищены от удаления шаблона (PROTECT) - сначала они
+        Inspection.objects.filter(template__in=templates).delete()
+        Location.objects.filter(name__startswith=SYNTHETIC_LOCATION_PREFIX).delete()
+        User.objects.filter(email__endswith=f"@{SYNTHETIC_EMAIL_DOMAIN}").delete()
+
+
+def _synthetic_blob(count):
+    # Одно маленькое фото на все нарушения: файл один, ссылок count
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 60, 60)).save(buffer, "JPEG")
+    content = buffer.getvalue()
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    blob = PhotoBlob.objects.filter(sha256=sha256).first()
+    if blob is None:
+        blob = PhotoBlob(sha256=sha256, status=PhotoBlob.STATUS_READY)
+        blob.image.save("synthetic.jpg", ContentFile(content), save=False)
+    blob.ref_count += count
+    blob.save()
+    return blob
+
+
+def generate_synthetic_data(volumes):
+    """
+    Создает справочники, сотрудников, расписание и завершенные отчеты
+    за последние volumes.days дней (только рабочие дни), плюс задания
+    на сегодня без отчетов - для замеров "Начать проверку".
+
+    Все пишется bulk_create; итоги дня, серии нарушений и кеши
+    пересчитываются в конце. Предыдущие синтетические данные удаляются.
+    Возвращает SyntheticResult.
+    """
+    rng = random.Random(volumes.seed)
+    result = SyntheticResult()
+    today = timezone.now().date()
+    start_date = today - datetime.timedelta(days=volumes.days)
+    days = get_work_calendar().working_days(
+        start_date, today - datetime.timedelta(days=1)
+    )
+
+    with transaction.atomic():
+        clear_synthetic_data()
+
+        # --- Справочники ---
+        locations = Location.objects.bulk_create(
+            Location(name=f"{SYNTHETIC_LOCATION_PREFIX}: участок {i + 1}")
+            for i in range(volumes.locations)
+        )
+        templates = ChecklistTemplate.objects.bulk_create(
+            ChecklistTemplate(name=f"Шаблон {i + 1}", location=location)
+            for location in locations
+            for i in range(volumes.templates_per_location)
+        )
+        sections = ChecklistSection.objects.bulk_create(
+            ChecklistSection(template=template, title=f"Раздел {i + 1}", order=i)
+            for template in templates
+            for i in range(volumes.sections)
+        )
+        criteria = ChecklistCriteria.objects.bulk_create(
+            (
+                ChecklistCriteria(section=section, text=f"Вопрос {i + 1}", order=i)
+                for section in sections
+                for i in range(volumes.criteria_per_section)
+            ),
+            batch_size=SYNTHETIC_BATCH_SIZE,
+        )
+        # Снимки шаблонов - как при создании настоящего отчета
+        snapshots = {
+            template.id: get_template_snapshot(template.id) for template in templates
+        }
+
+        # --- Сотрудники (пароль не задан - войти под ними нельзя) ---
+        inspectors = [
+            User.objects.create_user(
+                email=f"inspector{i + 1}@{SYNTHETIC_EMAIL_DOMAIN}",
+                first_name="Сотрудник",
+                last_name=f"Синтетический{i + 1}",
+                can_perform_inspections=True,
+            )
+            for i in range(volumes.inspectors)
+        ]
+        User.objects.create_user(
+            email=f"admin@{SYNTHETIC_EMAIL_DOMAIN}",
+            first_name="Администратор",
+            last_name="Синтетический",
+            role=User.ROLE_ADMIN,
+            is_staff=True,
+        )
+
+        # --- Отчеты прошлых дней ---
+        inspections = []
+        for day_index, date in enumerate(days):
+            for template_index, template in enumerate(templates):
+                inspector = inspectors[(day_index + template_index) % len(inspectors)]
+                inspections.append(
+                    Inspection(
+                        inspector=inspector,
+                        template=template,
+                        date_check=date,
+                        location_snapshot=template.location.name,
+                        is_completed=True,
+                        items_total=len(snapshots[template.id]),
+                    )
+                )
+        Inspection.objects.bulk_create(inspections, batch_size=SYNTHETIC_BATCH_SIZE)
+
+        items = []
+        for inspection in inspections:
+            for item in build_inspection_items(
+                inspection, snapshots[inspection.template_id]
+            ):
+                if rng.random() < volumes.violation_rate:
+                    item.is_compliant = False
+                    item.comment = "Синтетическое нарушение"
+                    inspection.violations_total += 1
+                items.append(item)
+        InspectionItem.objects.bulk_create(items, batch_size=SYNTHETIC_BATCH_SIZE)
+
+        # --- Фото нарушений ---
+        photo_items = [
+            item
+            for item in items
+            if not item.is_compliant and rng.random() < volumes.photo_rate
+        ]
+        if photo_items:
+            blob = _synthetic_blob(len(photo_items))
+            ViolationPhoto.objects.bulk_create(
+                (ViolationPhoto(item=item, blob=blob) for item in photo_items),
+                batch_size=SYNTHETIC_BATCH_SIZE,
+            )
+            for item in photo_items:
+                item.inspection.photos_total += 1
+        Inspection.objects.bulk_update(
+            inspections,
+            ["violations_total", "photos_total"],
+            batch_size=SYNTHETIC_BATCH_SIZE,
+        )
+
+        # --- Расписание: выполненные слоты прошлых дней + задания на сегодня ---
+        schedules = [
+            Schedule(
+                inspector=inspection.inspector,
+                template=inspection.template,
+                date=inspection.date_check,
+                inspection=inspection,
+            )
+            for inspection in inspections
+        ]
+        schedules.extend(
+            Schedule(
+                inspector=inspectors[i % len(inspectors)],
+                template=template,
+                date=today,
+            )
+            for i, template in enumerate(templates)
+        )
+        Schedule.objects.bulk_create(schedules, batch_size=SYNTHETIC_BATCH_SIZE)
+
+        # --- Производные данные ---
+        rebuild_compliance_daily(start_date=start_date)
+        rebuild_criterion_violations()
+        transaction.on_commit(invalidate_schedule_matrices)
+        transaction.on_commit(invalidate_analytics)
+
+    result.templates = len(templates)
+    result.criteria = len(criteria)
+    result.inspectors = len(inspectors)
+    result.schedules = len(schedules)
+    result.inspections = len(inspections)
+    result.items = len(items)
+    result.photos = len(photo_items)
+    return result
@@ -0,0 +1,33 @@
+from celery import shared_task
+
+from checklists.media_gc import cleanup_media
+from checklists.photos import process_blob
+from checklists.services import extend_schedule_horizon
+
+
+@shared_task
+def extend_schedule_horizon_task(weeks=None):
+    """
+    Периодическая задача (Celery beat): достраивает расписание
+    до горизонта в N недель. Безопасна при параллельном запуске.
+    """
+    return str(extend_schedule_horizon(weeks))
+
+
+@shared_task
+def process_photo_blob_task(blob_id):
+    """
+    Обработка загруженного фото: JPEG без EXIF + уменьшенные копии.
+    Ставится в очередь из services.attach_photos после коммита
+    (только для новых файлов - дубли уже обработаны).
+    """
+    return process_blob(blob_id)
+
+
+@shared_task
+def cleanup_media_task():
+    """
+    Периодическая задача (Celery beat): удаляет файлы фото без записи в БД
+    и брошенные загрузки по частям.
+    """
+    return str(cleanup_media(delete=True))
@@ -0,0 +1,19 @@
+from django import template
+
+from checklists.photos import rendition_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def photo_src(photo, display_px):
+    """
+    URL уменьшенной копии фото для показа шириной display_px (в CSS-пикселях).
+    Оригинал - только по клику: <a href="{{ photo.blob.image.url }}">.
+
+    Пример:
+        {% load photo_tags %}
+        {% photo_src photo 100 as src %}
+        {% if src %}<img src="{{ src }}">{% endif %}
+    """
+    return rendition_url(photo, display_px) or ""
@@ -1 +1,1914 @@
-# Create your tests here.
+import datetime
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from PIL import Image
+
+from checklists import violations
+from checklists.caching import track_cache_stats
+from checklists.compliance import (
+    month_starts,
+    monthly_compliance,
+    rebuild_compliance_daily,
+)
+from checklists.counters import find_counter_mismatches, recount_inspection_counters
+from checklists.history import HISTORY_ORDERING, keyset_page
+from checklists.media_gc import cleanup_media
+from checklists.metrics import endpoint_summaries
+from checklists.models import (
+    CalendarOverride,
+    ChecklistCriteria,
+    ChecklistSection,
+    ChecklistTemplate,
+    ComplianceDaily,
+    CriterionViolation,
+    Inspection,
+    InspectionItem,
+    Location,
+    PhotoBlob,
+    PhotoRendition,
+    PhotoUploadSession,
+    Schedule,
+    SchedulerState,
+    SwapLog,
+    ViolationPhoto,
+)
+from checklists.photos import RENDITION_SIZES, process_blob, rendition_url
+from checklists.schedule_matrix import week_start
+from checklists.scheduling import BalancedEngine, build_fairness_report
+from checklists.services import (
+    attach_photos,
+    extend_schedule_horizon,
+    generate_schedule,
+    perform_auto_swap,
+    save_inspection_answers,
+)
+from checklists.snapshots import get_template_snapshot
+from checklists.synthetic import SyntheticVolumes, generate_synthetic_data
+from checklists.violations import STATE_FIELDS, rebuild_criterion_violations
+from checklists.workcalendar import get_work_calendar
+from users.models import UserAbsence
+from users.services import AbsenceIndex
+
+User = get_user_model()
+
+
+def make_inspectors(count):
+    return [
+        User.objects.create_user(
+            email=f"inspector{i}@example.com",
+            first_name="Иван",
+            last_name=f"Проверяющий{i}",
+            can_perform_inspections=True,
+        )
+        for i in range(count)
+    ]
+
+
+def make_templates(count):
+    location = Location.objects.create(name="Цех №1")
+    return [
+        ChecklistTemplate.objects.create(name=f"Шаблон {i}", location=location)
+        for i in range(count)
+    ]
+
+
+def make_inspection(inspector, items_count):
+    template = make_templates(1)[0]
+    inspection = Inspection.objects.create(
+        inspector=inspector,
+        template=template,
+        date_check=timezone.now().date(),
+        location_snapshot=template.location.name,
+        items_total=items_count,
+    )
+    InspectionItem.objects.bulk_create(
+        InspectionItem(
+            inspection=inspection,
+            section_name="Раздел А",
+            criteria_text=f"Вопрос {i}",
+            criteria_order=i,
+        )
+        for i in range(items_count)
+    )
+    return inspection
+
+
+class InspectionFormSaveTests(TestCase):
+    """
+    Сохранение формы отчета: количество запросов не зависит от числа пунктов.
+    """
+
+    # Сессия + пользователь, отчет, пункты, SAVEPOINT/RELEASE
+    BASE_QUERIES = 6
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_inspectors(1)[0]
+        self.client.force_login(self.user)
+
+    def post_form(self, inspection, data, expected_queries):
+        url = reverse("inspection_form", args=[inspection.id])
+        with self.assertNumQueries(expected_queries):
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+
+    def form_data(self, inspection):
+        # Форма всегда присылает ВСЕ пункты, даже нетронутые
+        data = {}
+        for item in inspection.items.all():
+            data[f"compliant_{item.id}"] = "true" if item.is_compliant else "false"
+            data[f"comment_{item.id}"] = item.comment
+        return data
+
+    def test_untouched_form_writes_nothing(self):
+        inspection = make_inspection(self.user, 200)
+        self.post_form(inspection, self.form_data(inspection), self.BASE_QUERIES)
+
+    def test_changes_are_written_in_one_update_per_field_set(self):
+        for items_count in (10, 200):
+            with self.subTest(items_count=items_count):
+                inspection = make_inspection(self.user, items_count)
+                data = self.form_data(inspection)
+                item_ids = list(inspection.items.values_list("id", flat=True))
+
+                # Половина пунктов: только статус, другая: статус + комментарий
+                for i, item_id in enumerate(item_ids):
+                    data[f"compliant_{item_id}"] = "false"
+                    if i % 2:
+                        data[f"comment_{item_id}"] = "Грязно"
+
+                # 2 UPDATE пунктов + ревизия отчета
+                self.post_form(inspection, data, self.BASE_QUERIES + 3)
+                self.assertEqual(
+                    inspection.items.filter(is_compliant=False).count(), items_count
+                )
+                self.assertEqual(
+                    inspection.items.filter(comment="Грязно").count(),
+                    items_count // 2,
+                )
+                inspection.delete()
+
+    def test_photos_are_saved_in_constant_queries(self):
+        inspection = make_inspection(self.user, 50)
+        data = self.form_data(inspection)
+        for item_id in inspection.items.values_list("id", flat=True)[:5]:
+            data[f"photos_{item_id}"] = [
+                SimpleUploadedFile(f"photo{n}.jpg", b"jpeg", "image/jpeg")
+                for n in range(2)
+            ]
+
+        # Блобы: UPDATE счетчиков + SELECT + INSERT; фото: один INSERT;
+        # счетчик фото отчета; ревизия отчета; 4 SAVEPOINT/RELEASE
+        self.post_form(inspection, data, self.BASE_QUERIES + 10)
+        self.assertEqual(ViolationPhoto.objects.count(), 10)
+        # Все 10 файлов одинаковые - на диске один
+        blob = PhotoBlob.objects.get()
+        self.assertEqual(blob.ref_count, 10)
+        inspection.refresh_from_db()
+        self.assertEqual(inspection.photos_total, 10)
+
+    def test_complete_marks_inspection_in_same_transaction(self):
+        inspection = make_inspection(self.user, 20)
+        data = self.form_data(inspection)
+        data["action"] = "complete"
+
+        # Отчет + итоги дня: агрегат пунктов, UPDATE итогов (строки нет),
+        # INSERT в своем SAVEPOINT; открытые нарушения: SELECT пунктов
+        # (пункты без вопросов справочника - DELETE/INSERT не нужны)
+        self.post_form(inspection, data, self.BASE_QUERIES + 7)
+        inspection.refresh_from_db()
+        self.assertTrue(inspection.is_completed)
+
+        daily = ComplianceDaily.objects.get()
+        self.assertEqual((daily.total_items, daily.compliant_items), (20, 20))
+        self.assertEqual(daily.score, 100)
+
+    def test_daily_compliance_matches_rebuild(self):
+        for date_offset, bad_items in ((0, 0), (0, 5), (1, 20)):
+            inspection = make_inspection(self.user, 20)
+            Inspection.objects.filter(id=inspection.id).update(
+                date_check=inspection.date_check + datetime.timedelta(days=date_offset)
+            )
+            data = self.form_data(inspection)
+            for item_id in list(inspection.items.values_list("id", flat=True))[
+                :bad_items
+            ]:
+                data[f"compliant_{item_id}"] = "false"
+            data["action"] = "complete"
+            self.client.post(reverse("inspection_form", args=[inspection.id]), data)
+            # Повторное "Завершить" не удваивает итоги
+            save_inspection_answers(inspection, {}, MultiValueDict(), complete=True)
+
+        incremental = sorted(
+            ComplianceDaily.objects.values_list(
+                "date", "template_id", "total_items", "compliant_items", "score"
+            )
+        )
+        self.assertEqual(rebuild_compliance_daily(), 3)
+        rebuilt = sorted(
+            ComplianceDaily.objects.values_list(
+                "date", "template_id", "total_items", "compliant_items", "score"
+            )
+        )
+        self.assertEqual(incremental, rebuilt)
+
+        month = monthly_compliance(datetime.date(2000, 1, 1), by=None)
+        self.assertEqual(sum(row["total"] for row in month), 60)
+        self.assertEqual(sum(row["compliant"] for row in month), 35)
+
+
+class TemplateSnapshotTests(TestCase):
+    """
+    Снимок шаблона: пересобирается после любой правки справочника
+    (в том числе переноса раздела/вопроса в другой шаблон).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.template, self.other = make_templates(2)
+        self.section = ChecklistSection.objects.create(
+            template=self.template, title="Общее", order=1
+        )
+        self.criteria = ChecklistCriteria.objects.create(
+            section=self.section, text="Порядок", order=1
+        )
+
+    def assert_rebuilt(self, *templates):
+        for template in templates:
+            with track_cache_stats() as stats:
+                get_template_snapshot(template.id)
+            self.assertEqual(stats["misses"], 1, template.name)
+
+    def edit(self, instance, **fields):
+        # Снимки обоих шаблонов уже в кеше
+        for template in (self.template, self.other):
+            get_template_snapshot(template.id)
+        for name, value in fields.items():
+            setattr(instance, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_rebuilt_after_edits(self):
+        self.edit(self.template, name="Новое имя")
+        self.assert_rebuilt(self.template)
+
+        self.edit(self.section, title="Чистота")
+        self.assert_rebuilt(self.template)
+        self.assertEqual(
+            get_template_snapshot(self.template.id)[0].section_title, "Чистота"
+        )
+
+        self.edit(self.criteria, text="Порядок на складе")
+        self.assertEqual(
+            get_template_snapshot(self.template.id)[0].criteria_text,
+            "Порядок на складе",
+        )
+
+    def test_moving_rebuilds_both_templates(self):
+        other_section = ChecklistSection.objects.create(
+            template=self.other, title="Другой", order=1
+        )
+        self.edit(self.criteria, section=other_section)
+        self.assert_rebuilt(self.template, self.other)
+        self.assertEqual(get_template_snapshot(self.template.id), [])
+
+        self.edit(other_section, template=self.template)
+        self.assert_rebuilt(self.template, self.other)
+        self.assertEqual(get_template_snapshot(self.other.id), [])
+        self.assertEqual(len(get_template_snapshot(self.template.id)), 1)
+
+    def test_preview_groups_by_section_and_keeps_empty(self):
+        # Второй раздел с тем же названием и пустой раздел между ними
+        ChecklistSection.objects.create(template=self.template, title="Пусто", order=2)
+        same_title = ChecklistSection.objects.create(
+            template=self.template, title="Общее", order=3
+        )
+        ChecklistCriteria.objects.create(section=same_title, text="Свет", order=1)
+        self.client.force_login(
+            User.objects.create_user(email="admin@example.com", is_staff=True)
+        )
+
+        response = self.client.get(reverse("template_preview", args=[self.template.id]))
+
+        sections = response.context["sections"]
+        self.assertEqual(
+            [(s["title"], len(s["criteria"])) for s in sections],
+            [("Общее", 1), ("Пусто", 0), ("Общее", 1)],
+        )
+        self.assertContains(response, "В разделе нет вопросов.")
+
+
+class AdminDashboardTests(TestCase):
+    """
+    Дашборд администратора: страница в общем макете, цифры из итогов дня.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", is_staff=True)
+        self.client.force_login(self.admin)
+
+    def test_dashboard_is_rendered_once_in_layout(self):
+        response = self.client.get(reverse("admin_dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "base_admin.html")
+        self.assertContains(response, "<title>Дашборд | Система Чек-листов</title>")
+        self.assertContains(response, "Всего шаблонов", count=1)
+        self.assertLess(len(response.content), 20_000)
+
+    def test_exactly_dashboard_months_with_zero_cells(self):
+        inspector = make_inspectors(1)[0]
+        inspection = make_inspection(inspector, 4)
+        # Отчет четыре месяца назад; остальные месяцы - пустые ячейки
+        month = month_starts(timezone.now().date(), 5)[0]
+        Inspection.objects.filter(id=inspection.id).update(date_check=month)
+        inspection.refresh_from_db()
+        save_inspection_answers(inspection, {}, MultiValueDict(), complete=True)
+
+        response = self.client.get(reverse("admin_dashboard"))
+
+        months = response.context["months"]
+        self.assertEqual(len(months), 6)
+        self.assertEqual(months[-1], timezone.now().date().replace(day=1))
+        self.assertEqual(months[1], month)
+        (row,) = response.context["monthly_rows"]
+        self.assertEqual(
+            [cell["inspections"] for cell in row["cells"]], [0, 1, 0, 0, 0, 0]
+        )
+        self.assertIsNone(row["cells"][0]["score"])
+
+    def test_month_starts_crosses_year(self):
+        self.assertEqual(
+            month_starts(datetime.date(2024, 2, 29), 3),
+            [
+                datetime.date(2023, 12, 1),
+                datetime.date(2024, 1, 1),
+                datetime.date(2024, 2, 1),
+            ],
+        )
+
+    def test_rebuild_counts_inspections_without_items(self):
+        inspection = make_inspection(make_inspectors(1)[0], 0)
+        save_inspection_answers(inspection, {}, MultiValueDict(), complete=True)
+        fields = ("date", "template_id", "inspections_count", "total_items", "score")
+        incremental = list(ComplianceDaily.objects.values_list(*fields))
+
+        self.assertEqual(rebuild_compliance_daily(), 1)
+        self.assertEqual(
+            list(ComplianceDaily.objects.values_list(*fields)), incremental
+        )
+        self.assertEqual(incremental[0][2:], (1, 0, 100))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class InspectionCountersTests(TestCase):
+    """
+    Счетчики отчета (пункты, нарушения, фото) совпадают с реальными данными
+    после всех путей сохранения.
+    """
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_counters_follow_all_save_paths(self):
+        user = make_inspectors(1)[0]
+        self.client.force_login(user)
+        inspection = make_inspection(user, 10)
+        first, second, third = inspection.items.order_by("id")[:3]
+
+        # Форма: два нарушения и фото
+        data = {
+            f"compliant_{first.id}": "false",
+            f"compliant_{second.id}": "false",
+            f"photos_{first.id}": SimpleUploadedFile("a.jpg", b"a", "image/jpeg"),
+        }
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(reverse("inspection_form", args=[inspection.id]), data)
+
+        # Автосохранение: одно нарушение снято, одно добавлено, одно без изменений
+        self.client.post(
+            reverse("autosave_inspection_ajax", args=[inspection.id]),
+            {
+                "revision": 1,
+                "items": {
+                    str(first.id): {"is_compliant": True},
+                    str(second.id): {"is_compliant": False},
+                    str(third.id): {"is_compliant": False},
+                },
+            },
+            content_type="application/json",
+        )
+
+        # AJAX-загрузка и удаление фото, комментарий
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(
+                reverse("upload_photo_ajax", args=[third.id]),
+                {"photos": SimpleUploadedFile("b.jpg", b"b", "image/jpeg")},
+            )
+        photo = ViolationPhoto.objects.get(item=first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("delete_photo_ajax", args=[photo.id]))
+        self.client.post(
+            reverse("save_comment_ajax", args=[second.id]), {"comment": "Грязно"}
+        )
+
+        inspection.refresh_from_db()
+        self.assertEqual(
+            (inspection.items_total, inspection.violations_total),
+            (10, 2),
+        )
+        self.assertEqual(inspection.photos_total, 1)
+        self.assertFalse(find_counter_mismatches().exists())
+
+    def test_recount_fixes_drift(self):
+        inspection = make_inspection(make_inspectors(1)[0], 5)
+        inspection.items.filter(id__in=inspection.items.values("id")[:2]).update(
+            is_compliant=False
+        )
+        Inspection.objects.filter(id=inspection.id).update(items_total=0)
+
+        (mismatch,) = find_counter_mismatches()
+        self.assertEqual((mismatch.actual_items_total, mismatch.items_total), (5, 0))
+        self.assertEqual(mismatch.actual_violations_total, 2)
+
+        self.assertEqual(recount_inspection_counters(), 1)
+        self.assertFalse(find_counter_mismatches().exists())
+
+
+class AdminHistoryTests(TestCase):
+    """
+    Журнал проверок: листание по курсору и фильтры.
+    """
+
+    def setUp(self):
+        self.inspector = make_inspectors(1)[0]
+        today = timezone.now().date()
+        # Пары с одинаковой датой: порядок внутри дня держится на created_at и id
+        self.inspections = []
+        for i in range(7):
+            inspection = make_inspection(self.inspector, 0)
+            Inspection.objects.filter(id=inspection.id).update(
+                is_completed=True,
+                date_check=today - datetime.timedelta(days=i // 2),
+                violations_total=i % 3,
+            )
+            self.inspections.append(inspection)
+
+    def test_pages_cover_journal_without_gaps(self):
+        completed = Inspection.objects.filter(is_completed=True)
+        expected = list(
+            completed.order_by(*HISTORY_ORDERING).values_list("id", flat=True)
+        )
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(completed, cursor, size=3)
+            seen.extend(inspection.id for inspection in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_filters_and_constant_page_cost(self):
+        admin = User.objects.create_user(email="admin@example.com", is_staff=True)
+        self.client.force_login(admin)
+        url = reverse("admin_history")
+
+        response = self.client.get(url, {"violations": "yes"})
+        self.assertEqual(
+            {
+                inspection.violations_total > 0
+                for inspection in response.context["inspections"]
+            },
+            {True},
+        )
+        response = self.client.get(url, {"template": self.inspections[0].template_id})
+        self.assertEqual(
+            [inspection.id for inspection in response.context["inspections"]],
+            [self.inspections[0].id],
+        )
+
+        # Дальняя страница стоит столько же запросов, сколько первая
+        with mock.patch("checklists.history.HISTORY_PAGE_SIZE", 2):
+            with self.assertNumQueries(5):
+                first = self.client.get(url)
+            cursor = first.context["next_url"]
+            for _ in range(2):
+                with self.assertNumQueries(5):
+                    cursor = self.client.get(url + cursor).context["next_url"]
+            self.assertIsNotNone(cursor)
+
+        # Испорченный курсор - первая страница, а не ошибка
+        self.assertEqual(self.client.get(url, {"after": "мусор"}).status_code, 200)
+
+
+class WeeklyScheduleCacheTests(TestCase):
+    """
+    Матрица расписания: повторный показ из кеша, сброс при правках.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(email="admin@example.com", is_staff=True)
+        self.client.force_login(self.admin)
+        self.inspector, self.other = make_inspectors(2)
+        self.template = make_templates(1)[0]
+        # Среда: рабочий день в любую неделю, кроме праздничных
+        self.day = week_start(timezone.now().date()) + datetime.timedelta(days=2)
+        CalendarOverride.objects.create(date=self.day, is_working_day=True)
+        self.slot = Schedule.objects.create(
+            inspector=self.inspector, template=self.template, date=self.day
+        )
+        self.url = reverse("admin_schedule")
+
+    def cell(self, response):
+        (week,) = response.context["weeks"]
+        (row,) = [row for row in week["rows"] if row["template_id"] == self.template.id]
+        return row["cells"][week["days"].index(self.day)]
+
+    def test_matrix_is_cached_and_invalidated(self):
+        params = {"week": self.day.isoformat()}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(self.url, params)
+        # Из кеша: только сессия и пользователь
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, params)
+        self.assertEqual(self.cell(response)["inspector"], "Проверяющий0 И.")
+
+        # Правка слота (сигнал post_save) - неделя перестраивается
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slot.inspector = self.other
+            self.slot.save()
+        response = self.client.get(self.url, params)
+        self.assertEqual(self.cell(response)["inspector"], "Проверяющий1 И.")
+
+        # Завершение отчета (UPDATE без сигналов) - тоже
+        inspection = make_inspection(self.other, 0)
+        Inspection.objects.filter(id=inspection.id).update(date_check=self.day)
+        inspection.refresh_from_db()
+        Schedule.objects.filter(id=self.slot.id).update(inspection=inspection)
+        with self.captureOnCommitCallbacks(execute=True):
+            save_inspection_answers(inspection, {}, MultiValueDict(), complete=True)
+        response = self.client.get(self.url, params)
+        self.assertTrue(self.cell(response)["is_completed"])
+
+    def test_several_weeks_are_built_in_one_pass(self):
+        # Сессия, пользователь, переносы календаря, шаблоны, расписание
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                self.url, {"week": self.day.isoformat(), "weeks": 4}
+            )
+        self.assertEqual(len(response.context["weeks"]), 4)
+        self.assertEqual(
+            response.context["next_week"],
+            week_start(self.day) + datetime.timedelta(weeks=4),
+        )
+
+
+class ViolationAnalyticsTests(TestCase):
+    """
+    Аналитика нарушений: один GROUP BY, ответ из кеша до завершения нового отчета.
+    """
+
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_user(email="admin@example.com", is_staff=True)
+        self.client.force_login(admin)
+        self.url = reverse("violation_analytics_api")
+
+        inspector = make_inspectors(1)[0]
+        self.inspections = [make_inspection(inspector, 0) for _ in range(2)]
+        self.criteria = []
+        for inspection in self.inspections:
+            section = ChecklistSection.objects.create(
+                template=inspection.template, title="Раздел А"
+            )
+            self.criteria.append(
+                ChecklistCriteria.objects.create(section=section, text="Чисто")
+            )
+        # Вопрос первого шаблона нарушен в обоих отчетах первого шаблона
+        today = timezone.now().date()
+        for inspection, criteria, bad in zip(self.inspections, self.criteria, (2, 1)):
+            for i in range(4):
+                InspectionItem.objects.create(
+                    inspection=inspection,
+                    criteria_origin=criteria,
+                    criteria_text=criteria.text,
+                    section_name="Раздел А",
+                    is_compliant=i >= bad,
+                )
+            Inspection.objects.filter(id=inspection.id).update(
+                is_completed=True, date_check=today
+            )
+
+    def test_rates_per_criterion_and_location(self):
+        response = self.client.get(self.url, {"by": "criterion"})
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()["rows"]
+        self.assertEqual(
+            [
+                (row["criteria_origin_id"], row["violations"], row["rate"])
+                for row in rows
+            ],
+            [(self.criteria[0].id, 2, 50.0), (self.criteria[1].id, 1, 25.0)],
+        )
+
+        rows = self.client.get(self.url, {"by": "location", "period": "month"}).json()[
+            "rows"
+        ]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            rows[0]["period"], timezone.now().date().replace(day=1).isoformat()
+        )
+
+        # Повтор - из кеша (сессия + пользователь)
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {"by": "criterion"})
+
+        self.assertEqual(
+            self.client.get(self.url, {"by": "inspector"}).status_code, 400
+        )
+        self.assertEqual(
+            self.client.get(
+                self.url, {"start": "2030-01-01", "end": "2020-01-01"}
+            ).status_code,
+            400,
+        )
+
+
+class OpenViolationsTests(TestCase):
+    """
+    Открытые нарушения по вопросам: ведутся при завершении, форма читает
+    их одним запросом.
+    """
+
+    def setUp(self):
+        self.user = make_inspectors(1)[0]
+        self.client.force_login(self.user)
+        self.template = make_templates(1)[0]
+        section = ChecklistSection.objects.create(template=self.template, title="А")
+        self.criteria = [
+            ChecklistCriteria.objects.create(section=section, text=f"Вопрос {i}")
+            for i in range(3)
+        ]
+        self.today = timezone.now().date()
+
+    def make(self, days_ago):
+        inspection = Inspection.objects.create(
+            inspector=self.user,
+            template=self.template,
+            date_check=self.today - datetime.timedelta(days=days_ago),
+            location_snapshot="Цех",
+        )
+        items = InspectionItem.objects.bulk_create(
+            InspectionItem(
+                inspection=inspection,
+                criteria_origin=criteria,
+                criteria_text=criteria.text,
+                section_name="А",
+            )
+            for criteria in self.criteria
+        )
+        return inspection, items
+
+    def complete(self, days_ago, bad):
+        inspection, items = self.make(days_ago)
+        data = {f"compliant_{item.id}": "true" for item in items}
+        for index in bad:
+            data[f"compliant_{items[index].id}"] = "false"
+            data[f"comment_{items[index].id}"] = f"Грязно {days_ago}"
+        save_inspection_answers(inspection, data, MultiValueDict(), complete=True)
+        return inspection
+
+    def test_form_shows_unresolved_violations(self):
+        self.complete(days_ago=3, bad=[0, 1])
+        # Вопрос 0 устранен, вопрос 1 нарушен повторно, вопрос 2 - новое нарушение
+        self.complete(days_ago=2, bad=[1, 2])
+        draft, _ = self.make(days_ago=0)
+
+        response = self.client.get(reverse("inspection_form", args=[draft.id]))
+        history = {
+            item.criteria_origin_id: item.history.item.comment
+            for items in response.context["sections_data"].values()
+            for item in items
+            if hasattr(item, "history")
+        }
+        self.assertEqual(
+            history,
+            {self.criteria[1].id: "Грязно 2", self.criteria[2].id: "Грязно 2"},
+        )
+
+    def test_streaks_and_reopens(self):
+        # Вопрос 0: нарушение, нарушение, устранено, снова нарушение
+        # Вопрос 1: нарушение во всех четырех отчетах подряд
+        for days_ago, bad in ((4, [0, 1]), (3, [0, 1]), (2, [1]), (1, [0, 1])):
+            last = self.complete(days_ago, bad)
+
+        first, second = (
+            CriterionViolation.objects.get(criteria=criteria)
+            for criteria in self.criteria[:2]
+        )
+        self.assertEqual(
+            (first.is_open, first.consecutive, first.reopened, first.first_seen),
+            (True, 1, 1, last.date_check),
+        )
+        self.assertEqual(first.resolved_on, self.today - datetime.timedelta(days=2))
+        self.assertEqual((second.consecutive, second.reopened), (4, 0))
+        self.assertFalse(CriterionViolation.objects.filter(criteria=self.criteria[2]))
+
+        admin = User.objects.create_user(email="admin@example.com", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse("admin_report_detail", args=[last.id]))
+        self.assertContains(response, "Не устранено: 4 проверок подряд")
+        self.assertContains(response, "Повторялось: 1")
+
+    def test_concurrent_first_violation(self):
+        inspection, items = self.make(days_ago=1)
+        other, other_items = self.make(days_ago=2)
+        original = violations.apply_answer
+
+        def competing_insert(state, criteria_id, *args):
+            # Параллельный отчет успел вставить строку вопроса 0
+            # между нашим SELECT и INSERT
+            if (
+                state is None
+                and criteria_id == self.criteria[0].id
+                and not CriterionViolation.objects.filter(
+                    criteria_id=criteria_id
+                ).exists()
+            ):
+                original(
+                    None, criteria_id, other_items[0].id, False, other.date_check
+                ).save()
+            return original(state, criteria_id, *args)
+
+        InspectionItem.objects.filter(id__in=[items[0].id, items[1].id]).update(
+            is_compliant=False
+        )
+        with mock.patch.object(violations, "apply_answer", competing_insert):
+            violations.record_inspection_violations(inspection)
+
+        first, second = (
+            CriterionViolation.objects.get(criteria=criteria)
+            for criteria in self.criteria[:2]
+        )
+        # Оба нарушения вопроса 0 учтены, вопрос 1 - только наше
+        self.assertEqual((first.consecutive, first.item_id), (2, items[0].id))
+        self.assertEqual(first.first_seen, other.date_check)
+        self.assertEqual((second.consecutive, second.item_id), (1, items[1].id))
+
+    def test_incremental_matches_rebuild(self):
+        self.complete(days_ago=3, bad=[0, 1])
+        self.complete(days_ago=2, bad=[1])
+        self.complete(days_ago=1, bad=[2, 0])
+        fields = ["criteria_id"] + STATE_FIELDS
+        incremental = sorted(CriterionViolation.objects.values_list(*fields))
+        self.assertEqual(rebuild_criterion_violations(), 2)
+        rebuilt = sorted(CriterionViolation.objects.values_list(*fields))
+        self.assertEqual(incremental, rebuilt)
+
+
+class InspectionAutosaveTests(TestCase):
+    """
+    Автосохранение черновика: только измененные пункты, проверка ревизии.
+    """
+
+    def setUp(self):
+        self.user = make_inspectors(1)[0]
+        self.client.force_login(self.user)
+        self.inspection = make_inspection(self.user, 50)
+        self.url = reverse("autosave_inspection_ajax", args=[self.inspection.id])
+
+    def autosave(self, payload):
+        return self.client.post(self.url, payload, content_type="application/json")
+
+    def test_delta_is_saved_and_revision_bumped(self):
+        item_ids = list(self.inspection.items.values_list("id", flat=True)[:3])
+        payload = {
+            "revision": 0,
+            "items": {
+                str(item_id): {"is_compliant": False, "comment": "Грязно"}
+                for item_id in item_ids
+            },
+        }
+
+        response = self.autosave(payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "ok", "revision": 1})
+        self.assertEqual(
+            self.inspection.items.filter(is_compliant=False, comment="Грязно").count(),
+            3,
+        )
+
+    def test_stale_revision_is_rejected(self):
+        item_id = self.inspection.items.values_list("id", flat=True)[0]
+        first = {"revision": 0, "items": {str(item_id): {"comment": "Первая вкладка"}}}
+        second = {"revision": 0, "items": {str(item_id): {"comment": "Вторая вкладка"}}}
+
+        self.assertEqual(self.autosave(first).status_code, 200)
+        response = self.autosave(second)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["revision"], 1)
+        self.assertEqual(
+            InspectionItem.objects.get(id=item_id).comment, "Первая вкладка"
+        )
+
+    def test_comment_endpoint_bumps_revision(self):
+        item_id = self.inspection.items.values_list("id", flat=True)[0]
+        response = self.client.post(
+            reverse("save_comment_ajax", args=[item_id]), {"comment": "Из формы"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Вкладка со старой ревизией не затирает комментарий
+        stale = {"revision": 0, "items": {str(item_id): {"comment": "Старая"}}}
+        self.assertEqual(self.autosave(stale).status_code, 409)
+        self.assertEqual(InspectionItem.objects.get(id=item_id).comment, "Из формы")
+
+    def test_invalid_payload(self):
+        for payload in (
+            {"items": {}},
+            {"revision": 0, "items": {"1": "x"}},
+            {"revision": 0, "items": {"1": {"is_compliant": "да"}}},
+            {"revision": 0, "items": {"x": {}}},
+            [1, 2],
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.autosave(payload).status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PhotoProcessingTests(TestCase):
+    """
+    Фоновая обработка фото: JPEG без EXIF, поворот по ориентации, копии.
+    """
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def make_upload(self, name="IMG_0001.png"):
+        image = Image.new("RGBA", (2000, 1000), "red")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90 по часовой
+        exif[0x010F] = "PhoneMaker"
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+    def test_photo_is_normalized_and_renditions_created(self):
+        inspection = make_inspection(make_inspectors(1)[0], 1)
+        item = inspection.items.get()
+
+        with self.captureOnCommitCallbacks(execute=False):
+            (photo,) = attach_photos([(item, self.make_upload())])
+        blob = photo.blob
+        self.assertEqual(blob.status, PhotoBlob.STATUS_PENDING)
+        raw_name = blob.image.name
+
+        self.assertEqual(process_blob(blob.id), PhotoBlob.STATUS_READY)
+
+        blob.refresh_from_db()
+        self.assertTrue(blob.image.name.endswith(".jpg"))
+        self.assertFalse(blob.image.storage.exists(raw_name))
+        with Image.open(blob.image.path) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (1000, 2000))
+            self.assertEqual(len(image.getexif()), 0)
+
+        renditions = {r.size: r for r in PhotoRendition.objects.filter(blob=blob)}
+        self.assertEqual(sorted(renditions), sorted(RENDITION_SIZES))
+        for size, rendition in renditions.items():
+            self.assertEqual(max(rendition.width, rendition.height), size)
+
+        # Повторный запуск (ретрай Celery) ничего не ломает
+        self.assertEqual(process_blob(blob.id), PhotoBlob.STATUS_READY)
+        self.assertEqual(PhotoRendition.objects.filter(blob=blob).count(), 2)
+
+    def test_missing_rendition_is_created_on_first_request(self):
+        user = make_inspectors(1)[0]
+        item = make_inspection(user, 1).items.get()
+        # Фото, загруженное до появления копий: готово, но без renditions
+        blob = PhotoBlob.objects.create(
+            sha256="0" * 64,
+            image=self.make_upload(),
+            status=PhotoBlob.STATUS_READY,
+            ref_count=1,
+        )
+        photo = ViolationPhoto.objects.create(item=item, blob=blob)
+        self.assertEqual(
+            rendition_url(photo, 100), reverse("photo_rendition", args=[photo.id, 320])
+        )
+
+        self.client.force_login(user)
+        url = reverse("photo_rendition", args=[photo.id, 320])
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 302)
+
+        rendition = PhotoRendition.objects.get(blob=blob)
+        self.assertEqual(response.url, rendition.image.url)
+        # Копия подгружена через prefetch - прямая ссылка на файл
+        photo = ViolationPhoto.objects.prefetch_related("blob__renditions").get(
+            id=photo.id
+        )
+        self.assertEqual(rendition_url(photo, 100), rendition.image.url)
+
+    def test_rendition_only_for_templates_user_works_with(self):
+        owner, colleague, scheduled, stranger = make_inspectors(4)
+        item = make_inspection(owner, 1).items.get()
+        blob = PhotoBlob.objects.create(
+            sha256="0" * 64,
+            image=self.make_upload(),
+            status=PhotoBlob.STATUS_READY,
+            ref_count=1,
+        )
+        photo = ViolationPhoto.objects.create(item=item, blob=blob)
+        url = reverse("photo_rendition", args=[photo.id, 320])
+        template = item.inspection.template
+        # Прошлые нарушения по шаблону видны в форме отчета коллеге
+        Inspection.objects.create(
+            inspector=colleague,
+            template=template,
+            date_check=item.inspection.date_check - datetime.timedelta(days=1),
+            location_snapshot="Участок",
+        )
+        Schedule.objects.create(
+            inspector=scheduled, template=template, date=timezone.now().date()
+        )
+
+        for user in (owner, colleague, scheduled):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(
+            User.objects.create_user(email="a@example.com", is_staff=True)
+        )
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_unreadable_original_gives_404(self):
+        user = make_inspectors(1)[0]
+        item = make_inspection(user, 1).items.get()
+        # "Готово", но файл битый (например, подменили на диске)
+        blob = PhotoBlob.objects.create(
+            sha256="0" * 64,
+            image=SimpleUploadedFile("broken.jpg", b"not an image", "image/jpeg"),
+            status=PhotoBlob.STATUS_READY,
+            ref_count=1,
+        )
+        photo = ViolationPhoto.objects.create(item=item, blob=blob)
+
+        self.client.force_login(user)
+        response = self.client.get(reverse("photo_rendition", args=[photo.id, 320]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(PhotoRendition.objects.exists())
+
+    def test_broken_file_is_marked_failed(self):
+        inspection = make_inspection(make_inspectors(1)[0], 1)
+        item = inspection.items.get()
+        upload = SimpleUploadedFile("broken.heic", b"not an image", "image/heic")
+
+        with self.captureOnCommitCallbacks(execute=False):
+            (photo,) = attach_photos([(item, upload)])
+
+        self.assertEqual(process_blob(photo.blob_id), PhotoBlob.STATUS_FAILED)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PhotoDeduplicationTests(TestCase):
+    """
+    Одинаковые фото хранятся одним файлом; файл удаляется с последней ссылкой.
+    """
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_blob_is_shared_and_released_with_last_reference(self):
+        user = make_inspectors(1)[0]
+        self.client.force_login(user)
+        first, second = InspectionItem.objects.bulk_create(
+            InspectionItem(
+                inspection=make_inspection(user, 0), criteria_text=f"Вопрос {i}"
+            )
+            for i in range(2)
+        )
+
+        with self.captureOnCommitCallbacks(execute=False):
+            photos = attach_photos(
+                [
+                    (first, SimpleUploadedFile("a.jpg", b"same", "image/jpeg")),
+                    (second, SimpleUploadedFile("b.jpg", b"same", "image/jpeg")),
+                ]
+            )
+            # Повторная загрузка после "оборванного" сохранения
+            photos += attach_photos(
+                [(first, SimpleUploadedFile("c.jpg", b"same", "image/jpeg"))]
+            )
+
+        blob = PhotoBlob.objects.get()
+        self.assertEqual(blob.ref_count, 3)
+        self.assertEqual({photo.blob_id for photo in photos}, {blob.id})
+        storage = blob.image.storage
+
+        for photo in photos[:2]:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("delete_photo_ajax", args=[photo.id])
+                )
+            self.assertEqual(response.status_code, 200)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(storage.exists(blob.image.name))
+
+        # Последняя ссылка (каскадом вместе с пунктом) - файл удаляется
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertFalse(PhotoBlob.objects.exists())
+        self.assertFalse(storage.exists(blob.image.name))
+
+    def test_admin_upload_counts_references(self):
+        admin_user = User.objects.create_superuser(email="admin@example.com")
+        self.client.force_login(admin_user)
+        item = make_inspection(make_inspectors(1)[0], 1).items.get()
+        buffer = io.BytesIO()
+        Image.new("RGB", (40, 30)).save(buffer, "PNG")
+        url = reverse("admin:checklists_inspectionitem_change", args=[item.id])
+
+        # Выбора файла из списка всех блобов нет
+        self.assertNotContains(self.client.get(url), 'name="photos-0-blob"')
+
+        data = {
+            "inspection": item.inspection_id,
+            "section_name": item.section_name,
+            "criteria_text": item.criteria_text,
+            "criteria_order": item.criteria_order,
+            "is_compliant": "True",
+            "new_photo": SimpleUploadedFile("a.png", buffer.getvalue(), "image/png"),
+            "photos-TOTAL_FORMS": 0,
+            "photos-INITIAL_FORMS": 0,
+        }
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post(url, data)
+
+        self.assertEqual(response.status_code, 302)
+        photo = ViolationPhoto.objects.get(item=item)
+        self.assertEqual(photo.blob.ref_count, 1)
+        item.inspection.refresh_from_db()
+        self.assertEqual(item.inspection.photos_total, 1)
+        self.assertContains(self.client.get(url), photo.blob.get_status_display())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PhotoBlobMigrationTests(TransactionTestCase):
+    """
+    Миграция 0012 на базе со старыми фото: файлы склеиваются в блобы
+    по хешу, копии переходят к блобу.
+    """
+
+    migrate_from = [("checklists", "0011_photouploadsession")]
+    migrate_to = [("checklists", "0012_photoblob")]
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        # Возвращаем схему к последним миграциям
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_legacy_photos_are_moved_to_blobs(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+
+        # Пользователи мигрируются отдельно - берем текущую модель
+        user = make_inspectors(1)[0]
+        location = apps.get_model("checklists", "Location").objects.create(
+            name="Участок"
+        )
+        template = apps.get_model("checklists", "ChecklistTemplate").objects.create(
+            name="Шаблон", location=location
+        )
+        inspection = apps.get_model("checklists", "Inspection").objects.create(
+            inspector_id=user.id, template=template, location_snapshot="Участок"
+        )
+        item = apps.get_model("checklists", "InspectionItem").objects.create(
+            inspection=inspection, criteria_text="Вопрос", is_compliant=False
+        )
+        ViolationPhoto = apps.get_model("checklists", "ViolationPhoto")
+        names = [
+            default_storage.save(f"violations/{name}.jpg", ContentFile(content))
+            for name, content in (("a", b"same"), ("b", b"same"), ("c", b"other"))
+        ]
+        photos = [
+            ViolationPhoto.objects.create(item=item, image=name, status="ready")
+            for name in [*names, "violations/missing.jpg"]
+        ]
+        for photo in photos[:2]:
+            apps.get_model("checklists", "PhotoRendition").objects.create(
+                photo=photo, size=150, image="r.jpg", width=150, height=150
+            )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        apps = executor.loader.project_state(self.migrate_to).apps
+
+        PhotoBlob = apps.get_model("checklists", "PhotoBlob")
+        blobs = {
+            photo.id: photo.blob
+            for photo in apps.get_model("checklists", "ViolationPhoto")
+            .objects.select_related("blob")
+            .order_by("id")
+        }
+        self.assertEqual(PhotoBlob.objects.count(), 3)
+        self.assertEqual(blobs[photos[0].id], blobs[photos[1].id])
+        self.assertEqual(blobs[photos[0].id].ref_count, 2)
+        self.assertEqual(blobs[photos[0].id].image.name, names[0])
+        self.assertEqual(blobs[photos[2].id].ref_count, 1)
+        self.assertEqual(blobs[photos[3].id].status, "ready")
+        # У склеенных фото остается одна копия на размер
+        renditions = apps.get_model("checklists", "PhotoRendition").objects.all()
+        self.assertEqual(
+            [(r.blob_id, r.size) for r in renditions],
+            [(blobs[photos[0].id].id, 150)],
+        )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MediaCleanupTests(TestCase):
+    """
+    Очистка медиа: удаляются только старые файлы без записи в БД.
+    """
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def make_file(self, name, age_hours):
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"x" * 10)
+        mtime = time.time() - age_hours * 3600
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        item = make_inspection(make_inspectors(1)[0], 1).items.get()
+        with self.captureOnCommitCallbacks(execute=False):
+            (photo,) = attach_photos(
+                [(item, SimpleUploadedFile("a.jpg", b"photo", "image/jpeg"))]
+            )
+        kept = os.path.join(settings.MEDIA_ROOT, photo.blob.image.name)
+        os.utime(kept, (0, 0))
+        orphan = self.make_file("violations/2025/01/01/old.jpg", age_hours=48)
+        fresh = self.make_file("violations/2025/01/01/fresh.jpg", age_hours=1)
+
+        # batch_size=1: каждая пачка сверяется отдельно
+        report = cleanup_media(delete=False, batch_size=1)
+        self.assertEqual((report.scanned, report.orphans, report.deleted), (3, 1, 0))
+        self.assertTrue(os.path.exists(orphan))
+
+        result = cleanup_media(delete=True)
+        self.assertEqual(result.deleted, 1)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(kept))
+        self.assertTrue(os.path.exists(fresh))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@mock.patch("checklists.uploads.CHUNK_SIZE", 10)
+class ChunkedUploadTests(TestCase):
+    """
+    Загрузка фото по частям: докачка с правильного смещения после обрыва.
+    """
+
+    CONTENT = b"0123456789abcdefghijKLMNO"  # 25 байт
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = make_inspectors(1)[0]
+        self.client.force_login(self.user)
+        self.item = make_inspection(self.user, 1).items.get()
+
+    def start(self, size=None):
+        response = self.client.post(
+            reverse("upload_start_ajax", args=[self.item.id]),
+            {"filename": "C:\\DCIM\\photo.jpg", "size": size or len(self.CONTENT)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return reverse("upload_chunk_ajax", args=[response.json()["upload_id"]])
+
+    def send(self, url, offset, data):
+        return self.client.post(
+            url,
+            data,
+            content_type="application/octet-stream",
+            HTTP_X_UPLOAD_OFFSET=offset,
+        )
+
+    def test_upload_resumes_from_server_offset(self):
+        url = self.start()
+
+        self.assertEqual(self.send(url, 0, self.CONTENT[:10]).json()["offset"], 10)
+        # Клиент не получил ответ и повторил ту же часть - сервер подсказывает смещение
+        response = self.send(url, 0, self.CONTENT[:10])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 10)
+        self.assertEqual(self.client.get(url).json()["offset"], 10)
+
+        self.assertEqual(self.send(url, 10, self.CONTENT[10:20]).json()["offset"], 20)
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.send(url, 20, self.CONTENT[20:])
+        self.assertEqual(response.json()["status"], "done")
+
+        photo = ViolationPhoto.objects.get(item=self.item)
+        self.assertEqual(photo.blob.status, PhotoBlob.STATUS_PENDING)
+        self.assertTrue(photo.blob.image.name.endswith(".jpg"))
+        with photo.blob.image.open("rb") as file:
+            self.assertEqual(file.read(), self.CONTENT)
+        self.assertFalse(PhotoUploadSession.objects.exists())
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_oversized_chunk_is_rejected(self):
+        url = self.start()
+
+        self.assertEqual(self.send(url, 0, self.CONTENT[:11]).status_code, 400)
+        self.assertEqual(self.client.get(url).json()["offset"], 0)
+
+    def test_foreign_upload_is_not_found(self):
+        url = self.start()
+        other = User.objects.create_user(
+            email="other@example.com", first_name="Петр", last_name="Чужой"
+        )
+        self.client.force_login(other)
+
+        self.assertEqual(self.send(url, 0, self.CONTENT[:10]).status_code, 404)
+
+    def test_file_size_is_limited(self):
+        response = self.client.post(
+            reverse("upload_start_ajax", args=[self.item.id]),
+            {"filename": "huge.jpg", "size": 10**10},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class WorkCalendarTests(TestCase):
+    """
+    Производственный календарь: праздники и переносы holidays.BY,
+    ручные правки админа (CalendarOverride) важнее библиотеки.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_holidays_and_transfers(self):
+        calendar = get_work_calendar()
+
+        self.assertFalse(calendar.is_working_day(datetime.date(2025, 1, 1)))
+        # Перенос: понедельник 6-го - выходной, суббота 11-го - рабочая
+        self.assertEqual(
+            calendar.working_days(
+                datetime.date(2025, 1, 6), datetime.date(2025, 1, 12)
+            ),
+            [datetime.date(2025, 1, day) for day in (8, 9, 10, 11)],
+        )
+        self.assertEqual(
+            calendar.next_working_days(datetime.date(2025, 1, 1), 2),
+            [datetime.date(2025, 1, 3), datetime.date(2025, 1, 8)],
+        )
+
+    def test_override_wins_over_holidays(self):
+        new_year = datetime.date(2025, 1, 1)
+        ordinary = datetime.date(2025, 1, 8)
+        # Календарь уже построен и закеширован
+        self.assertFalse(get_work_calendar().is_working_day(new_year))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CalendarOverride.objects.create(date=new_year, is_working_day=True)
+            CalendarOverride.objects.create(date=ordinary, is_working_day=False)
+
+        calendar = get_work_calendar()
+        self.assertTrue(calendar.is_working_day(new_year))
+        self.assertFalse(calendar.is_working_day(ordinary))
+
+        # Удаление правки возвращает календарь библиотеки
+        with self.captureOnCommitCallbacks(execute=True):
+            CalendarOverride.objects.filter(date=new_year).delete()
+        self.assertFalse(get_work_calendar().is_working_day(new_year))
+
+    def test_generator_follows_calendar(self):
+        make_inspectors(1)
+        make_templates(1)
+
+        result = generate_schedule(datetime.date(2025, 1, 6), 7)
+
+        self.assertEqual(
+            result.skipped_days,
+            [datetime.date(2025, 1, day) for day in (6, 7, 12)],
+        )
+        self.assertTrue(Schedule.objects.filter(date="2025-01-11").exists())
+
+
+class ScheduleGenerationTests(TestCase):
+    """
+    Генерация расписания "множествами": итог в ScheduleResult,
+    отсутствующие пропускаются, повторный запуск ничего не дублирует.
+    """
+
+    # Обычная неделя без праздников: понедельник - воскресенье
+    START = datetime.date(2025, 1, 13)
+
+    def setUp(self):
+        self.inspectors = make_inspectors(3)
+        self.templates = make_templates(2)
+
+    def test_result_counts_slots_and_days_off(self):
+        result = generate_schedule(self.START, 7)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.end_date, datetime.date(2025, 1, 19))
+        self.assertEqual(
+            result.skipped_days,
+            [datetime.date(2025, 1, 18), datetime.date(2025, 1, 19)],
+        )
+        # 5 рабочих дней по 2 шаблона, очередь по кругу
+        self.assertEqual(result.created, 10)
+        inspectors = list(
+            Schedule.objects.order_by("date", "template_id").values_list(
+                "inspector_id", flat=True
+            )
+        )
+        self.assertEqual(
+            inspectors[:4],
+            [user.id for user in [*self.inspectors, self.inspectors[0]]],
+        )
+
+    def test_rerun_is_idempotent(self):
+        first = generate_schedule(self.START, 7)
+        second = generate_schedule(self.START, 7)
+
+        self.assertEqual(second.created, 0)
+        self.assertEqual(second.skipped_existing, first.created)
+        self.assertEqual(Schedule.objects.count(), first.created)
+
+    def test_absent_inspectors_are_skipped(self):
+        absent = self.inspectors[1]
+        UserAbsence.objects.create(
+            user=absent,
+            start_date=datetime.date(2025, 1, 14),
+            end_date=datetime.date(2025, 1, 16),
+        )
+
+        result = generate_schedule(self.START, 7)
+
+        self.assertEqual(result.created, 10)
+        self.assertEqual(result.unassigned, [])
+        self.assertFalse(
+            Schedule.objects.filter(
+                inspector=absent, date__range=("2025-01-14", "2025-01-16")
+            ).exists()
+        )
+        self.assertTrue(Schedule.objects.filter(inspector=absent).exists())
+
+    def test_everybody_absent_leaves_slots_unassigned(self):
+        for inspector in self.inspectors:
+            UserAbsence.objects.create(
+                user=inspector, start_date=self.START, end_date=self.START
+            )
+
+        result = generate_schedule(self.START, 2)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            result.unassigned,
+            [(template.id, self.START) for template in self.templates],
+        )
+        self.assertFalse(Schedule.objects.filter(date=self.START).exists())
+
+    def test_invalid_arguments(self):
+        self.assertIn("больше 0", generate_schedule(self.START, 0).error)
+        result = generate_schedule(self.START, 7, engine="random")
+        self.assertFalse(result.ok)
+        self.assertIn("random", str(result))
+        self.assertFalse(Schedule.objects.exists())
+
+
+class BalancedEngineTests(TestCase):
+    """
+    Балансировщик: слот - наименее загруженному, при равенстве - тому,
+    кто реже проверял этот шаблон; отсутствующие пропускаются.
+    """
+
+    DATE = datetime.date(2025, 1, 15)
+
+    def test_least_loaded_gets_slot(self):
+        engine = BalancedEngine([1, 2, 3], AbsenceIndex(), {(1, 10): 5})
+
+        assigned = [engine.assign(10, self.DATE) for _ in range(6)]
+
+        self.assertNotIn(1, assigned)
+        self.assertEqual(Counter(assigned), {2: 3, 3: 3})
+
+    def test_tie_goes_to_fewer_checks_of_template(self):
+        engine = BalancedEngine([1, 2], AbsenceIndex(), {(1, 10): 1, (2, 20): 1})
+
+        self.assertEqual(engine.assign(10, self.DATE), 2)
+        self.assertEqual(engine.assign(20, self.DATE), 1)
+
+    def test_absent_inspectors_are_skipped(self):
+        absences = AbsenceIndex([(1, self.DATE, self.DATE)])
+        engine = BalancedEngine([1, 2], absences, {(2, 10): 3})
+
+        self.assertEqual(engine.assign(10, self.DATE), 2)
+        self.assertEqual(engine.assign(10, self.DATE + datetime.timedelta(days=1)), 1)
+        everybody = AbsenceIndex([(1, self.DATE, self.DATE), (2, self.DATE, self.DATE)])
+        self.assertIsNone(BalancedEngine([1, 2], everybody).assign(10, self.DATE))
+
+    def test_generated_load_is_balanced(self):
+        *inspectors, idle = make_inspectors(4)
+        idle.can_perform_inspections = False
+        idle.save()
+        make_templates(2)
+        start = datetime.date(2025, 1, 13)
+
+        result = generate_schedule(start, 14, engine="balanced")
+
+        # 10 рабочих дней по 2 шаблона на троих: 7, 7, 6
+        fairness = result.fairness
+        self.assertEqual(sum(fairness.per_inspector.values()), 20)
+        self.assertEqual((fairness.min, fairness.max), (6, 7))
+        self.assertLess(fairness.stddev, 1)
+
+        # Сотрудник без назначений попадает в отчет с нулем
+        report = build_fairness_report(
+            start, result.end_date, [user.id for user in [*inspectors, idle]]
+        )
+        self.assertEqual(report.per_inspector[idle.id], 0)
+        self.assertEqual(report.min, 0)
+        self.assertEqual(
+            sum(sum(loads.values()) for loads in report.per_template.values()), 20
+        )
+
+
+class ScheduleHorizonTests(TestCase):
+    """
+    Скользящий горизонт расписания: пробелы после ручных запусков
+    заполняются, повторный запуск ничего не дублирует.
+    """
+
+    def setUp(self):
+        make_inspectors(2)
+        make_templates(1)
+        self.today = timezone.now().date()
+
+    def assert_horizon_filled(self, weeks):
+        # Повторная генерация всего горизонта не находит свободных слотов
+        days = weeks * 7 + 1
+        self.assertEqual(generate_schedule(self.today, days).created, 0)
+
+    def test_manual_future_run_leaves_gap_for_horizon(self):
+        # Ручной запуск через три недели: горизонт не сдвигается
+        generate_schedule(self.today + datetime.timedelta(weeks=3), 7)
+        self.assertIsNone(SchedulerState.load().generated_until)
+
+        result = extend_schedule_horizon(weeks=4)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.start_date, self.today)
+        horizon_end = self.today + datetime.timedelta(weeks=4)
+        self.assertEqual(SchedulerState.load().generated_until, horizon_end)
+        self.assert_horizon_filled(weeks=4)
+
+    def test_rerun_is_idempotent(self):
+        first = extend_schedule_horizon(weeks=2)
+        self.assertGreater(first.created, 0)
+
+        # Горизонт заполнен - второй запуск ничего не делает
+        second = extend_schedule_horizon(weeks=2)
+        self.assertEqual(second.created, 0)
+        self.assertEqual(Schedule.objects.count(), first.created)
+        self.assert_horizon_filled(weeks=2)
+
+    def test_busy_lock_skips_run(self):
+        with mock.patch(
+            "checklists.services._acquire_schedule_lock", return_value=False
+        ):
+            result = extend_schedule_horizon(weeks=2)
+
+        self.assertFalse(result.ok)
+        self.assertFalse(Schedule.objects.exists())
+        self.assertIsNone(SchedulerState.load().generated_until)
+
+
+class AutoSwapTests(TestCase):
+    def test_swap_moves_initiator_to_free_slot(self):
+        initiator, target = make_inspectors(2)
+        template, other_template = make_templates(2)
+        today = timezone.now().date()
+
+        my_slot = Schedule.objects.create(
+            inspector=initiator, template=template, date=today
+        )
+        free_slot = Schedule.objects.create(
+            inspector=target,
+            template=other_template,
+            date=today + datetime.timedelta(days=14),
+        )
+
+        success, _ = perform_auto_swap(my_slot, "Болезнь")
+
+        self.assertTrue(success)
+        my_slot.refresh_from_db()
+        free_slot.refresh_from_db()
+        self.assertEqual(my_slot.inspector, target)
+        self.assertEqual(free_slot.inspector, initiator)
+        self.assertTrue(free_slot.is_swapped)
+        self.assertEqual(SwapLog.objects.count(), 1)
+
+    def test_swapped_slot_is_not_taken_again(self):
+        initiator, target = make_inspectors(2)
+        template, other_template = make_templates(2)
+        today = timezone.now().date()
+
+        my_slot = Schedule.objects.create(
+            inspector=initiator, template=template, date=today
+        )
+        Schedule.objects.create(
+            inspector=target,
+            template=other_template,
+            date=today + datetime.timedelta(days=14),
+            is_swapped=True,
+        )
+
+        success, _ = perform_auto_swap(my_slot, "Болезнь")
+
+        self.assertFalse(success)
+        self.assertEqual(SwapLog.objects.count(), 0)
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "SELECT ... SKIP LOCKED нужен Postgres"
+)
+class AutoSwapConcurrencyTests(TransactionTestCase):
+    """
+    Стресс-тест: много сотрудников одновременно жмут "Автозамена".
+    Ни один свободный слот не должен достаться двоим.
+    """
+
+    WORKERS = 12
+
+    def test_parallel_swaps_never_share_a_slot(self):
+        inspectors = make_inspectors(self.WORKERS * 2)
+        templates = make_templates(self.WORKERS)
+        today = timezone.now().date()
+        next_weeks = today + datetime.timedelta(days=14)
+
+        initiators = inspectors[: self.WORKERS]
+        targets = inspectors[self.WORKERS :]
+
+        my_slots = [
+            Schedule.objects.create(inspector=user, template=template, date=today)
+            for user, template in zip(initiators, templates)
+        ]
+        # Свободных слотов меньше, чем желающих: часть обменов обязана не пройти
+        for i, user in enumerate(targets[: self.WORKERS // 2]):
+            Schedule.objects.create(
+                inspector=user,
+                template=templates[i],
+                date=next_weeks + datetime.timedelta(days=i % 3),
+            )
+
+        results = []
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker(slot):
+            try:
+                barrier.wait()
+                results.append(perform_auto_swap(slot, "Стресс-тест"))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(s,)) for s in my_slots]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        successes = sum(1 for success, _ in results if success)
+        self.assertEqual(len(results), self.WORKERS)
+        self.assertEqual(successes, self.WORKERS // 2)
+        self.assertEqual(SwapLog.objects.count(), successes)
+
+        # Каждый бывший свободный слот занят ровно одним инициатором
+        swapped = Schedule.objects.filter(is_swapped=True)
+        self.assertEqual(swapped.count(), successes)
+        self.assertEqual(
+            len(set(swapped.values_list("inspector_id", flat=True))), successes
+        )
+        self.assertTrue(
+            set(swapped.values_list("inspector_id", flat=True))
+            <= {user.id for user in initiators}
+        )
+
+
+class RequestMetricsTests(TestCase):
+    """
+    Замер запросов: Server-Timing, строка лога, гистограмма в Redis.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.inspector = make_inspectors(1)[0]
+        self.client.force_login(self.inspector)
+
+    def test_request_is_measured(self):
+        with self.assertLogs("checklists.metrics", "INFO") as logs:
+            response = self.client.get(reverse("employee_dashboard"))
+
+        timing = response["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn("total;dur=", timing)
+        (record,) = logs.records
+        self.assertEqual(record.metrics["view"], "employee_dashboard")
+        self.assertEqual(record.metrics["status"], 200)
+        self.assertGreater(record.metrics["db_queries"], 0)
+        self.assertIn(f"db_queries={record.metrics['db_queries']} ", record.message)
+
+        self.client.get(reverse("employee_dashboard"))
+        (row,) = [
+            row for row in endpoint_summaries() if row["view"] == "employee_dashboard"
+        ]
+        self.assertEqual(row["count"], 2)
+        self.assertEqual(row["avg_queries"], record.metrics["db_queries"])
+        self.assertIsNotNone(row["p50"])
+
+    def test_cache_hits_are_counted(self):
+        template = make_templates(1)[0]
+        with track_cache_stats() as stats:
+            get_template_snapshot(template.id)
+            get_template_snapshot(template.id)
+        self.assertEqual(stats, {"hits": 1, "misses": 1})
+
+    def test_slowest_endpoints_page(self):
+        # Часы идут на 1.5 с за каждое обращение: страница медленнее 5 с
+        with (
+            mock.patch(
+                "checklists.middleware.time.perf_counter",
+                side_effect=itertools.count(0, 1.5),
+            ),
+            self.assertLogs("checklists.metrics", "WARNING"),
+        ):
+            self.client.get(reverse("employee_dashboard"))
+
+        admin = User.objects.create_user(email="admin@example.com", is_staff=True)
+        self.client.force_login(admin)
+        with self.assertLogs("checklists.metrics", "INFO"):
+            response = self.client.get(reverse("admin_metrics"))
+        self.assertEqual(response.context["rows"][0]["view"], "employee_dashboard")
+        self.assertIsNone(response.context["rows"][0]["p95"])
+        self.assertContains(response, "&gt; 5000")
+
+    def test_cache_outage_does_not_break_response(self):
+        with (
+            mock.patch(
+                "checklists.middleware.record_request",
+                side_effect=ConnectionError("redis down"),
+            ),
+            self.assertLogs("checklists.metrics", "INFO") as logs,
+        ):
+            response = self.client.get(reverse("employee_dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Не удалось записать метрики", logs.output[-1])
+
+    def test_admin_and_media_are_not_recorded(self):
+        admin = User.objects.create_user(email="admin@example.com", is_staff=True)
+        self.client.force_login(admin)
+        with (
+            mock.patch("checklists.middleware.record_request") as record,
+            self.assertLogs("checklists.metrics", "INFO"),
+        ):
+            self.client.get(reverse("admin:index"))
+            self.client.get(f"{settings.MEDIA_URL}missing.jpg")
+            self.client.get(reverse("employee_dashboard"))
+
+        self.assertEqual(
+            [call.args[0] for call in record.call_args_list], ["employee_dashboard"]
+        )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SyntheticDataTests(TestCase):
+    """
+    Генератор синтетических данных и замер страниц на них.
+    """
+
+    VOLUMES = SyntheticVolumes(
+        locations=2,
+        templates_per_location=2,
+        sections=2,
+        criteria_per_section=3,
+        inspectors=3,
+        days=14,
+        violation_rate=0.3,
+    )
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_generated_data_is_consistent(self):
+        result = generate_synthetic_data(self.VOLUMES)
+
+        self.assertEqual(result.templates, 4)
+        self.assertEqual(result.items, result.inspections * 6)
+        self.assertEqual(Inspection.objects.count(), result.inspections)
+        self.assertEqual(ViolationPhoto.objects.count(), result.photos)
+        self.assertFalse(find_counter_mismatches().exists())
+        # Задания на сегодня - без отчетов (для замера "Начать проверку")
+        today = timezone.now().date()
+        self.assertEqual(
+            Schedule.objects.filter(date=today, inspection__isnull=True).count(), 4
+        )
+
+        # Повторный запуск заменяет данные, а не добавляет
+        generate_synthetic_data(self.VOLUMES)
+        self.assertEqual(Inspection.objects.count(), result.inspections)
+
+    def test_benchmark_writes_json_and_rolls_back(self):
+        generate_synthetic_data(self.VOLUMES)
+        inspections = Inspection.objects.count()
+        output = os.path.join(settings.MEDIA_ROOT, "benchmark.json")
+
+        call_command(
+            "benchmark_views",
+            repeat=1,
+            output=output,
+            label="test",
+            stdout=io.StringIO(),
+        )
+
+        with open(output, encoding="utf-8") as file:
+            report = json.load(file)
+        statuses = {row["name"]: row["status"] for row in report["results"]}
+        self.assertEqual(statuses["employee_dashboard"], 200)
+        self.assertEqual(statuses["inspection_form_get"], 200)
+        self.assertEqual(statuses["start_inspection"], 302)
+        self.assertTrue(all(row["queries"] > 0 for row in report["results"]))
+        # Черновики замеров откатились
+        self.assertEqual(Inspection.objects.count(), inspections)
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "EXPLAIN (FORMAT JSON) - план Postgres"
+)
+class QueryPlanTests(TestCase):
+    """
+    Регрессия планов горячих запросов: на большом наборе данных каждый
+    запрос обязан идти по своему индексу, а не полным сканированием.
+    Пропавший или неподходящий индекс валит тест, а не прод.
+    """
+
+    INSPECTORS = 20
+    TEMPLATES = 50
+    DAYS = 120
+    ITEMS = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.inspectors = make_inspectors(cls.INSPECTORS)
+        location = Location.objects.create(name="Цех №1")
+        cls.templates = ChecklistTemplate.objects.bulk_create(
+            ChecklistTemplate(name=f"Шаблон {i}", location=location)
+            for i in range(cls.TEMPLATES)
+        )
+        cls.today = timezone.now().date()
+
+        schedules = []
+        inspections = []
+        for day in range(cls.DAYS):
+            date = cls.today - datetime.timedelta(days=day)
+            for i, template in enumerate(cls.templates):
+                inspector = cls.inspectors[(day + i) % cls.INSPECTORS]
+                schedules.append(
+                    Schedule(inspector=inspector, template=template, date=date)
+                )
+                inspections.append(
+                    Inspection(
+                        inspector=inspector,
+                        template=template,
+                        date_check=date,
+                        location_snapshot=location.name,
+                        # Часть отчетов - черновики (не попадают в частичный индекс)
+                        is_completed=(day + i) % 4 != 0,
+                        items_total=cls.ITEMS,
+                    )
+                )
+        Schedule.objects.bulk_create(schedules, batch_size=2000)
+        Inspection.objects.bulk_create(inspections, batch_size=2000)
+        InspectionItem.objects.bulk_create(
+            (
+                InspectionItem(
+                    inspection=inspection,
+                    section_name="Раздел А",
+                    criteria_text=f"Вопрос {n}",
+                    criteria_order=n,
+                    is_compliant=n % 7 != 0,
+                )
+                for inspection in inspections
+                for n in range(cls.ITEMS)
+            ),
+            batch_size=5000,
+        )
+        cls.inspection = inspections[len(inspections) // 2]
+
+        # Свежая статистика для планировщика (иначе он считает таблицы пустыми)
+        tables = [
+            model._meta.db_table for model in (Schedule, Inspection, InspectionItem)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {', '.join(tables)}")
+
+    def _plan_nodes(self, node):
+        yield node
+        for child in node.get("Plans", []):
+            yield from self._plan_nodes(child)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = json.loads(queryset.explain(format="json"))[0]["Plan"]
+        nodes = list(self._plan_nodes(plan))
+        seq_scans = [
+            node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"
+        ]
+        self.assertEqual(seq_scans, [], msg=json.dumps(plan, indent=2))
+        self.assertIn(
+            index_name,
+            {node.get("Index Name") for node in nodes},
+            msg=json.dumps(plan, indent=2),
+        )
+
+    def test_employee_week_schedule(self):
+        # Кабинет сотрудника: ближайшее задание на неделе
+        queryset = Schedule.objects.filter(
+            inspector=self.inspectors[0],
+            date__range=[self.today, self.today + datetime.timedelta(days=6)],
+        ).order_by("date")
+        self.assertUsesIndex(queryset, "schedule_inspector_date_idx")
+
+    def test_employee_recent_inspections(self):
+        queryset = Inspection.objects.filter(inspector=self.inspectors[0]).order_by(
+            "-created_at"
+        )[:5]
+        self.assertUsesIndex(queryset, "inspection_inspector_idx")
+
+    def test_template_completed_inspections(self):
+        # Завершенные отчеты шаблона за период (журнал с фильтром, аналитика)
+        queryset = Inspection.objects.filter(
+            template=self.templates[0],
+            is_completed=True,
+            date_check__gte=self.today - datetime.timedelta(days=30),
+        ).order_by("-date_check")
+        self.assertUsesIndex(queryset, "inspection_template_done_idx")
+
+    def test_inspection_violations(self):
+        queryset = InspectionItem.objects.filter(
+            inspection=self.inspection, is_compliant=False
+        )
+        self.assertUsesIndex(queryset, "inspection_item_compliance_idx")
@@ -0,0 +1,100 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from checklists.models import PhotoUploadSession
+from checklists.services import attach_photos
+
+# Размер одной части. Меньше client_max_body_size в nginx (20M) с запасом,
+# чтобы при обрыве терять не больше 1 МБ.
+CHUNK_SIZE = 1024 * 1024
+
+# Максимальный размер фото целиком
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+
+# Чтение тела запроса кусками: в памяти не держим больше этого
+READ_BUFFER_SIZE = 64 * 1024
+
+# Временные файлы лежат рядом с медиа (общий том для всех web-контейнеров)
+PARTIAL_UPLOAD_DIR = "uploads/partial"
+
+
+def partial_path(session):
+    """
+    Путь временного файла сессии загрузки.
+    """
+    return os.path.join(settings.MEDIA_ROOT, PARTIAL_UPLOAD_DIR, f"{session.id}.part")
+
+
+def start_upload(item, filename, total_size):
+    """
+    Открывает сессию загрузки фото по частям.
+    Возвращает (сессия, ошибка); при ошибке сессия - None.
+    """
+    if not 0 < total_size <= MAX_UPLOAD_SIZE:
+        return None, f"Размер файла должен быть от 1 байта до {MAX_UPLOAD_SIZE} байт."
+
+    session = PhotoUploadSession.objects.create(
+        item=item,
+        # Путь из браузера не нужен - только имя
+        filename=os.path.basename(filename)[:255] or "photo",
+        total_size=total_size,
+    )
+    os.makedirs(os.path.dirname(partial_path(session)), exist_ok=True)
+    open(partial_path(session), "wb").close()
+    return session, None
+
+
+def append_chunk(session_id, user, offset, stream):
+    """
+    Дописывает часть файла из stream (тело запроса) начиная с offset.
+
+    Смещение должно совпадать с тем, сколько сервер уже получил: иначе клиент
+    отстал или повторил часть - отвечаем текущим смещением, клиент продолжит с него.
+    Тело читается кусками READ_BUFFER_SIZE, целиком в память не попадает.
+    Последняя часть создает ViolationPhoto в той же транзакции.
+
+    Возвращает (успех, смещение, фото или None).
+    Сессии нет (или чужая) - PhotoUploadSession.DoesNotExist,
+    часть больше CHUNK_SIZE или хвоста файла - ValueError.
+    """
+    with transaction.atomic():
+        # Блокировка строки: две части одной сессии не пишутся одновременно
+        session = PhotoUploadSession.objects.select_for_update(of=("self",)).get(
+            id=session_id, item__inspection__inspector=user
+        )
+        if offset != session.received:
+            return False, session.received, None
+
+        path = partial_path(session)
+        limit = min(CHUNK_SIZE, session.total_size - session.received)
+        with open(path, "r+b") as file:
+            # Хвост от оборванной ранее части отбрасываем
+            file.seek(session.received)
+            file.truncate()
+
+            written = 0
+            while buffer := stream.read(READ_BUFFER_SIZE):
+                written += len(buffer)
+                if written > limit:
+                    # Часть больше допустимого - отклоняем целиком
+                    file.truncate(session.received)
+                    raise ValueError(f"Часть больше {limit} байт.")
+                file.write(buffer)
+
+        session.received += written
+        if session.received < session.total_size:
+            session.save(update_fields=["received", "updated_at"])
+            return True, session.received, None
+
+        # Последняя часть: файл собран - создаем фото и закрываем сессию
+        with open(path, "rb") as file:
+            (photo,) = attach_photos(
+                [(session.item, File(file, name=session.filename))]
+            )
+        session.delete()
+
+    os.remove(path)
+    return True, session.total_size, photo
@@ -13,6 +13,12 @@ urlpatterns = [
         name="admin_report_detail",
     ),
     path("cabinet/schedule/", views.admin_weekly_schedule, name="admin_schedule"),
+    path("cabinet/metrics/", views.admin_request_metrics, name="admin_metrics"),
+    path(
+        "cabinet/api/violations/",
+        views.violation_analytics_api,
+        name="violation_analytics_api",
+    ),
     # Предпросмотр конкретного шаблона
     path("preview/<int:template_id>/", views.template_preview, name="template_preview"),
     path("my-checks/", views.employee_dashboard, name="employee_dashboard"),
@@ -29,6 +35,23 @@ urlpatterns = [
         views.upload_photo_ajax,
         name="upload_photo_ajax",
     ),
+    # Загрузка фото по частям (с докачкой)
+    path(
+        "api/upload/<int:item_id>/start/",
+        views.upload_start_ajax,
+        name="upload_start_ajax",
+    ),
+    path(
+        "api/upload/<uuid:upload_id>/",
+        views.upload_chunk_ajax,
+        name="upload_chunk_ajax",
+    ),
+    path("api/photo-status/", views.photo_status_ajax, name="photo_status_ajax"),
+    path(
+        "photos/<int:photo_id>/<int:size>/",
+        views.photo_rendition_view,
+        name="photo_rendition",
+    ),
     path(
         "api/delete-photo/<int:photo_id>/",
         views.delete_photo_ajax,
@@ -39,5 +62,10 @@ urlpatterns = [
         views.save_comment_ajax,
         name="save_comment_ajax",
     ),
+    path(
+        "api/autosave/<int:inspection_id>/",
+        views.autosave_inspection_ajax,
+        name="autosave_inspection_ajax",
+    ),
     path("api/swap/<int:schedule_id>/", views.auto_swap_shift, name="auto_swap_shift"),
 ]
@@ -1,29 +1,113 @@
-from datetime import timedelta
+import json
+import logging
+from datetime import date, timedelta
 
-from django.db.models import Count, Q
+from django.db.models import F, Q
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.decorators.http import require_POST
-from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods, require_POST
+from django.http import Http404, JsonResponse
 
 from checklists.models import (
     ChecklistTemplate,
+    ComplianceDaily,
+    CriterionViolation,
+    Location,
     Inspection,
     ViolationPhoto,
     InspectionItem,
+    PhotoBlob,
+    PhotoUploadSession,
     Schedule,
 )
+from checklists.analytics import (
+    ANALYTICS_DEFAULT_DAYS,
+    ANALYTICS_DEFAULT_LIMIT,
+    ANALYTICS_MAX_DAYS,
+    ANALYTICS_MAX_LIMIT,
+    GROUPINGS,
+    PERIODS,
+    get_violation_rates,
+)
+from checklists.compliance import (
+    compliance_totals,
+    month_starts,
+    monthly_compliance,
+)
 from checklists.decorators import admin_required, employee_required
-from checklists.services import create_inspection_from_template, perform_auto_swap
+from checklists.forms import HistoryFilterForm
+from checklists.history import keyset_page
+from checklists.metrics import (
+    METRICS_BUCKETS_MS,
+    METRICS_MAX_DAYS,
+    endpoint_summaries,
+)
+from checklists.photos import (
+    RENDITION_SIZES,
+    get_or_create_rendition,
+    rendition_url,
+)
+from checklists.schedule_matrix import MAX_WEEKS, get_schedule_matrices, week_start
+from checklists.services import (
+    attach_photos,
+    autosave_inspection,
+    create_inspection_from_template,
+    perform_auto_swap,
+    save_inspection_answers,
+)
+from checklists.uploads import CHUNK_SIZE, append_chunk, start_upload
+from checklists.snapshots import (
+    get_template_snapshot,
+    group_snapshot_by_section,
+    template_sections,
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько месяцев показывать в таблице баллов на дашборде
+DASHBOARD_MONTHS = 6
 
 
 # --- ЗОНА АДМИНИСТРАТОРА (Строгий режим) ---
 @admin_required
 def admin_dashboard(request):
     total_templates = ChecklistTemplate.objects.count()
-    context = {"total_templates": total_templates}
+
+    # Все цифры - из предрасчитанных итогов дня (ComplianceDaily),
+    # пункты отчетов здесь не читаются
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
+    # Ровно DASHBOARD_MONTHS колонок, включая текущий месяц
+    months = month_starts(month_start, DASHBOARD_MONTHS)
+
+    # Таблица: участок -> {месяц: балл}
+    scores_by_location = {}
+    for row in monthly_compliance(months[0]):
+        scores_by_location.setdefault(row["location_id"], {})[row["month"]] = row
+    locations = Location.objects.in_bulk(scores_by_location)
+    # Месяц без отчетов - нулевая ячейка (балл не считается)
+    empty_cell = {"inspections": 0, "total": 0, "compliant": 0, "score": None}
+    monthly_rows = [
+        {
+            "location": locations[location_id],
+            "cells": [by_month.get(month, empty_cell) for month in months],
+        }
+        for location_id, by_month in scores_by_location.items()
+        if location_id in locations
+    ]
+    monthly_rows.sort(key=lambda row: row["location"].name)
+
+    context = {
+        "total_templates": total_templates,
+        "today_totals": compliance_totals(ComplianceDaily.objects.filter(date=today)),
+        "month_totals": compliance_totals(
+            ComplianceDaily.objects.filter(date__gte=month_start)
+        ),
+        "months": months,
+        "monthly_rows": monthly_rows,
+    }
     return render(request, "checklists/admin_dashboard.html", context)
 
 
@@ -36,8 +120,14 @@ def admin_templates(request):
 
 @admin_required
 def template_preview(request, template_id):
-    template = get_object_or_404(ChecklistTemplate, pk=template_id)
-    sections = template.sections.all().order_by("order").prefetch_related("criteria")
+    template = get_object_or_404(
+        ChecklistTemplate.objects.select_related("location"), pk=template_id
+    )
+    # Вопросы берем из скомпилированного снимка (Redis), а не обходом дерева ORM.
+    # Список разделов - отдельным легким запросом: пустые разделы тоже видны
+    sections = group_snapshot_by_section(
+        get_template_snapshot(template.id), template_sections(template.id)
+    )
     context = {"template": template, "sections": sections}
     return render(request, "checklists/template_preview.html", context)
 
@@ -49,17 +139,40 @@ def admin_inspection_list(request):
     """
     # Берем только завершенные, сортируем: свежие сверху.
     # select_related ускоряет загрузку (подтягивает юзера и шаблон сразу)
-    inspections = (
-        Inspection.objects.filter(is_completed=True)
-        .select_related("inspector", "template")
-        .annotate(
-            # Считаем количество пунктов, где is_compliant = False
-            violation_count=Count("items", filter=Q(items__is_compliant=False))
-        )
-        .order_by("-date_check", "-created_at")
+    # Число нарушений - готовый столбец violations_total (без COUNT по пунктам)
+    inspections = Inspection.objects.filter(is_completed=True).select_related(
+        "inspector", "template"
     )
 
-    context = {"inspections": inspections}
+    filter_form = HistoryFilterForm(request.GET)
+    if filter_form.is_valid():
+        inspections = filter_form.filter(inspections)
+
+    # Страница по курсору ("после такого-то отчета"), а не по номеру:
+    # листать вглубь так же быстро, как открыть первую страницу
+    try:
+        page, next_cursor = keyset_page(inspections, request.GET.get("after"))
+    except ValueError:
+        # Курсор испорчен (ручная правка URL) - начинаем сначала
+        page, next_cursor = keyset_page(inspections)
+
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params["after"] = next_cursor
+        next_url = f"?{params.urlencode()}"
+
+    # Ссылка "В начало" сохраняет фильтры
+    first_params = request.GET.copy()
+    first_params.pop("after", None)
+
+    context = {
+        "inspections": page,
+        "filter_form": filter_form,
+        "next_url": next_url,
+        "first_url": f"?{first_params.urlencode()}",
+        "is_first_page": "after" not in request.GET,
+    }
     return render(request, "checklists/admin_history.html", context)
 
 
@@ -72,12 +185,19 @@ def admin_inspection_detail(request, inspection_id):
     inspection = get_object_or_404(Inspection, id=inspection_id)
 
     # Та же логика группировки, что и при заполнении
-    items = inspection.items.prefetch_related("photos").order_by(
+    # Фото вместе с копиями: в шаблоне показываем превью, а не оригиналы
+    items = inspection.items.prefetch_related("photos__blob__renditions").order_by(
         "section_name", "criteria_order"
     )
 
+    # Текущее состояние нарушений по вопросам (серии, повторы) - один запрос
+    violations = CriterionViolation.objects.in_bulk(
+        [item.criteria_origin_id for item in items if item.criteria_origin_id]
+    )
+
     sections_data = {}
     for item in items:
+        item.violation = violations.get(item.criteria_origin_id)
         sec_name = item.section_name
         if sec_name not in sections_data:
             sections_data[sec_name] = []
@@ -93,51 +213,69 @@ def admin_inspection_detail(request, inspection_id):
 @admin_required
 def admin_weekly_schedule(request):
     """
-    Матрица расписания: Строки - Шаблоны, Колонки - Дни недели (Пн-Пт).
+    Матрица расписания: Строки - Шаблоны, Колонки - Рабочие дни недели.
+
+    GET-параметры:
+    - week: любая дата недели (ГГГГ-ММ-ДД), по умолчанию текущая;
+    - weeks: сколько недель показать подряд (1..MAX_WEEKS).
+    Матрицы недель берутся из Redis (см. schedule_matrix.py): табло,
+    которое обновляется раз в минуту, не ходит в Postgres.
     """
     today = timezone.now().date()
 
-    # 1. Вычисляем даты Пн-Пт текущей недели
-    # today.weekday(): 0=Пн ... 6=Вс
-    start_of_week = today - timedelta(days=today.weekday())  # Понедельник
-
-    # Генерируем список из 5 дней (Пн, Вт, Ср, Чт, Пт)
-    week_days = [start_of_week + timedelta(days=i) for i in range(5)]
-
-    # 2. Получаем данные
-    templates = ChecklistTemplate.objects.all().order_by("id")
-
-    # Загружаем расписание только на эти 5 дней
-    schedules = Schedule.objects.filter(
-        date__range=[week_days[0], week_days[-1]]
-    ).select_related("inspector", "inspection")
-
-    # 3. Превращаем список расписания в словарь для быстрого поиска
-    # Ключ: (template_id, date) -> Значение: schedule_object
-    schedule_map = {}
-    for item in schedules:
-        schedule_map[(item.template_id, item.date)] = item
-
-    # 4. Собираем структуру для таблицы
-    table_rows = []
-
-    for tmpl in templates:
-        row = {"template": tmpl, "cells": []}
+    # 1. Какие недели показываем
+    week_param = request.GET.get("week")
+    try:
+        start_of_week = week_start(
+            date.fromisoformat(week_param) if week_param else today
+        )
+    except ValueError:
+        # Дата в URL испорчена - показываем текущую неделю
+        start_of_week = week_start(today)
+    try:
+        weeks = min(max(int(request.GET.get("weeks", 1)), 1), MAX_WEEKS)
+    except ValueError:
+        weeks = 1
+
+    # 2. Матрицы (из кеша; недостающие недели строятся двумя запросами)
+    matrices = get_schedule_matrices(start_of_week, weeks)
+
+    # 3. Навигация: сдвиг на столько же недель, сколько показано
+    step = timedelta(weeks=weeks)
+    context = {
+        "weeks": matrices,
+        "weeks_count": weeks,
+        "weeks_choices": range(1, MAX_WEEKS + 1),
+        "week_start": start_of_week,
+        "week_end": matrices[-1]["end"],
+        "prev_week": start_of_week - step,
+        "next_week": start_of_week + step,
+        "current_week": week_start(today),
+        "today": today,
+    }
+    return render(request, "checklists/admin_schedule.html", context)
 
-        # Для каждого дня недели ищем, есть ли запись для этого шаблона
-        for day in week_days:
-            # Ищем в словаре
-            cell_data = schedule_map.get((tmpl.id, day))
-            row["cells"].append(cell_data)  # Добавляем объект Schedule или None
 
-        table_rows.append(row)
+@admin_required
+def admin_request_metrics(request):
+    """
+    Самые медленные страницы: перцентили времени ответа, запросы к БД.
+    Цифры собирает RequestMetricsMiddleware (дневные гистограммы в Redis).
+    GET-параметр days: за сколько последних дней (1..METRICS_MAX_DAYS).
+    """
+    try:
+        days = min(max(int(request.GET.get("days", 1)), 1), METRICS_MAX_DAYS)
+    except ValueError:
+        days = 1
 
     context = {
-        "week_days": week_days,  # Заголовки колонок
-        "table_rows": table_rows,  # Тело таблицы
-        "today": today,
+        "rows": endpoint_summaries(days),
+        "days": days,
+        "days_choices": [1, METRICS_MAX_DAYS],
+        # Перцентиль за последней границей гистограммы
+        "overflow": f"> {METRICS_BUCKETS_MS[-1]}",
     }
-    return render(request, "checklists/admin_schedule.html", context)
+    return render(request, "checklists/admin_metrics.html", context)
 
 
 # --- ЗОНА СОТРУДНИКА (Строгий режим) ---
@@ -191,7 +329,12 @@ def employee_dashboard(request):
 @employee_required
 def inspection_form_view(request, inspection_id):
     # 1. Безопасность: Получаем отчет только если он принадлежит текущему юзеру
-    inspection = get_object_or_404(Inspection, id=inspection_id, inspector=request.user)
+    # Шаблон нужен и для истории, и для итогов дня при завершении
+    inspection = get_object_or_404(
+        Inspection.objects.select_related("template"),
+        id=inspection_id,
+        inspector=request.user,
+    )
 
     # Если отчет уже завершен - перекидываем на страницу просмотра (read-only),
     # чтобы случайно не отредактировали. (Её сделаем позже, пока просто редирект)
@@ -205,34 +348,14 @@ def inspection_form_view(request, inspection_id):
         # 1. Определяем, какую кнопку нажали: "Сохранить черновик" или "Завершить"
         action = request.POST.get("action")
 
-        # Пробегаемся по всем пунктам этого отчета
-        for item in inspection.items.all():
-            # Формируем имена полей, которые мы ждем от HTML
-            # Например: "compliant_15" (где 15 - id пункта)
-            status_key = f"compliant_{item.id}"
-            comment_key = f"comment_{item.id}"
-            photos_key = f"photos_{item.id}"
-
-            # Получаем данные из формы
-            # Если ключа нет в POST, значит галочку не трогали (оставляем как есть)
-            if status_key in request.POST:
-                # Превращаем строку 'true'/'false' в Python Boolean
-                item.is_compliant = request.POST.get(status_key) == "true"
-            if comment_key in request.POST:
-                item.comment = request.POST.get(comment_key)
-            item.save()
-
-            files = request.FILES.getlist(photos_key)
-
-            for file in files:
-                # Создаем запись в таблице ViolationPhoto
-                ViolationPhoto.objects.create(item=item, image=file)
-
-        # 2. Если нажали "Завершить проверку"
-        if action == "complete":
+        # 2. Сохраняем ответы одной транзакцией: пишем только изменившиеся
+        # пункты (bulk_update) и все фото разом (bulk_create).
+        # "Завершить проверку" фиксируется в той же транзакции.
+        complete = action == "complete"
+        save_inspection_answers(inspection, request.POST, request.FILES, complete)
+
+        if complete:
             # Тут можно добавить валидацию: все ли поля заполнены?
-            inspection.is_completed = True
-            inspection.save()
             # messages.success(request, "Проверка успешно завершена и отправлена!")
             return redirect("employee_dashboard")
 
@@ -247,40 +370,37 @@ def inspection_form_view(request, inspection_id):
     # Django шаблоны не умеют хорошо группировать сами, поэтому поможем им.
 
     # 1. Получаем все пункты, отсортированные по порядку
-    items = inspection.items.select_related("criteria_origin").order_by(
-        "section_name", "criteria_order"
+    items = (
+        inspection.items.select_related("criteria_origin")
+        .prefetch_related("photos__blob__renditions")
+        .order_by("section_name", "criteria_order")
     )
 
-    # 2. --- ПОИСК ИСТОРИИ (НОВОЕ) ---
-    # Ищем ПОСЛЕДНЮЮ завершенную проверку по ЭТОМУ же шаблону, но СТАРШЕ текущей
-    last_inspection = (
-        Inspection.objects.filter(
-            template=inspection.template,
-            is_completed=True,
-            date_check__lt=inspection.date_check,  # Строго до текущей даты
+    # 2. --- ИСТОРИЯ: НЕУСТРАНЕННЫЕ НАРУШЕНИЯ ---
+    # Серии нарушений хранятся по вопросу справочника (CriterionViolation,
+    # обновляются при завершении отчетов) - один запрос по ключу criteria_id
+    # вместо поиска прошлых отчетов и их пунктов.
+    # criteria_origin_id - ссылка на "Родительский вопрос": по нему
+    # сопоставляем "Вчерашний вопрос" и "Сегодняшний вопрос".
+    criteria_ids = [
+        item.criteria_origin_id for item in items if item.criteria_origin_id
+    ]
+    open_violations = (
+        CriterionViolation.objects.filter(
+            criteria_id__in=criteria_ids,
+            is_open=True,
+            last_seen__lt=inspection.date_check,  # Строго до текущей даты
         )
-        .order_by("-date_check", "-created_at")
-        .first()
+        .select_related("item")
+        .prefetch_related("item__photos__blob__renditions")
     )
-
-    # Словарь для быстрого поиска: { id_критерия: объект_прошлого_нарушения }
-    history_map = {}
-
-    if last_inspection:
-        # Берем только пункты с нарушениями из прошлого отчета
-        bad_items = last_inspection.items.filter(is_compliant=False).prefetch_related(
-            "photos"
-        )
-        for bad_item in bad_items:
-            # criteria_origin_id - это ссылка на "Родительский вопрос"
-            # Мы используем его как ключ, чтобы сопоставить "Вчерашний вопрос" и "Сегодняшний вопрос"
-            if bad_item.criteria_origin_id:
-                history_map[bad_item.criteria_origin_id] = bad_item
+    # Словарь для быстрого поиска: { id_критерия: прошлое_нарушение }
+    history_map = {violation.criteria_id: violation for violation in open_violations}
 
     # 3. Приклеиваем историю к текущим пунктам
     # Мы не сохраняем это в БД, просто добавляем атрибут "на лету" для шаблона
     for item in items:
-        # Если у этого вопроса есть "оригинал" и этот "оригинал" был в списке нарушений
+        # Если у этого вопроса есть "оригинал" и по нему есть открытое нарушение
         if item.criteria_origin_id in history_map:
             item.history = history_map[item.criteria_origin_id]
 
@@ -295,9 +415,6 @@ def inspection_form_view(request, inspection_id):
     context = {
         "inspection": inspection,
         "sections_data": sections_data,
-        "last_inspection_date": last_inspection.date_check
-        if last_inspection
-        else None,  # Для заголовка
     }
     return render(request, "checklists/inspection_form.html", context)
 
@@ -354,9 +471,9 @@ def start_inspection_view(request, template_id):
     # Мы говорим расписанию: "Смотри, вот отчет по твоему заданию"
     if schedule_item and schedule_item.inspection != inspection:
         schedule_item.inspection = inspection
-        schedule_item.save()
-        print(
-            f"DEBUG: Отчет {inspection.id} успешно привязан к расписанию {schedule_item.id}"
+        schedule_item.save(update_fields=["inspection"])
+        logger.info(
+            "Отчет %s привязан к расписанию %s", inspection.id, schedule_item.id
         )
 
     return redirect("inspection_form", inspection_id=inspection.id)
@@ -415,16 +532,118 @@ def upload_photo_ajax(request, item_id):
         InspectionItem, id=item_id, inspection__inspector=request.user
     )
 
-    # 2. Получаем файлы
-    photos = request.FILES.getlist("photos")
-    data = []
-
-    for photo in photos:
-        vp = ViolationPhoto.objects.create(item=item, image=photo)
-        data.append({"id": vp.id, "url": vp.image.url})
+    # 2. Сохраняем файлы как есть, обработка (JPEG, превью) - в фоне.
+    # Фото вернутся со статусом "pending", браузер опросит photo_status_ajax.
+    photos = attach_photos((item, file) for file in request.FILES.getlist("photos"))
 
     # 3. Возвращаем список загруженных фото
-    return JsonResponse({"status": "ok", "photos": data})
+    return JsonResponse(
+        {"status": "ok", "photos": [_photo_payload(photo) for photo in photos]}
+    )
+
+
+# Размер превью в форме отчета (CSS-пиксели)
+PHOTO_PREVIEW_PX = 80
+
+
+def _photo_payload(photo):
+    """
+    Фото для JSON-ответа. Превью есть только у обработанных фото
+    (blob и blob.renditions лучше подгрузить заранее).
+    """
+    return {
+        "id": photo.id,
+        "status": photo.blob.status,
+        "url": photo.blob.image.url,
+        "thumb_url": rendition_url(photo, PHOTO_PREVIEW_PX),
+    }
+
+
+@employee_required
+@require_POST
+def upload_start_ajax(request, item_id):
+    """
+    Начало загрузки фото по частям.
+    JSON: {"filename": "IMG_0001.HEIC", "size": 5242880}
+    Ответ: id загрузки, размер части и смещение (0).
+    """
+    item = get_object_or_404(
+        InspectionItem, id=item_id, inspection__inspector=request.user
+    )
+
+    try:
+        payload = json.loads(request.body)
+        filename = str(payload["filename"])
+        size = int(payload["size"])
+    except (ValueError, KeyError, TypeError) as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+
+    session, error = start_upload(item, filename, size)
+    if error:
+        return JsonResponse({"status": "error", "message": error}, status=400)
+
+    return JsonResponse(
+        {
+            "status": "ok",
+            "upload_id": str(session.id),
+            "chunk_size": CHUNK_SIZE,
+            "offset": session.received,
+        }
+    )
+
+
+@employee_required
+@require_http_methods(["GET", "POST"])
+def upload_chunk_ajax(request, upload_id):
+    """
+    GET - сколько байт сервер уже получил (с этого места продолжать после обрыва).
+    POST - очередная часть: тело запроса - сырые байты (application/octet-stream),
+    смещение - в заголовке X-Upload-Offset.
+    409 - смещение не совпало, в ответе правильное.
+    """
+    if request.method == "GET":
+        session = get_object_or_404(
+            PhotoUploadSession, id=upload_id, item__inspection__inspector=request.user
+        )
+        return JsonResponse({"status": "ok", "offset": session.received})
+
+    try:
+        offset = int(request.headers.get("X-Upload-Offset", ""))
+        # Тело НЕ читаем через request.body - передаем поток целиком
+        success, offset, photo = append_chunk(upload_id, request.user, offset, request)
+    except PhotoUploadSession.DoesNotExist:
+        raise Http404("Загрузка не найдена или уже завершена.")
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+
+    if not success:
+        return JsonResponse({"status": "conflict", "offset": offset}, status=409)
+    if photo is not None:
+        return JsonResponse({"status": "done", "photo": _photo_payload(photo)})
+    return JsonResponse({"status": "ok", "offset": offset})
+
+
+@employee_required
+def photo_status_ajax(request):
+    """
+    Опрос статуса обработки фото: /api/photo-status/?ids=1,2,3
+    """
+    try:
+        ids = [int(pk) for pk in request.GET.get("ids", "").split(",") if pk]
+    except ValueError:
+        return JsonResponse({"status": "error"}, status=400)
+
+    photos = (
+        ViolationPhoto.objects.filter(
+            id__in=ids, item__inspection__inspector=request.user
+        )
+        .select_related("blob")
+        .prefetch_related("blob__renditions")
+    )
+
+    return JsonResponse(
+        {"status": "ok", "photos": [_photo_payload(photo) for photo in photos]}
+    )
 
 
 @employee_required
@@ -438,6 +657,8 @@ def delete_photo_ajax(request, photo_id):
         ViolationPhoto, id=photo_id, item__inspection__inspector=request.user
     )
 
+    # Файл удалится, только если это была последняя ссылка на него
+    # (одинаковое фото может быть прикреплено к нескольким пунктам)
     photo.delete()
 
     return JsonResponse({"status": "ok"})
@@ -452,5 +673,152 @@ def save_comment_ajax(request, item_id):
     item.comment = request.POST.get("comment", "")
     # Если написали коммент, логично переключить статус на False (Нарушение),
     # но лучше оставить это на совести пользователя или UI.
-    item.save()
+    # Пишем только комментарий: статус (и счетчик нарушений отчета) не трогаем
+    item.save(update_fields=["comment"])
+    # Это тоже правка черновика: автосохранение из другой вкладки
+    # со старой ревизией не должно затереть комментарий
+    Inspection.objects.filter(id=item.inspection_id).update(revision=F("revision") + 1)
     return JsonResponse({"status": "ok"})
+
+
+def _parse_item_deltas(payload):
+    """
+    Проверяет JSON автосохранения и приводит его к виду
+    {item_id: {"is_compliant": bool, "comment": str}}.
+    Бросает TypeError (неверный тип значения) или ValueError (неверный ID пункта).
+    """
+    if not isinstance(payload, dict):
+        raise TypeError("Ожидается {revision: int, items: {item_id: {...}}}.")
+    revision = payload.get("revision")
+    items = payload.get("items")
+    if not isinstance(revision, int) or not isinstance(items, dict):
+        raise TypeError("Ожидается {revision: int, items: {item_id: {...}}}.")
+
+    deltas = {}
+    for item_id, values in items.items():
+        if not isinstance(values, dict):
+            raise TypeError(f"Неверные данные пункта {item_id}.")
+        delta = {}
+        if "is_compliant" in values:
+            if not isinstance(values["is_compliant"], bool):
+                raise TypeError(f"is_compliant пункта {item_id} должен быть bool.")
+            delta["is_compliant"] = values["is_compliant"]
+        if "comment" in values:
+            if not isinstance(values["comment"], str):
+                raise TypeError(f"comment пункта {item_id} должен быть строкой.")
+            delta["comment"] = values["comment"]
+        deltas[int(item_id)] = delta
+    return revision, deltas
+
+
+@employee_required
+@require_POST
+def autosave_inspection_ajax(request, inspection_id):
+    """
+    Автосохранение черновика: принимает пачку изменений пунктов (JSON)
+    и ревизию клиента, возвращает новую ревизию.
+    409 - отчет уже сохранили в другом месте (ревизия устарела).
+    """
+    inspection = get_object_or_404(Inspection, id=inspection_id, inspector=request.user)
+
+    try:
+        revision, deltas = _parse_item_deltas(json.loads(request.body))
+    except (ValueError, TypeError) as exc:
+        # json.JSONDecodeError - тоже ValueError
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+
+    success, current_revision = autosave_inspection(inspection, revision, deltas)
+
+    if not success:
+        return JsonResponse(
+            {
+                "status": "conflict",
+                "revision": current_revision,
+                "message": "Отчет изменен в другом окне. Обновите страницу.",
+            },
+            status=409,
+        )
+
+    return JsonResponse({"status": "ok", "revision": current_revision})
+
+
+def _parse_analytics_params(params, today):
+    """
+    Проверяет GET-параметры аналитики и приводит к (by, start, end, period, limit).
+    Бросает ValueError, если параметры неверные.
+    """
+    by = params.get("by", "criterion")
+    if by not in GROUPINGS:
+        raise ValueError(f"by: одно из {', '.join(GROUPINGS)}.")
+    period = params.get("period", "all")
+    if period not in PERIODS:
+        raise ValueError(f"period: одно из {', '.join(PERIODS)}.")
+
+    end_date = date.fromisoformat(params["end"]) if params.get("end") else today
+    if params.get("start"):
+        start_date = date.fromisoformat(params["start"])
+    else:
+        start_date = end_date - timedelta(days=ANALYTICS_DEFAULT_DAYS)
+    if not 0 <= (end_date - start_date).days <= ANALYTICS_MAX_DAYS:
+        raise ValueError(f"Окно: start <= end, не больше {ANALYTICS_MAX_DAYS} дней.")
+
+    limit = int(params.get("limit", ANALYTICS_DEFAULT_LIMIT))
+    if not 1 <= limit <= ANALYTICS_MAX_LIMIT:
+        raise ValueError(f"limit: от 1 до {ANALYTICS_MAX_LIMIT}.")
+    return by, start_date, end_date, period, limit
+
+
+@admin_required
+def violation_analytics_api(request):
+    """
+    Доля нарушений по вопросам / разделам / участкам за окно дат (JSON).
+
+    GET-параметры: by (criterion | section | location), start, end (ГГГГ-ММ-ДД,
+    по умолчанию последние ANALYTICS_DEFAULT_DAYS дней), period (week | month | all),
+    limit (строк на период). Цифры считаются одним GROUP BY и кешируются в Redis.
+    """
+    try:
+        by, start_date, end_date, period, limit = _parse_analytics_params(
+            request.GET, timezone.now().date()
+        )
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+
+    rows = get_violation_rates(by, start_date, end_date, period, limit)
+    return JsonResponse(
+        {
+            "status": "ok",
+            "by": by,
+            "start": start_date,
+            "end": end_date,
+            "period": period,
+            "rows": rows,
+        }
+    )
+
+
+@login_required
+def photo_rendition_view(request, photo_id, size):
+    """
+    Уменьшенная копия фото. Если ее еще нет - создается при первом
+    обращении и остается на диске. Отвечает редиректом на файл.
+    Сотрудник видит фото отчетов по шаблонам своих проверок и назначений
+    (в форме отчета показываются прошлые нарушения других проверяющих),
+    админ и мастер - все.
+    """
+    if size not in RENDITION_SIZES:
+        raise Http404("Неизвестный размер копии.")
+
+    photos = ViolationPhoto.objects.select_related("blob")
+    if not (request.user.is_staff or request.user.role in ["admin", "master"]):
+        inspected = Inspection.objects.filter(inspector=request.user)
+        scheduled = Schedule.objects.filter(inspector=request.user)
+        photos = photos.filter(
+            Q(item__inspection__template__in=inspected.values("template"))
+            | Q(item__inspection__template__in=scheduled.values("template"))
+        )
+    photo = get_object_or_404(photos, id=photo_id, blob__status=PhotoBlob.STATUS_READY)
+    rendition = get_or_create_rendition(photo.blob, size)
+    if rendition is None:
+        raise Http404("Не удалось сделать копию фото.")
+    return redirect(rendition.image.url)
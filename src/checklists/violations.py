@@ -0,0 +1,147 @@
+from django.db import transaction
+
+from checklists.models import CriterionViolation, InspectionItem
+
+# Сколько строк нарушений вставлять одним INSERT при пересчете
+VIOLATIONS_BATCH_SIZE = 1000
+
+# Поля состояния, которые меняет очередной ответ (для bulk_update)
+STATE_FIELDS = [
+    "item",
+    "is_open",
+    "first_seen",
+    "last_seen",
+    "consecutive",
+    "reopened",
+    "resolved_on",
+]
+
+
+def apply_answer(state, criteria_id, item_id, is_compliant, date_check):
+    """
+    Один шаг серии: ответ по вопросу из отчета за date_check.
+    state - текущее состояние вопроса (CriterionViolation) или None.
+
+    Возвращает измененное/новое состояние или None, если менять нечего.
+    Ответ из отчета старше уже учтенного (завершили задним числом)
+    серию не переписывает.
+    """
+    if state is not None and date_check < max(
+        state.last_seen, state.resolved_on or state.last_seen
+    ):
+        return None
+
+    if is_compliant:
+        # Устранено: серия закрывается, но остается в истории вопроса
+        if state is None or not state.is_open:
+            return None
+        state.is_open = False
+        state.resolved_on = date_check
+        return state
+
+    if state is None:
+        state = CriterionViolation(
+            criteria_id=criteria_id, first_seen=date_check, consecutive=0
+        )
+    elif not state.is_open:
+        # Было устранено и появилось снова - новая серия
+        state.is_open = True
+        state.first_seen = date_check
+        state.consecutive = 0
+        state.reopened += 1
+
+    state.consecutive += 1
+    state.item_id = item_id
+    state.last_seen = date_check
+    return state
+
+
+def record_inspection_violations(inspection):
+    """
+    Продвигает серии нарушений по пунктам завершенного отчета.
+    Вызывать один раз - в транзакции, где отчет помечается завершенным.
+
+    Итого: SELECT пунктов + SELECT состояний вопросов (FOR UPDATE)
+    + UPDATE измененных - независимо от числа пунктов. Первые нарушения
+    по вопросам: еще INSERT (без ошибки на конфликт) и SELECT FOR UPDATE.
+    """
+    answers = list(
+        InspectionItem.objects.filter(
+            inspection=inspection, criteria_origin__isnull=False
+        )
+        .order_by()
+        .values_list("id", "criteria_origin_id", "is_compliant")
+    )
+
+    # Блокировка строк: параллельное завершение не потеряет шаг серии
+    states = CriterionViolation.objects.select_for_update().in_bulk(
+        [criteria_id for _, criteria_id, _ in answers]
+    )
+
+    # Первое нарушение по вопросу: строки еще нет, блокировать нечего.
+    # Параллельный отчет мог вставить ее раньше нас - конфликт пропускаем
+    # и перечитываем строки под блокировкой: чужую строку продвигаем ниже,
+    # свою (с нашим пунктом) - уже нет.
+    new_states = [
+        apply_answer(None, criteria_id, item_id, False, inspection.date_check)
+        for item_id, criteria_id, is_compliant in answers
+        if not is_compliant and criteria_id not in states
+    ]
+    if new_states:
+        CriterionViolation.objects.bulk_create(new_states, ignore_conflicts=True)
+        states.update(
+            CriterionViolation.objects.select_for_update().in_bulk(
+                [state.criteria_id for state in new_states]
+            )
+        )
+    inserted_items = {state.item_id for state in new_states}
+
+    updated = []
+    for item_id, criteria_id, is_compliant in answers:
+        existing = states.get(criteria_id)
+        if existing is None or existing.item_id in inserted_items:
+            # Строки нет и не нужно (соответствует) или ее только что вставили мы
+            continue
+        state = apply_answer(
+            existing, criteria_id, item_id, is_compliant, inspection.date_check
+        )
+        if state is not None:
+            updated.append(state)
+
+    if updated:
+        CriterionViolation.objects.bulk_update(
+            updated, STATE_FIELDS, batch_size=VIOLATIONS_BATCH_SIZE
+        )
+
+
+def rebuild_criterion_violations():
+    """
+    Полный пересчет серий нарушений по истории завершенных отчетов
+    (первый запуск, ручные правки отчетов). Пункты читаются итератором
+    по порядку отчетов и проходят те же шаги, что и при завершении.
+    Возвращает количество открытых нарушений.
+    """
+    items = (
+        InspectionItem.objects.filter(
+            inspection__is_completed=True, criteria_origin__isnull=False
+        )
+        .order_by("inspection__date_check", "inspection__created_at", "id")
+        .values_list(
+            "id", "criteria_origin_id", "is_compliant", "inspection__date_check"
+        )
+    )
+
+    states = {}
+    for item_id, criteria_id, is_compliant, date_check in items.iterator():
+        state = apply_answer(
+            states.get(criteria_id), criteria_id, item_id, is_compliant, date_check
+        )
+        if state is not None:
+            states[criteria_id] = state
+
+    with transaction.atomic():
+        CriterionViolation.objects.all().delete()
+        CriterionViolation.objects.bulk_create(
+            states.values(), batch_size=VIOLATIONS_BATCH_SIZE
+        )
+    return sum(state.is_open for state in states.values())
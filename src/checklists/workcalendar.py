@@ -0,0 +1,119 @@
+import datetime
+
+import holidays
+from django.core.cache import cache
+
+from checklists.caching import (
+    bump_version,
+    get_version,
+    record_cache_lookup,
+    versioned_key,
+)
+from checklists.models import CalendarOverride
+
+CALENDAR_NAMESPACE = "checklists:calendar"
+
+# Календарь года почти не меняется - правки сбрасывают версию сигналом
+CALENDAR_TIMEOUT = 60 * 60 * 24 * 30
+
+# Кеш в памяти процесса: {версия: WorkCalendar}
+_calendars = {}
+
+
+class WorkCalendar:
+    """
+    Производственный календарь РБ.
+
+    Для каждого года один раз строится "битовая карта" рабочих дней
+    (1 байт на день): выходные, праздники и официальные переносы
+    из библиотеки holidays + ручные правки админа (CalendarOverride).
+    Дальше любой вопрос "рабочий ли день" - это чтение байта, O(1).
+
+    Карта кешируется в памяти процесса и в Redis.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self._years = {}
+
+    def _bitmap(self, year):
+        bitmap = self._years.get(year)
+        if bitmap is None:
+            # Версия библиотеки в ключе: обновили holidays - пересчитали
+            key = versioned_key(CALENDAR_NAMESPACE, "year", year, holidays.__version__)
+            bitmap = cache.get(key)
+            record_cache_lookup(hits=bitmap is not None, misses=bitmap is None)
+            if bitmap is None:
+                bitmap = build_year_bitmap(year)
+                cache.set(key, bitmap, CALENDAR_TIMEOUT)
+            self._years[year] = bitmap
+        return bitmap
+
+    def is_working_day(self, date):
+        return bool(self._bitmap(date.year)[date.timetuple().tm_yday - 1])
+
+    def working_days(self, start_date, end_date):
+        """
+        Рабочие дни в диапазоне [start_date, end_date].
+        """
+        days = []
+        current_date = start_date
+        while current_date <= end_date:
+            if self.is_working_day(current_date):
+                days.append(current_date)
+            current_date += datetime.timedelta(days=1)
+        return days
+
+    def next_working_days(self, start_date, count):
+        """
+        Ближайшие `count` рабочих дней, начиная с start_date (включительно).
+        """
+        days = []
+        current_date = start_date
+        while len(days) < count:
+            if self.is_working_day(current_date):
+                days.append(current_date)
+            current_date += datetime.timedelta(days=1)
+        return days
+
+
+def build_year_bitmap(year):
+    """
+    Строит карту рабочих дней года: bytes, где байт i = 1, если день i+1 рабочий.
+    """
+    by_holidays = holidays.BY(years=year)
+    start = datetime.date(year, 1, 1)
+    days_in_year = (datetime.date(year + 1, 1, 1) - start).days
+
+    # Выходные, праздники и переносы (рабочие субботы) знает библиотека
+    bitmap = bytearray(
+        by_holidays.is_working_day(start + datetime.timedelta(days=offset))
+        for offset in range(days_in_year)
+    )
+
+    # Ручные правки админа важнее библиотеки
+    overrides = CalendarOverride.objects.filter(date__year=year).values_list(
+        "date", "is_working_day"
+    )
+    for date, is_working_day in overrides:
+        bitmap[date.timetuple().tm_yday - 1] = is_working_day
+
+    return bytes(bitmap)
+
+
+def get_work_calendar():
+    """
+    Календарь текущей версии (1 обращение к Redis за версией).
+    Карты годов переиспользуются в процессе, пока админ не поправит переносы.
+    """
+    version = get_version(CALENDAR_NAMESPACE)
+    calendar = _calendars.get(version)
+    if calendar is None:
+        # Старые версии больше не нужны
+        _calendars.clear()
+        calendar = _calendars[version] = WorkCalendar(version)
+    return calendar
+
+
+def invalidate_work_calendar():
+    bump_version(CALENDAR_NAMESPACE)
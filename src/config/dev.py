@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from celery.schedules import crontab
+
 from config.settings import settings
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -29,6 +31,9 @@ LOGIN_URL = "users:login"
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Замер запросов (БД, кеш, время) - раньше сессий и авторизации,
+    # чтобы учесть и их запросы
+    "checklists.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -116,3 +121,43 @@ CELERY_RESULT_BACKEND = settings.CELERY_RESULT_BACKEND
 CELERY_ACCEPT_CONTENT = settings.CELERY_ACCEPT_CONTENT
 CELERY_TASK_SERIALIZER = settings.CELERY_TASK_SERIALIZER
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# DatabaseScheduler при старте beat сам заносит эти задачи в django_celery_beat
+CELERY_BEAT_SCHEDULE = {
+    "extend-schedule-horizon": {
+        "task": "checklists.tasks.extend_schedule_horizon_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "cleanup-media": {
+        "task": "checklists.tasks.cleanup_media_task",
+        "schedule": crontab(hour=4, minute=0, day_of_week="sunday"),
+    },
+}
+
+# На сколько недель вперед автоматически строится расписание
+SCHEDULE_HORIZON_WEEKS = 2
+# Алгоритм назначения: "round_robin" (по очереди) или "balanced" (по нагрузке)
+SCHEDULE_ENGINE = "round_robin"
+
+# Запрос медленнее (мс) пишется в лог как WARNING (см. RequestMetricsMiddleware)
+SLOW_REQUEST_MS = 1000
+
+# Строки замеров запросов ("checklists.metrics") - в консоль (stdout контейнера)
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "checklists": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
+# Кеш живет в том же Redis, что и брокер Celery
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": settings.CELERY_BROKER_URL,
+        "KEY_PREFIX": "culture",
+    }
+}
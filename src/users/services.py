@@ -0,0 +1,77 @@
+import datetime
+from bisect import bisect_right
+from collections import defaultdict
+
+from users.models import UserAbsence
+
+
+class AbsenceIndex:
+    """
+    Индекс отсутствий (Отпуск, Больничный...) в памяти.
+
+    Загружается ОДНИМ запросом на весь период работы генератора/автозамены.
+    Для каждого сотрудника хранит отсортированные и склеенные интервалы
+    (массивы начал и концов), поэтому проверка "отсутствует ли сотрудник
+    в день D" - это бинарный поиск (bisect), O(log n), без запросов в БД.
+    """
+
+    def __init__(self, absences=()):
+        # absences: итерируемое из (user_id, start_date, end_date)
+        intervals_by_user = defaultdict(list)
+        for user_id, start_date, end_date in absences:
+            if start_date <= end_date:
+                intervals_by_user[user_id].append((start_date, end_date))
+
+        self._starts = {}
+        self._ends = {}
+        one_day = datetime.timedelta(days=1)
+
+        for user_id, intervals in intervals_by_user.items():
+            intervals.sort()
+            starts, ends = [], []
+            for start_date, end_date in intervals:
+                # Пересекающиеся и соседние периоды склеиваем в один,
+                # тогда достаточно проверить только ближайший интервал слева.
+                if ends and start_date <= ends[-1] + one_day:
+                    ends[-1] = max(ends[-1], end_date)
+                else:
+                    starts.append(start_date)
+                    ends.append(end_date)
+            self._starts[user_id] = starts
+            self._ends[user_id] = ends
+
+    @classmethod
+    def load(cls, start_date, end_date=None, user_ids=None):
+        """
+        Загружает отсутствия, пересекающиеся с [start_date, end_date].
+        end_date=None - без ограничения сверху (все будущие отсутствия).
+        """
+        qs = UserAbsence.objects.filter(end_date__gte=start_date)
+        if end_date is not None:
+            qs = qs.filter(start_date__lte=end_date)
+        if user_ids is not None:
+            qs = qs.filter(user_id__in=user_ids)
+        return cls(qs.values_list("user_id", "start_date", "end_date"))
+
+    def is_absent(self, user_id, date):
+        """
+        True, если сотрудник отсутствует в этот день. O(log n).
+        """
+        starts = self._starts.get(user_id)
+        if not starts:
+            return False
+        # Последний интервал, который начался не позже date
+        idx = bisect_right(starts, date) - 1
+        return idx >= 0 and self._ends[user_id][idx] >= date
+
+    def absent_on(self, date):
+        """
+        Множество ID сотрудников, отсутствующих в этот день.
+        """
+        return {user_id for user_id in self._starts if self.is_absent(user_id, date)}
+
+    def intervals(self, user_id):
+        """
+        Склеенные периоды отсутствия сотрудника: [(start, end), ...].
+        """
+        return list(zip(self._starts.get(user_id, []), self._ends.get(user_id, [])))
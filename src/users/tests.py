@@ -1 +1,64 @@
-# Create your tests here.
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from users.models import UserAbsence
+from users.services import AbsenceIndex
+
+User = get_user_model()
+
+
+def day(number):
+    return datetime.date(2025, 3, number)
+
+
+class AbsenceIndexTests(SimpleTestCase):
+    """
+    Индекс отсутствий: склейка периодов и бинарный поиск по дню.
+    """
+
+    def test_overlapping_and_adjacent_intervals_are_merged(self):
+        index = AbsenceIndex(
+            [
+                (1, day(10), day(12)),
+                (1, day(1), day(5)),
+                (1, day(4), day(7)),  # пересекается с первым
+                (1, day(8), day(8)),  # вплотную к предыдущему
+                (1, day(20), day(19)),  # перевернутый период - пропускается
+            ]
+        )
+
+        self.assertEqual(index.intervals(1), [(day(1), day(8)), (day(10), day(12))])
+
+    def test_is_absent_on_interval_edges(self):
+        index = AbsenceIndex(
+            [(1, day(1), day(8)), (1, day(10), day(12)), (2, day(9), day(9))]
+        )
+
+        self.assertFalse(index.is_absent(1, datetime.date(2025, 2, 28)))
+        self.assertTrue(index.is_absent(1, day(1)))
+        self.assertTrue(index.is_absent(1, day(8)))
+        self.assertFalse(index.is_absent(1, day(9)))
+        self.assertTrue(index.is_absent(1, day(12)))
+        self.assertFalse(index.is_absent(1, day(13)))
+        self.assertFalse(index.is_absent(3, day(1)))
+        self.assertEqual(index.absent_on(day(9)), {2})
+        self.assertEqual(index.absent_on(day(10)), {1})
+
+
+class AbsenceIndexLoadTests(TestCase):
+    def test_load_takes_only_overlapping_absences(self):
+        first, second = (
+            User.objects.create_user(email=f"user{i}@example.com") for i in range(2)
+        )
+        UserAbsence.objects.create(user=first, start_date=day(1), end_date=day(5))
+        UserAbsence.objects.create(user=first, start_date=day(20), end_date=day(25))
+        UserAbsence.objects.create(user=second, start_date=day(3), end_date=day(4))
+
+        index = AbsenceIndex.load(day(4), day(10), user_ids=[first.id])
+
+        self.assertEqual(index.intervals(first.id), [(day(1), day(5))])
+        self.assertEqual(index.intervals(second.id), [])
+        # Без верхней границы - все будущие отсутствия
+        self.assertEqual(len(AbsenceIndex.load(day(4)).intervals(first.id)), 2)